@@ -0,0 +1,134 @@
+"""Polling client for a NewsAPI-compatible headlines feed."""
+from __future__ import annotations
+
+import hashlib
+import re
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+from core.logging import get_logger
+
+log = get_logger("news.feed")
+
+DEFAULT_BASE_URL = "https://newsapi.org/v2"
+
+_SOURCE_SUFFIX_RE = re.compile(r"\s+[-–—|]\s+[^-–—|]{1,60}$")
+_NON_WORD_RE = re.compile(r"[^\w]+", re.UNICODE)
+
+
+@dataclass(slots=True)
+class NewsItem:
+    title: str
+    url: str
+    source: str
+    summary: str
+    published_at: float
+    title_hash: int
+
+
+@dataclass(slots=True)
+class FeedPage:
+    items: List[NewsItem]
+    etag: Optional[str]
+    not_modified: bool = False
+
+
+def normalize_title(title: str) -> str:
+    """Strips the trailing " - Source" suffix, punctuation and case."""
+    title = _SOURCE_SUFFIX_RE.sub("", title.strip())
+    return " ".join(_NON_WORD_RE.sub(" ", title.casefold()).split())
+
+
+def title_hash(title: str) -> int:
+    digest = hashlib.blake2b(normalize_title(title).encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "big", signed=True)
+
+
+def _parse_ts(value: Any) -> float:
+    if not value:
+        return 0.0
+    try:
+        return datetime.fromisoformat(str(value).replace("Z", "+00:00")).timestamp()
+    except ValueError:
+        return 0.0
+
+
+def parse_articles(payload: Dict[str, Any], max_summary: int = 300) -> List[NewsItem]:
+    items: List[NewsItem] = []
+    for raw in payload.get("articles") or []:
+        title = (raw.get("title") or "").strip()
+        url = (raw.get("url") or "").strip()
+        if not title or not url or title == "[Removed]":
+            continue
+        items.append(
+            NewsItem(
+                title=title,
+                url=url,
+                source=((raw.get("source") or {}).get("name") or "").strip(),
+                summary=(raw.get("description") or "").strip()[:max_summary],
+                published_at=_parse_ts(raw.get("publishedAt")),
+                title_hash=title_hash(title),
+            )
+        )
+    return items
+
+
+class NewsFeedClient:
+    """Fetches headlines, sending the stored ETag so an unchanged feed costs one 304.
+
+    ``top-headlines`` has no date filter, so the ``since`` cursor is applied
+    here: pages are walked newest-first (at most ``max_pages``) and the walk
+    stops at the first page that reaches the cursor.
+    """
+
+    def __init__(
+        self,
+        api_key: str,
+        *,
+        base_url: str = DEFAULT_BASE_URL,
+        params: Optional[Dict[str, str]] = None,
+        page_size: int = 50,
+        max_pages: int = 4,
+        timeout: float = 10.0,
+        client: Optional[httpx.AsyncClient] = None,
+    ) -> None:
+        self.api_key = api_key
+        self.base_url = base_url.rstrip("/")
+        self.params = dict(params or {"country": "ru"})
+        self.page_size = page_size
+        self.max_pages = max(1, max_pages)
+        self._owns_client = client is None
+        self._client = client or httpx.AsyncClient(timeout=timeout)
+
+    async def fetch(self, *, etag: Optional[str] = None, since: Optional[str] = None) -> FeedPage:
+        cutoff = _parse_ts(since)
+        items: List[NewsItem] = []
+        new_etag: Optional[str] = None
+        for page in range(1, self.max_pages + 1):
+            headers = {"X-Api-Key": self.api_key}
+            if etag and page == 1:
+                headers["If-None-Match"] = etag
+            params = {**self.params, "pageSize": str(self.page_size), "page": str(page)}
+            response = await self._client.get(f"{self.base_url}/top-headlines", params=params, headers=headers)
+            if response.status_code == 304:
+                return FeedPage(items=[], etag=etag, not_modified=True)
+            response.raise_for_status()
+            if page == 1:
+                new_etag = response.headers.get("ETag")
+            payload = response.json()
+            batch = parse_articles(payload)
+            items.extend(i for i in batch if i.published_at >= cutoff)
+            reached_cursor = cutoff > 0 and any(i.published_at <= cutoff for i in batch)
+            last_page = len(payload.get("articles") or []) < self.page_size or page * self.page_size >= int(
+                payload.get("totalResults") or 0
+            )
+            if reached_cursor or last_page:
+                break
+        return FeedPage(items=items, etag=new_etag)
+
+    async def aclose(self) -> None:
+        if self._owns_client:
+            await self._client.aclose()
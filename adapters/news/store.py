@@ -0,0 +1,180 @@
+"""SQLite storage for ingested news with a title-hash dedupe index and FTS."""
+from __future__ import annotations
+
+import re
+import time
+from sqlite3 import OperationalError
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from .feed import NewsItem
+
+_TOKEN_RE = re.compile(r"[0-9A-Za-zА-Яа-яЁё]+", re.UNICODE)
+
+
+def _stem(token: str) -> str:
+    # грубое отсечение окончаний: «погода»/«погоды» → «погод*»
+    token = token.casefold()
+    return token[: max(4, len(token) - 2)] if len(token) > 5 else token
+
+
+def _fts_topic(topic: str, max_tokens: int = 6) -> Optional[str]:
+    toks = _TOKEN_RE.findall(topic or "")[:max_tokens]
+    if not toks:
+        return None
+    return " OR ".join(f'"{_stem(t)}"*' for t in toks)
+
+
+class NewsStore:
+    """
+    news_items(id, title_hash UNIQUE, title, url, source, summary, published_at, ingested_at)
+    news_fts: external-content fts5 over (title, summary), synced by triggers.
+    news_cursors(feed PK, etag, since, updated_at): incremental ingestion state.
+    """
+
+    def __init__(self, db: Any) -> None:
+        if not hasattr(db, "conn"):
+            raise ValueError("NewsStore expects db.conn")
+        self.db = db
+        self._ready = False
+        self._fts_enabled = False
+
+    async def _ensure(self) -> None:
+        if self._ready:
+            return
+        await self.db.conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS news_items (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                title_hash INTEGER NOT NULL UNIQUE,
+                title TEXT NOT NULL,
+                url TEXT NOT NULL,
+                source TEXT NOT NULL DEFAULT '',
+                summary TEXT NOT NULL DEFAULT '',
+                published_at REAL NOT NULL,
+                ingested_at REAL NOT NULL
+            )
+            """
+        )
+        await self.db.conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_news_items_published ON news_items(published_at DESC)"
+        )
+        await self.db.conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS news_cursors (
+                feed TEXT PRIMARY KEY,
+                etag TEXT,
+                since TEXT,
+                updated_at REAL NOT NULL
+            )
+            """
+        )
+        try:
+            await self.db.conn.execute(
+                """
+                CREATE VIRTUAL TABLE IF NOT EXISTS news_fts
+                USING fts5(title, summary, content='news_items', content_rowid='id', tokenize='unicode61')
+                """
+            )
+            self._fts_enabled = True
+        except OperationalError:
+            self._fts_enabled = False
+        if self._fts_enabled:
+            await self.db.conn.execute(
+                """
+                CREATE TRIGGER IF NOT EXISTS news_items_ai AFTER INSERT ON news_items BEGIN
+                    INSERT INTO news_fts(rowid, title, summary) VALUES (new.id, new.title, new.summary);
+                END;
+                """
+            )
+            await self.db.conn.execute(
+                """
+                CREATE TRIGGER IF NOT EXISTS news_items_ad AFTER DELETE ON news_items BEGIN
+                    INSERT INTO news_fts(news_fts, rowid, title, summary)
+                    VALUES ('delete', old.id, old.title, old.summary);
+                END;
+                """
+            )
+        await self.db.conn.commit()
+        self._ready = True
+
+    # --------- cursors ---------
+
+    async def get_cursor(self, feed: str) -> Tuple[Optional[str], Optional[str]]:
+        await self._ensure()
+        cur = await self.db.conn.execute("SELECT etag, since FROM news_cursors WHERE feed=?", (feed,))
+        row = await cur.fetchone()
+        await cur.close()
+        return (row[0], row[1]) if row else (None, None)
+
+    async def set_cursor(self, feed: str, etag: Optional[str], since: Optional[str]) -> None:
+        await self._ensure()
+        await self.db.conn.execute(
+            "REPLACE INTO news_cursors (feed, etag, since, updated_at) VALUES (?, ?, ?, ?)",
+            (feed, etag, since, time.time()),
+        )
+        await self.db.conn.commit()
+
+    # --------- ingestion ---------
+
+    async def insert_batch(self, items: Sequence[NewsItem]) -> int:
+        """INSERT OR IGNORE by title_hash; one transaction per batch. Returns rows added."""
+        await self._ensure()
+        if not items:
+            return 0
+        now = time.time()
+        cur = await self.db.conn.executemany(
+            """
+            INSERT OR IGNORE INTO news_items (title_hash, title, url, source, summary, published_at, ingested_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+            """,
+            [(i.title_hash, i.title, i.url, i.source, i.summary, i.published_at, now) for i in items],
+        )
+        added = max(0, cur.rowcount or 0)
+        await cur.close()
+        await self.db.conn.commit()
+        return added
+
+    async def prune(self, keep_days: float = 14) -> int:
+        await self._ensure()
+        cur = await self.db.conn.execute(
+            "DELETE FROM news_items WHERE published_at < ?", (time.time() - keep_days * 86400,)
+        )
+        await self.db.conn.commit()
+        return cur.rowcount or 0
+
+    # --------- queries ---------
+
+    async def top_recent(self, topic: str = "", limit: int = 5, max_age_sec: float = 3 * 86400) -> List[Dict[str, Any]]:
+        """Самые свежие новости по теме (FTS), либо просто самые свежие при пустой теме."""
+        await self._ensure()
+        min_ts = time.time() - max_age_sec
+        query = _fts_topic(topic)
+        if query and self._fts_enabled:
+            sql = """
+                SELECT n.id, n.title, n.url, n.source, n.summary, n.published_at
+                FROM news_fts f JOIN news_items n ON n.id = f.rowid
+                WHERE news_fts MATCH ? AND n.published_at >= ?
+                ORDER BY n.published_at DESC
+                LIMIT ?
+            """
+            params: Tuple[Any, ...] = (query, min_ts, limit)
+        elif query:
+            sql = """
+                SELECT id, title, url, source, summary, published_at FROM news_items
+                WHERE (title LIKE ? OR summary LIKE ?) AND published_at >= ?
+                ORDER BY published_at DESC LIMIT ?
+            """
+            params = (f"%{topic}%", f"%{topic}%", min_ts, limit)
+        else:
+            sql = """
+                SELECT id, title, url, source, summary, published_at FROM news_items
+                WHERE published_at >= ? ORDER BY published_at DESC LIMIT ?
+            """
+            params = (min_ts, limit)
+        cur = await self.db.conn.execute(sql, params)
+        rows = await cur.fetchall()
+        await cur.close()
+        return [
+            {"id": r[0], "title": r[1], "url": r[2], "source": r[3], "summary": r[4], "published_at": r[5]}
+            for r in rows
+        ]
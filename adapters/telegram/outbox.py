@@ -0,0 +1,301 @@
+"""Outbound send scheduler: every message to Telegram goes through one paced queue.
+
+Telegram allows roughly 30 messages per second per bot and about one per
+second per chat; bursts above that come back as ``RetryAfter`` (HTTP 429).
+The scheduler keeps a per-chat FIFO (ordered by priority, then arrival) and
+a single dispatcher that
+
+* takes a token from a global bucket before every send,
+* lets a chat send again only ``chat_interval_sec`` after its previous send,
+* on ``RetryAfter`` puts the message back and parks *only that chat* for
+  the requested time, while every other chat keeps flowing,
+* always picks the most urgent ready chat, so replies overtake proactive
+  and broadcast messages.
+
+Sends run as separate tasks (at most one in flight per chat), so a slow API
+call does not hold up other chats.
+"""
+from __future__ import annotations
+
+import asyncio
+import heapq
+import itertools
+import time
+from dataclasses import asdict, dataclass, field
+from enum import IntEnum
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+from aiogram import Bot
+from aiogram.exceptions import TelegramRetryAfter
+
+from core.logging import get_logger
+
+log = get_logger("telegram.outbox")
+
+
+class Priority(IntEnum):
+    REPLY = 0
+    PROACTIVE = 1
+    BROADCAST = 2
+
+
+class OutboxFull(Exception):
+    """Raised for non-reply messages once ``max_queue`` messages are waiting."""
+
+
+class OutboxClosed(Exception):
+    """Raised for messages submitted after ``stop`` or still queued when it ran; none reached Telegram."""
+
+
+class TokenBucket:
+    def __init__(self, rate: float, burst: float, clock: Callable[[], float] = time.monotonic) -> None:
+        self.rate = rate
+        self.burst = max(1.0, burst)
+        self.tokens = self.burst
+        self.clock = clock
+        self.updated = clock()
+
+    def reserve(self) -> float:
+        """Takes a token and returns 0, or returns how long to wait before one is available."""
+        now = self.clock()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1.0:
+            self.tokens -= 1.0
+            return 0.0
+        return (1.0 - self.tokens) / self.rate
+
+
+@dataclass(order=True, slots=True)
+class _Outgoing:
+    priority: int
+    seq: int
+    chat_id: int = field(compare=False)
+    text: str = field(compare=False)
+    kwargs: Dict[str, Any] = field(compare=False)
+    enqueued_at: float = field(compare=False)
+    future: Optional[asyncio.Future[Any]] = field(compare=False, default=None)
+    attempts: int = field(compare=False, default=0)
+
+
+@dataclass(slots=True)
+class OutboxMetrics:
+    enqueued: int = 0
+    sent: int = 0
+    failed: int = 0
+    retry_after: int = 0
+    rejected_full: int = 0
+    lag_ms_max: float = 0.0
+    lag_ms_total: float = 0.0
+
+
+class SendScheduler:
+    def __init__(
+        self,
+        bot: Bot,
+        *,
+        global_rate: float = 25.0,
+        burst: float = 5.0,
+        chat_interval_sec: float = 1.0,
+        max_queue: int = 10000,
+        max_attempts: int = 3,
+    ) -> None:
+        self.bot = bot
+        self.chat_interval_sec = chat_interval_sec
+        self.max_queue = max_queue
+        self.max_attempts = max(1, max_attempts)
+        self.metrics = OutboxMetrics()
+        self._bucket = TokenBucket(global_rate, burst)
+        self._seq = itertools.count()
+        self._chats: Dict[int, List[_Outgoing]] = {}
+        # a chat is "busy" while it waits in _ready, waits in _timers or has a send in flight
+        self._busy: Set[int] = set()
+        self._ready: List[Tuple[int, int, int]] = []
+        self._ready_key: Dict[int, Tuple[int, int]] = {}
+        self._timers: List[Tuple[float, int]] = []
+        self._parked: Dict[int, float] = {}
+        self._depth = [0] * len(Priority)
+        self._inflight: Set[asyncio.Task[None]] = set()
+        self._wakeup = asyncio.Event()
+        self._idle = asyncio.Event()
+        self._idle.set()
+        self._task: Optional[asyncio.Task[None]] = None
+        self._closed = False
+
+    # --- public API -------------------------------------------------------
+
+    def submit(self, chat_id: int, text: str, *, priority: Priority = Priority.REPLY, **kwargs: Any) -> None:
+        """Queues a message without waiting for delivery; failures are logged."""
+        self._enqueue(chat_id, text, priority, kwargs, None)
+
+    async def send(self, chat_id: int, text: str, *, priority: Priority = Priority.REPLY, **kwargs: Any) -> Any:
+        """Queues a message and returns the ``Message`` Telegram sent back."""
+        future: asyncio.Future[Any] = asyncio.get_running_loop().create_future()
+        self._enqueue(chat_id, text, priority, kwargs, future)
+        return await future
+
+    def depth(self) -> int:
+        return sum(self._depth)
+
+    def snapshot(self) -> Dict[str, Any]:
+        metrics = asdict(self.metrics)
+        total_lag = metrics.pop("lag_ms_total")
+        return {
+            **metrics,
+            "lag_ms_avg": round(total_lag / self.metrics.sent, 2) if self.metrics.sent else 0.0,
+            "depth": self.depth(),
+            "depth_by_priority": {p.name.lower(): self._depth[p] for p in Priority},
+            "parked_chats": sum(1 for until in self._parked.values() if until > time.monotonic()),
+            "in_flight": len(self._inflight),
+        }
+
+    # --- scheduling -------------------------------------------------------
+
+    def _enqueue(
+        self, chat_id: int, text: str, priority: Priority, kwargs: Dict[str, Any], future: Optional[asyncio.Future[Any]]
+    ) -> None:
+        if self._closed:
+            raise OutboxClosed("outbox is stopped")
+        if priority != Priority.REPLY and self.depth() >= self.max_queue:
+            self.metrics.rejected_full += 1
+            raise OutboxFull(f"outbox holds {self.depth()} messages")
+        item = _Outgoing(int(priority), next(self._seq), chat_id, text, kwargs, time.monotonic(), future)
+        heapq.heappush(self._chats.setdefault(chat_id, []), item)
+        self._depth[priority] += 1
+        self.metrics.enqueued += 1
+        self._idle.clear()
+        if chat_id not in self._busy:
+            self._busy.add(chat_id)
+            self._mark_ready(chat_id)
+        elif chat_id in self._ready_key and (item.priority, item.seq) < self._ready_key[chat_id]:
+            self._mark_ready(chat_id)  # re-key: the chat now holds something more urgent
+        self.start()
+        self._wakeup.set()
+
+    def _mark_ready(self, chat_id: int) -> None:
+        items = self._chats.get(chat_id)
+        if not items:
+            self._chats.pop(chat_id, None)
+            self._parked.pop(chat_id, None)
+            self._busy.discard(chat_id)
+            return
+        key = (items[0].priority, items[0].seq)
+        self._ready_key[chat_id] = key
+        heapq.heappush(self._ready, (*key, chat_id))
+
+    def _schedule(self, chat_id: int, at: float) -> None:
+        if at <= time.monotonic():
+            self._mark_ready(chat_id)
+        else:
+            heapq.heappush(self._timers, (at, chat_id))
+        self._wakeup.set()
+
+    def _release_timers(self) -> None:
+        now = time.monotonic()
+        while self._timers and self._timers[0][0] <= now:
+            _, chat_id = heapq.heappop(self._timers)
+            self._mark_ready(chat_id)
+
+    def _pop_ready(self) -> Optional[_Outgoing]:
+        while self._ready:
+            priority, seq, chat_id = heapq.heappop(self._ready)
+            if self._ready_key.get(chat_id) != (priority, seq):
+                continue  # stale entry left behind by a re-key
+            del self._ready_key[chat_id]
+            return heapq.heappop(self._chats[chat_id])
+        return None
+
+    async def _run(self) -> None:
+        while True:
+            self._release_timers()
+            if not self._ready_key:
+                timeout = self._timers[0][0] - time.monotonic() if self._timers else None
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            wait = self._bucket.reserve()
+            if wait > 0:
+                await asyncio.sleep(wait)
+                continue
+            item = self._pop_ready()
+            if item is None:
+                continue
+            task = asyncio.create_task(self._deliver(item))
+            self._inflight.add(task)
+            task.add_done_callback(self._delivered)
+
+    def _delivered(self, task: "asyncio.Task[None]") -> None:
+        self._inflight.discard(task)
+        if not self._inflight and not self.depth():
+            self._idle.set()
+
+    async def _deliver(self, item: _Outgoing) -> None:
+        started = time.monotonic()
+        item.attempts += 1
+        lag_ms = (started - item.enqueued_at) * 1000
+        try:
+            result = await self.bot.send_message(chat_id=item.chat_id, text=item.text, **item.kwargs)
+        except asyncio.CancelledError:
+            # stopped mid-send: Telegram may have the message, so the sender must not resend it
+            if item.future is not None and not item.future.done():
+                item.future.cancel()
+            raise
+        except TelegramRetryAfter as exc:
+            self.metrics.retry_after += 1
+            until = time.monotonic() + float(exc.retry_after)
+            log.warning("outbox.retry_after", chat_id=item.chat_id, retry_after=exc.retry_after, attempt=item.attempts)
+            if item.attempts < self.max_attempts:
+                heapq.heappush(self._chats[item.chat_id], item)
+                self._parked[item.chat_id] = until
+                self._schedule(item.chat_id, until)
+                return
+            self._finish(item, exc=exc)
+            self._schedule(item.chat_id, until)
+            return
+        except Exception as exc:
+            log.exception("outbox.send_failed", chat_id=item.chat_id)
+            self._finish(item, exc=exc)
+        else:
+            self.metrics.sent += 1
+            self.metrics.lag_ms_total += lag_ms
+            self.metrics.lag_ms_max = max(self.metrics.lag_ms_max, round(lag_ms, 2))
+            self._finish(item, result=result)
+        self._schedule(item.chat_id, started + self.chat_interval_sec)
+
+    def _finish(self, item: _Outgoing, *, result: Any = None, exc: Optional[BaseException] = None) -> None:
+        self._depth[item.priority] -= 1
+        if exc is not None:
+            self.metrics.failed += 1
+        if item.future is None or item.future.done():
+            return
+        if exc is not None:
+            item.future.set_exception(exc)
+        else:
+            item.future.set_result(result)
+
+    # --- lifecycle --------------------------------------------------------
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self, drain: bool = True, grace_sec: float = 10.0) -> None:
+        if drain and self._task is not None:
+            try:
+                async with asyncio.timeout(grace_sec):
+                    await self._idle.wait()
+            except TimeoutError:
+                log.warning("outbox.drain_timeout", left=self.depth())
+        tasks = [t for t in (self._task, *self._inflight) if t is not None]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._task = None
+        self._closed = True
+        for items in self._chats.values():
+            for item in items:
+                if item.future is not None and not item.future.done():
+                    item.future.set_exception(OutboxClosed("outbox stopped before the message was sent"))
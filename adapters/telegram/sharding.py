@@ -0,0 +1,412 @@
+"""Supervisor mode: one ingress process, N worker processes sharded by user id.
+
+The ingress (webhook or long polling) does no dialogue work. It extracts
+``tg_user_id`` from each raw update and queues the update for worker
+``tg_user_id % workers``. A user always lands on the same worker, so every
+process-local cache (plan cache, speech profiles, seen users, mailboxes,
+chat pacing) stays valid without any cross-process invalidation.
+
+Each worker has a bounded backlog in the supervisor and a one-way pipe. A
+pump task moves the backlog into the pipe; the worker reads the pipe only
+when it has a free slot. A pipe with a single reader needs no lock, unlike
+``multiprocessing.Queue``, whose read lock stays taken forever when its
+holder dies mid-``get`` and so would starve the replacement worker.
+
+Workers write a heartbeat into a shared array while their event loop is
+alive. The supervisor restarts a worker that exited or whose heartbeat went
+stale, with exponential backoff. The supervisor keeps both ends of the pipe
+open, so updates still queued for a crashed worker wait for its
+replacement; only the (at most ``concurrency``) updates it was processing
+are lost.
+"""
+from __future__ import annotations
+
+import asyncio
+import ctypes
+import multiprocessing as mp
+import queue as queue_mod
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from multiprocessing.connection import Connection
+from multiprocessing.context import ForkContext, ForkServerContext, SpawnContext
+from multiprocessing.process import BaseProcess
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Literal, Optional, TypeAlias, Union
+
+from core.logging import get_logger
+
+if TYPE_CHECKING:
+    # only for annotations: workers are spawned, and every import here is paid per process start
+    from multiprocessing.sharedctypes import SynchronizedArray
+
+    from aiogram import Bot
+
+    from adapters.telegram.webhook import UpdateFeeder
+
+log = get_logger("telegram.sharding")
+
+_UPDATE_KINDS = (
+    "message",
+    "edited_message",
+    "callback_query",
+    "inline_query",
+    "chosen_inline_result",
+    "my_chat_member",
+    "chat_member",
+    "pre_checkout_query",
+    "shipping_query",
+)
+
+ShardTarget = Callable[["ShardChannel"], None]
+RawUpdate = Dict[str, Any]
+StartMethod = Literal["spawn", "fork", "forkserver"]
+Heartbeats: TypeAlias = "SynchronizedArray[float]"
+
+_IDLE = object()
+
+
+def user_id_of(update: Dict[str, Any]) -> int:
+    """Telegram user id behind a raw update; 0 for updates without a sender."""
+    for kind in _UPDATE_KINDS:
+        payload = update.get(kind)
+        if isinstance(payload, dict):
+            sender = payload.get("from") or {}
+            if isinstance(sender.get("id"), int):
+                return int(sender["id"])
+            chat = payload.get("chat") or {}
+            if isinstance(chat.get("id"), int):
+                return int(chat["id"])
+    return 0
+
+
+def shard_of(tg_user_id: int, workers: int) -> int:
+    return tg_user_id % workers
+
+
+def _context(start_method: StartMethod) -> Union[SpawnContext, ForkContext, ForkServerContext]:
+    if start_method == "fork":
+        return mp.get_context("fork")
+    if start_method == "forkserver":
+        return mp.get_context("forkserver")
+    return mp.get_context("spawn")
+
+
+class ShardChannel:
+    """Worker side of a shard: reads routed updates and feeds them to a dispatcher."""
+
+    def __init__(
+        self,
+        index: int,
+        inbox: Connection[Any, Optional[RawUpdate]],
+        heartbeats: Heartbeats,
+        *,
+        concurrency: int = 16,
+        poll_sec: float = 0.5,
+    ) -> None:
+        self.index = index
+        self.inbox = inbox
+        self.heartbeats = heartbeats
+        self.concurrency = max(1, concurrency)
+        self.poll_sec = poll_sec
+        self.processed = 0
+        self.failed = 0
+
+    def beat(self) -> None:
+        self.heartbeats[self.index] = time.time()
+
+    async def _feed(self, dispatcher: UpdateFeeder, bot: Bot, update: RawUpdate, slots: asyncio.Semaphore) -> None:
+        try:
+            await dispatcher.feed_raw_update(bot, update)
+            self.processed += 1
+        except Exception:
+            self.failed += 1
+            log.exception("shard.update_failed", shard=self.index, update_id=update.get("update_id"))
+        finally:
+            slots.release()
+
+    def _receive(self) -> Any:
+        if not self.inbox.poll(self.poll_sec):
+            return _IDLE
+        try:
+            return self.inbox.recv()
+        except EOFError:
+            return None  # the supervisor is gone
+
+    async def _beat_forever(self) -> None:
+        while True:
+            self.beat()
+            await asyncio.sleep(self.poll_sec)
+
+    async def serve(self, dispatcher: UpdateFeeder, bot: Bot) -> None:
+        """Runs until the supervisor sends the ``None`` sentinel, then drains in-flight updates.
+
+        The heartbeat has its own task: it proves the event loop is alive even
+        while every slot is taken by slow turns.
+        """
+        loop = asyncio.get_running_loop()
+        slots = asyncio.Semaphore(self.concurrency)
+        tasks: set[asyncio.Task[None]] = set()
+        beats = asyncio.create_task(self._beat_forever())
+        log.info("shard.ready", shard=self.index)
+        while True:
+            # take the slot first: a worker never holds more updates than it is processing
+            await slots.acquire()
+            update = await loop.run_in_executor(None, self._receive)
+            if update is _IDLE:
+                slots.release()
+                continue
+            if update is None:
+                slots.release()
+                break
+            task = asyncio.create_task(self._feed(dispatcher, bot, update, slots))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+        await asyncio.gather(*tasks, return_exceptions=True)
+        beats.cancel()
+        await asyncio.gather(beats, return_exceptions=True)
+        log.info("shard.stopped", shard=self.index, processed=self.processed, failed=self.failed)
+
+
+def _worker_entry(
+    target: ShardTarget,
+    index: int,
+    inbox: Connection[Any, Optional[RawUpdate]],
+    heartbeats: Heartbeats,
+    concurrency: int,
+) -> None:
+    target(ShardChannel(index, inbox, heartbeats, concurrency=concurrency))
+
+
+@dataclass(slots=True)
+class _Worker:
+    index: int
+    backlog: asyncio.Queue[Optional[RawUpdate]]
+    reader: Connection[Any, Optional[RawUpdate]]
+    writer: Connection[Optional[RawUpdate], Any]
+    process: Optional[BaseProcess] = None
+    pump: Optional[asyncio.Task[None]] = None
+    started_at: float = 0.0
+    restarts: int = 0
+    failures: int = 0
+    next_start_at: float = 0.0
+    routed: int = 0
+    rejected_full: int = 0
+    last_exit: Optional[int] = field(default=None)
+
+
+class ShardSupervisor:
+    def __init__(
+        self,
+        target: ShardTarget,
+        *,
+        workers: int = 2,
+        queue_size: int = 1000,
+        concurrency: int = 16,
+        heartbeat_timeout_sec: float = 30.0,
+        startup_grace_sec: float = 60.0,
+        check_interval_sec: float = 1.0,
+        restart_backoff_sec: float = 1.0,
+        max_backoff_sec: float = 60.0,
+        put_timeout_sec: float = 5.0,
+        start_method: StartMethod = "spawn",
+    ) -> None:
+        self.target = target
+        self.concurrency = concurrency
+        self.heartbeat_timeout_sec = heartbeat_timeout_sec
+        self.startup_grace_sec = startup_grace_sec
+        self.check_interval_sec = check_interval_sec
+        self.restart_backoff_sec = restart_backoff_sec
+        self.max_backoff_sec = max_backoff_sec
+        self.put_timeout_sec = put_timeout_sec
+        self._ctx = _context(start_method)
+        self.heartbeats: Heartbeats = self._ctx.Array(ctypes.c_double, max(1, workers), lock=False)
+        self._workers: List[_Worker] = []
+        for i in range(max(1, workers)):
+            reader, writer = self._ctx.Pipe(duplex=False)
+            self._workers.append(_Worker(i, asyncio.Queue(maxsize=queue_size), reader, writer))
+        # blocking pipe writes; one thread per worker, so a stalled worker holds up only its own shard
+        self._senders = ThreadPoolExecutor(max_workers=len(self._workers), thread_name_prefix="aya-shard-send")
+        self._monitor: Optional[asyncio.Task[None]] = None
+
+    @property
+    def workers(self) -> int:
+        return len(self._workers)
+
+    # --- process management ----------------------------------------------
+
+    def _spawn(self, worker: _Worker) -> None:
+        self.heartbeats[worker.index] = 0.0
+        worker.process = self._ctx.Process(
+            target=_worker_entry,
+            args=(self.target, worker.index, worker.reader, self.heartbeats, self.concurrency),
+            name=f"aya-shard-{worker.index}",
+            daemon=True,
+        )
+        worker.process.start()
+        worker.started_at = time.time()
+        log.info("shard.spawned", shard=worker.index, pid=worker.process.pid, restarts=worker.restarts)
+
+    def start(self) -> None:
+        for worker in self._workers:
+            if worker.process is None:
+                self._spawn(worker)
+            if worker.pump is None:
+                worker.pump = asyncio.create_task(self._pump(worker))
+        if self._monitor is None or self._monitor.done():
+            self._monitor = asyncio.create_task(self._watch())
+
+    def _unhealthy(self, worker: _Worker, now: float) -> Optional[str]:
+        process = worker.process
+        if process is None:
+            return "missing"
+        if not process.is_alive():
+            worker.last_exit = process.exitcode
+            return f"exited:{process.exitcode}"
+        beat = self.heartbeats[worker.index]
+        if beat == 0.0:
+            return "startup_timeout" if now - worker.started_at > self.startup_grace_sec else None
+        if now - beat > self.heartbeat_timeout_sec:
+            return "heartbeat_stale"
+        return None
+
+    def check_once(self) -> List[int]:
+        """Restarts unhealthy workers whose backoff has elapsed; returns their indexes."""
+        now = time.time()
+        restarted = []
+        for worker in self._workers:
+            reason = self._unhealthy(worker, now)
+            if reason is None:
+                if worker.failures and now - worker.started_at > self.max_backoff_sec:
+                    worker.failures = 0  # stable again: the next crash restarts quickly
+                continue
+            if worker.next_start_at == 0.0:
+                delay = min(self.max_backoff_sec, self.restart_backoff_sec * (2 ** min(worker.failures, 16)))
+                worker.failures += 1
+                worker.next_start_at = now + delay
+                log.warning("shard.unhealthy", shard=worker.index, reason=reason, restart_in=round(delay, 2))
+                if worker.process is not None and worker.process.is_alive():
+                    worker.process.kill()
+            if now < worker.next_start_at:
+                continue
+            if worker.process is not None:
+                worker.process.join(timeout=1.0)
+            worker.restarts += 1
+            worker.next_start_at = 0.0
+            self._spawn(worker)
+            restarted.append(worker.index)
+        return restarted
+
+    async def _watch(self) -> None:
+        while True:
+            await asyncio.sleep(self.check_interval_sec)
+            try:
+                self.check_once()
+            except Exception:
+                log.exception("shard.watch_failed")
+
+    def ready(self) -> bool:
+        return all(self.heartbeats[w.index] > 0.0 for w in self._workers)
+
+    # --- routing -----------------------------------------------------------
+
+    async def _pump(self, worker: _Worker) -> None:
+        """Moves the backlog into the pipe; a send blocks (in a thread) while the worker is busy or down."""
+        loop = asyncio.get_running_loop()
+        while True:
+            update = await worker.backlog.get()
+            try:
+                await loop.run_in_executor(self._senders, worker.writer.send, update)
+            except OSError:
+                log.warning("shard.pipe_closed", shard=worker.index)
+                return
+            finally:
+                worker.backlog.task_done()
+            if update is None:
+                return
+
+    async def feed_raw_update(self, bot: Bot, update: RawUpdate) -> None:
+        """``Dispatcher``-compatible entry point, so ``WebhookIngress`` can route to shards."""
+        worker = self._workers[shard_of(user_id_of(update), len(self._workers))]
+        try:
+            async with asyncio.timeout(self.put_timeout_sec):
+                await worker.backlog.put(update)
+        except TimeoutError:
+            worker.rejected_full += 1
+            raise queue_mod.Full(f"shard {worker.index} backlog is full") from None
+        worker.routed += 1
+
+    async def poll(self, bot: Bot, allowed_updates: Optional[List[str]] = None, polling_timeout: int = 25) -> None:
+        """Long polling in the ingress process; updates are routed, never handled here."""
+        offset = None
+        while True:
+            try:
+                updates = await bot.get_updates(
+                    offset=offset, timeout=polling_timeout, allowed_updates=allowed_updates
+                )
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                log.exception("shard.poll_failed")
+                await asyncio.sleep(1.0)
+                continue
+            for update in updates:
+                try:
+                    await self.feed_raw_update(bot, update.model_dump(mode="json", by_alias=True, exclude_none=True))
+                except queue_mod.Full:
+                    # offset stays put: the next get_updates returns this update again, the
+                    # way Telegram re-delivers a webhook answered with 503
+                    log.warning("shard.backlog_full", update_id=update.update_id)
+                    break
+                offset = update.update_id + 1
+
+    # --- lifecycle ---------------------------------------------------------
+
+    async def stop(self, grace_sec: float = 10.0) -> None:
+        """Queues the stop sentinel behind each backlog, waits for workers to drain, kills stragglers."""
+        if self._monitor is not None:
+            self._monitor.cancel()
+            await asyncio.gather(self._monitor, return_exceptions=True)
+            self._monitor = None
+        loop = asyncio.get_running_loop()
+        running = [(w, w.process) for w in self._workers if w.process is not None]
+        try:
+            async with asyncio.timeout(grace_sec):
+                for worker, _ in running:
+                    await worker.backlog.put(None)
+                for _, process in running:
+                    await loop.run_in_executor(None, process.join)
+        except TimeoutError:
+            log.warning("shard.stop_timeout", left={w.index: w.backlog.qsize() for w, _ in running})
+        for worker in self._workers:
+            if worker.process is not None and worker.process.is_alive():
+                log.warning("shard.kill_on_stop", shard=worker.index)
+                worker.process.kill()
+                worker.process.join(timeout=1.0)
+            # with no reader left, a send still blocked on a full pipe fails and frees its thread
+            worker.reader.close()
+        pumps = [w.pump for w in self._workers if w.pump is not None]
+        for pump in pumps:
+            pump.cancel()
+        await asyncio.gather(*pumps, return_exceptions=True)
+        self._senders.shutdown(wait=True, cancel_futures=True)
+        for worker in self._workers:
+            worker.writer.close()
+
+    def snapshot(self) -> Dict[str, Any]:
+        now = time.time()
+        return {
+            "workers": [
+                {
+                    "shard": w.index,
+                    "pid": w.process.pid if w.process is not None else None,
+                    "alive": bool(w.process is not None and w.process.is_alive()),
+                    "heartbeat_age_sec": round(now - self.heartbeats[w.index], 1) if self.heartbeats[w.index] else None,
+                    "routed": w.routed,
+                    "rejected_full": w.rejected_full,
+                    "backlog": w.backlog.qsize(),
+                    "restarts": w.restarts,
+                    "last_exit": w.last_exit,
+                }
+                for w in self._workers
+            ]
+        }
@@ -0,0 +1,153 @@
+"""Webhook ingestion: an aiohttp endpoint in front of a bounded queue and a worker pool.
+
+The handler only validates and enqueues, so Telegram gets its answer in
+microseconds: 200 once the update is queued, 503 (with ``Retry-After``)
+once the queue is full. Telegram retries non-2xx deliveries, which turns a
+full queue into backpressure instead of dropped updates. Workers feed the
+queued updates to the dispatcher concurrently.
+
+Local check with a recorded update::
+
+    curl -X POST localhost:8080/telegram/webhook \\
+         -H 'Content-Type: application/json' \\
+         -d @tests/fixtures/telegram/message_update.json
+"""
+from __future__ import annotations
+
+import asyncio
+import hmac
+from dataclasses import asdict, dataclass
+from typing import Any, Dict, List, Optional, Protocol
+
+from aiogram import Bot
+from aiohttp import web
+
+from core.logging import get_logger
+
+log = get_logger("telegram.webhook")
+
+SECRET_HEADER = "X-Telegram-Bot-Api-Secret-Token"
+
+
+class UpdateFeeder(Protocol):
+    """Anything that takes raw updates like ``Dispatcher.feed_raw_update``."""
+
+    async def feed_raw_update(self, bot: Bot, update: Dict[str, Any]) -> Any: ...
+
+
+@dataclass(slots=True)
+class WebhookMetrics:
+    received: int = 0
+    accepted: int = 0
+    rejected_full: int = 0
+    rejected_bad: int = 0
+    processed: int = 0
+    failed: int = 0
+
+
+class WebhookIngress:
+    def __init__(
+        self,
+        dispatcher: UpdateFeeder,
+        bot: Bot,
+        *,
+        path: str = "/telegram/webhook",
+        queue_size: int = 1000,
+        workers: int = 8,
+        secret_token: Optional[str] = None,
+        retry_after_sec: int = 1,
+    ) -> None:
+        self.dispatcher = dispatcher
+        self.bot = bot
+        self.path = path
+        self.workers = max(1, workers)
+        self.secret_token = secret_token
+        self.retry_after_sec = retry_after_sec
+        self.metrics = WebhookMetrics()
+        self.queue: asyncio.Queue[Dict[str, Any]] = asyncio.Queue(maxsize=queue_size)
+        self._tasks: List[asyncio.Task[None]] = []
+
+    async def handle(self, request: web.Request) -> web.Response:
+        self.metrics.received += 1
+        if self.secret_token and not hmac.compare_digest(
+            request.headers.get(SECRET_HEADER, ""), self.secret_token
+        ):
+            self.metrics.rejected_bad += 1
+            return web.Response(status=403)
+        try:
+            update = await request.json()
+        except (ValueError, UnicodeDecodeError):
+            update = None
+        if not isinstance(update, dict) or "update_id" not in update:
+            self.metrics.rejected_bad += 1
+            return web.Response(status=400)
+        try:
+            self.queue.put_nowait(update)
+        except asyncio.QueueFull:
+            self.metrics.rejected_full += 1
+            log.warning("webhook.queue_full", update_id=update.get("update_id"), depth=self.queue.qsize())
+            return web.Response(status=503, headers={"Retry-After": str(self.retry_after_sec)})
+        self.metrics.accepted += 1
+        return web.Response(status=200)
+
+    async def health(self, _request: web.Request) -> web.Response:
+        return web.json_response(self.snapshot())
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {**asdict(self.metrics), "depth": self.queue.qsize(), "capacity": self.queue.maxsize}
+
+    async def _worker(self) -> None:
+        while True:
+            update = await self.queue.get()
+            try:
+                await self.dispatcher.feed_raw_update(self.bot, update)
+                self.metrics.processed += 1
+            except Exception:
+                self.metrics.failed += 1
+                log.exception("webhook.update_failed", update_id=update.get("update_id"))
+            finally:
+                self.queue.task_done()
+
+    def start(self) -> None:
+        if not self._tasks:
+            self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self, drain: bool = True, grace_sec: float = 10.0) -> None:
+        if drain and self._tasks:
+            try:
+                async with asyncio.timeout(grace_sec):
+                    await self.queue.join()
+            except TimeoutError:
+                log.warning("webhook.drain_timeout", left=self.queue.qsize())
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def make_app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_post(self.path, self.handle)
+        app.router.add_get("/healthz", self.health)
+
+        async def on_startup(_app: web.Application) -> None:
+            self.start()
+
+        async def on_cleanup(_app: web.Application) -> None:
+            await self.stop()
+
+        app.on_startup.append(on_startup)
+        app.on_cleanup.append(on_cleanup)
+        return app
+
+
+async def serve(ingress: WebhookIngress, host: str, port: int, stop_event: Optional[asyncio.Event] = None) -> None:
+    """Runs the webhook app until ``stop_event`` is set (or the task is cancelled)."""
+    runner = web.AppRunner(ingress.make_app())
+    await runner.setup()
+    site = web.TCPSite(runner, host, port)
+    await site.start()
+    log.info("webhook.listening", host=host, port=port, path=ingress.path, workers=ingress.workers)
+    try:
+        await (stop_event or asyncio.Event()).wait()
+    finally:
+        await runner.cleanup()
@@ -0,0 +1,134 @@
+"""OpenWeather adapter producing world-state payloads for :class:`WorldState`."""
+from __future__ import annotations
+
+import asyncio
+import time
+from collections import deque
+from datetime import datetime, timedelta, timezone
+from typing import Any, Deque, Dict, Iterable, Optional
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+import httpx
+
+from core.logging import get_logger
+from services.world_state import Location
+
+log = get_logger("weather.openweather")
+
+DEFAULT_BASE_URL = "https://api.openweathermap.org/data/2.5"
+
+# OpenWeather condition codes: 2xx thunderstorm, 3xx drizzle, 5xx rain.
+_RAINY_GROUPS = {2, 3, 5}
+
+
+class QuotaExceeded(RuntimeError):
+    """Raised when the request budget for the current window is spent."""
+
+
+class RequestQuota:
+    """Sliding-window request budget shared by every call of one fetcher."""
+
+    def __init__(self, max_requests: int, window_sec: float = 60.0) -> None:
+        self.max_requests = max_requests
+        self.window_sec = window_sec
+        self._sent: Deque[float] = deque()
+
+    def remaining(self, now: Optional[float] = None) -> int:
+        now = time.monotonic() if now is None else now
+        while self._sent and now - self._sent[0] >= self.window_sec:
+            self._sent.popleft()
+        return self.max_requests - len(self._sent)
+
+    def acquire(self) -> None:
+        now = time.monotonic()
+        if self.remaining(now) <= 0:
+            raise QuotaExceeded(f"weather quota of {self.max_requests}/{self.window_sec:g}s exhausted")
+        self._sent.append(now)
+
+
+def normalize_current(raw: Dict[str, Any], location: Location) -> Dict[str, Any]:
+    """Maps an OpenWeather ``/weather`` response to the world-state payload shape."""
+    main = raw.get("main") or {}
+    conditions = raw.get("weather") or [{}]
+    head = conditions[0] or {}
+    code = int(head.get("id") or 800)
+    temp = main.get("temp")
+    feels_like = main.get("feels_like")
+    return {
+        "city": location.city,
+        "tz": location.tz,
+        "local_time_iso": _local_time(location.tz, raw.get("timezone")),
+        "weather": {
+            "temp_c": round(float(temp), 1) if temp is not None else None,
+            "feels_like_c": round(float(feels_like), 1) if feels_like is not None else None,
+            "is_rainy": code // 100 in _RAINY_GROUPS,
+            "condition": str(head.get("main") or "").lower() or None,
+            "description": head.get("description"),
+            "humidity": main.get("humidity"),
+            "wind_mps": (raw.get("wind") or {}).get("speed"),
+        },
+        "source": "openweather",
+    }
+
+
+def _local_time(tz: str, offset_sec: Any) -> str:
+    try:
+        zone: Any = ZoneInfo(tz)
+    except (ZoneInfoNotFoundError, ValueError):
+        zone = timezone(timedelta(seconds=int(offset_sec or 0)))
+    return datetime.now(zone).isoformat(timespec="seconds")
+
+
+class OpenWeatherFetcher:
+    """Fetcher for ``WorldState(fetcher=...)`` backed by one pooled HTTP client.
+
+    Calling the instance fetches one location; :meth:`fetch_many` fetches a batch
+    concurrently over the shared connection pool. Every request draws from the
+    same :class:`RequestQuota`.
+    """
+
+    def __init__(
+        self,
+        api_key: str,
+        *,
+        base_url: str = DEFAULT_BASE_URL,
+        max_requests_per_min: int = 50,
+        concurrency: int = 4,
+        timeout: float = 10.0,
+        client: Optional[httpx.AsyncClient] = None,
+    ) -> None:
+        self.api_key = api_key
+        self.base_url = base_url.rstrip("/")
+        self.quota = RequestQuota(max_requests_per_min)
+        self._semaphore = asyncio.Semaphore(max(1, concurrency))
+        self._owns_client = client is None
+        self._client = client or httpx.AsyncClient(
+            timeout=timeout,
+            limits=httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency),
+        )
+
+    async def __call__(self, location: Location) -> Dict[str, Any]:
+        async with self._semaphore:
+            self.quota.acquire()
+            response = await self._client.get(
+                f"{self.base_url}/weather",
+                params={"q": location.city, "appid": self.api_key, "units": "metric", "lang": "ru"},
+            )
+        response.raise_for_status()
+        return normalize_current(response.json(), location)
+
+    async def fetch_many(self, locations: Iterable[Location]) -> Dict[Location, Dict[str, Any]]:
+        """Fetches a batch; failed or over-quota locations are left out of the result."""
+        unique = list(dict.fromkeys(locations))
+        results = await asyncio.gather(*(self(loc) for loc in unique), return_exceptions=True)
+        out: Dict[Location, Dict[str, Any]] = {}
+        for loc, result in zip(unique, results, strict=True):
+            if isinstance(result, BaseException):
+                log.warning("weather.fetch_failed", city=loc.city, error=str(result))
+                continue
+            out[loc] = result
+        return out
+
+    async def aclose(self) -> None:
+        if self._owns_client:
+            await self._client.aclose()
@@ -0,0 +1,38 @@
+"""Throughput of the lexicon emotion scorer and the per-user tracker.
+
+Run: python -m benchmarks.bench_emotion [corpus_size]
+"""
+from __future__ import annotations
+
+import sys
+import time
+
+from domain.reasoning.emotion import EmotionScorer, EmotionTracker, load_lexicon
+
+from .corpus import make_corpus
+
+
+def main(size: str = "200000") -> None:
+    messages = make_corpus(int(size))
+    scorer = EmotionScorer(load_lexicon("persona/lexicon.yml"))
+
+    t0 = time.perf_counter()
+    scorer.score_batch(messages)
+    cold = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    scored = scorer.score_batch(messages)
+    warm = time.perf_counter() - t0
+    print(f"score_batch cold: {len(messages) / cold:10,.0f} msg/s")
+    print(f"score_batch warm: {len(messages) / warm:10,.0f} msg/s")
+
+    tracker = EmotionTracker(scorer)
+    t0 = time.perf_counter()
+    labels = [tracker.update(i % 5000, text) for i, text in enumerate(messages)]
+    print(f"tracker.update:   {len(messages) / (time.perf_counter() - t0):10,.0f} msg/s (5000 users)")
+    emotional = sum(1 for s in scored if max(s) > 0)
+    print(f"messages with an emotion signal: {emotional / len(messages):.1%}, "
+          f"non-neutral labels: {sum(label != 'neutral' for label in labels) / len(labels):.1%}")
+
+
+if __name__ == "__main__":
+    main(*sys.argv[1:])
@@ -0,0 +1,77 @@
+"""Responses rendered per second by ``Humanizer.realize``.
+
+Compares the precompiled template registry with the previous path that
+called ``env.from_string`` (parse + compile) on every response.
+
+Run: python -m benchmarks.bench_humanizer [n_responses]
+"""
+from __future__ import annotations
+
+import random
+import sys
+import time
+from typing import Any, Dict, List, Sequence
+
+from dialogue.humanizer import Humanizer
+from dialogue.playbooks import DEFAULT_KEY, load_playbooks
+from domain.reasoning.models import DialoguePlan
+
+INTENTS = ["greeting", "weather", "time", "memory_query", "sos", "smalltalk", "flirt", "plan", "unknown"]
+PERSONA = {"identity": {"name": "Ая", "city": "Санкт-Петербург"}}
+WORLD = {"city": "Санкт-Петербург", "local_time_iso": "2024-05-01T18:30:00", "weather": {"temp_c": 12.4, "is_rainy": True}}
+FACTS = [{"predicate": "age", "object": "27", "confidence": 0.9}]
+PROFILE = {"display_name": "Маша"}
+
+
+def make_plans(n: int, seed: int = 3) -> List[DialoguePlan]:
+    rng = random.Random(seed)
+    return [
+        DialoguePlan(
+            intent=rng.choice(INTENTS),
+            tone="warm",
+            emotion="curious",
+            register="casual",
+            response_length="medium",
+            follow_up_strategy=rng.choice(["adaptive", "ask_name", "light_follow_up"]),
+            style_mods={"variation": rng.randint(1, 3), "imagery": rng.choice(["indoors", None])},
+        )
+        for _ in range(n)
+    ]
+
+
+class LegacyHumanizer(Humanizer):
+    """Old hot path: template source looked up per call and compiled with ``from_string``."""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.playbooks = load_playbooks(self.playbooks_path)
+
+    def realize(  # type: ignore[override]
+        self,
+        plan: DialoguePlan,
+        *,
+        persona: Dict[str, Any],
+        memory_facts: Sequence[Dict[str, Any]],
+        world: Dict[str, Any],
+        user_profile: Dict[str, Any],
+    ) -> str:
+        options = self.playbooks.get(plan.intent, self.playbooks[DEFAULT_KEY])
+        variation = plan.style_mods.get("variation", 2)
+        source = options[0] if variation <= 1 or len(options) == 1 else random.choice(options[: min(len(options), variation)])
+        context = self._build_context(plan, persona, memory_facts, world, user_profile)
+        return self.env.from_string(source).render(**context).strip()
+
+
+def main(n_responses: str = "20000") -> None:
+    plans = make_plans(int(n_responses))
+    for name, humanizer in (("legacy", LegacyHumanizer()), ("registry", Humanizer())):
+        runs = plans if name == "registry" else plans[: len(plans) // 10]
+        t0 = time.perf_counter()
+        for plan in runs:
+            humanizer.realize(plan, persona=PERSONA, memory_facts=FACTS, world=WORLD, user_profile=PROFILE)
+        rate = len(runs) / (time.perf_counter() - t0)
+        print(f"{name:9s}: {rate:10.0f} responses/s")
+
+
+if __name__ == "__main__":
+    main(*sys.argv[1:])
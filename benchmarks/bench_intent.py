@@ -0,0 +1,72 @@
+"""Throughput of the single-pass intent matcher versus the sequential-regex original.
+
+Run: python -m benchmarks.bench_intent [corpus_size]
+"""
+from __future__ import annotations
+
+import sys
+import time
+from typing import Any, Callable, List
+
+from domain.reasoning import intent_classifier as ic
+from domain.reasoning.intent_classifier import IntentResult, classify_batch, classify_intent
+
+from .corpus import make_corpus
+
+
+def legacy_classify_intent(text: str) -> IntentResult:
+    """The original implementation: up to ten regex searches in priority order."""
+    if not text:
+        return IntentResult("unknown", 0.0)
+    lower = text.strip().lower()
+    if ic._SOS_RE.search(lower):
+        return IntentResult("sos", 0.9)
+    if ic._WEATHER_RE.search(lower):
+        return IntentResult("weather", 0.85)
+    if ic._TIME_RE.search(lower):
+        return IntentResult("time", 0.8)
+    if ic._DATE_RE.search(lower):
+        return IntentResult("date", 0.7)
+    if ic._MEMORY_RE.search(lower):
+        return IntentResult("memory_query", 0.75)
+    if ic._FLIRT_RE.search(lower):
+        return IntentResult("flirt", 0.6)
+    if ic._NEWS_RE.search(lower):
+        return IntentResult("news", 0.7)
+    if ic._PLAN_RE.search(lower):
+        return IntentResult("plan", 0.6)
+    if ic._GREETING_RE.search(lower):
+        return IntentResult("greeting", 0.6)
+    if ic._FAREWELL_RE.search(lower):
+        return IntentResult("farewell", 0.6)
+    if len(lower) <= 3:
+        return IntentResult("smalltalk", 0.3)
+    return IntentResult("smalltalk", 0.4)
+
+
+def _rate(fn: Callable[[List[str]], Any], corpus: List[str], repeat: int = 3) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(corpus)
+        best = min(best, time.perf_counter() - start)
+    return len(corpus) / best
+
+
+def main(size: int = 50000) -> None:
+    corpus = make_corpus(size)
+    expected = [legacy_classify_intent(t) for t in corpus]
+    assert [classify_intent(t) for t in corpus] == expected, "single-pass matcher diverged"
+    assert classify_batch(corpus) == expected, "classify_batch diverged"
+
+    legacy = _rate(lambda c: [legacy_classify_intent(t) for t in c], corpus)
+    single = _rate(lambda c: [classify_intent(t) for t in c], corpus)
+    batch = _rate(classify_batch, corpus)
+    print(f"corpus={size} identical_outputs=True")
+    print(f"legacy sequential : {legacy:12,.0f} msg/s")
+    print(f"classify_intent   : {single:12,.0f} msg/s  ({single / legacy:.2f}x)")
+    print(f"classify_batch    : {batch:12,.0f} msg/s  ({batch / legacy:.2f}x)")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 50000)
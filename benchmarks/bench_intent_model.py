@@ -0,0 +1,45 @@
+"""Latency and throughput of the NumPy intent model.
+
+Run: python -m benchmarks.bench_intent_model [corpus.jsonl]
+"""
+from __future__ import annotations
+
+import statistics
+import sys
+import time
+
+from domain.reasoning.statistical_classifier import HybridIntentClassifier, load_corpus, train
+
+from .corpus import make_corpus
+
+
+def main(corpus_path: str = "data/intent_corpus.jsonl") -> None:
+    texts, labels = load_corpus(corpus_path)
+    start = time.perf_counter()
+    model = train(texts, labels)
+    print(f"train: {len(texts)} examples in {time.perf_counter() - start:.2f}s, T={model.temperature:.2f}")
+
+    messages = make_corpus(20000)
+    samples = []
+    for text in messages[:2000]:
+        t0 = time.perf_counter()
+        model.predict_proba([text])
+        samples.append((time.perf_counter() - t0) * 1e6)
+    samples.sort()
+    print(f"single message: p50={statistics.median(samples):.0f}us p99={samples[int(len(samples) * 0.99)]:.0f}us")
+
+    for batch in (32, 256, 2048):
+        t0 = time.perf_counter()
+        for i in range(0, len(messages), batch):
+            model.predict_proba(messages[i : i + batch])
+        rate = len(messages) / (time.perf_counter() - t0)
+        print(f"batch={batch:5d}: {rate:10,.0f} msg/s")
+
+    hybrid = HybridIntentClassifier(model)
+    t0 = time.perf_counter()
+    hybrid.classify_batch(messages)
+    print(f"hybrid classify_batch: {len(messages) / (time.perf_counter() - t0):10,.0f} msg/s")
+
+
+if __name__ == "__main__":
+    main(*sys.argv[1:])
@@ -0,0 +1,115 @@
+"""Per-plan latency of DecisionEngine at large synthetic rule counts.
+
+Compares the compiled, intent-indexed evaluation with the previous
+evaluate-every-rule loop (``applies_to`` + ``dataclasses.asdict``).
+
+Run: python -m benchmarks.bench_policies [n_rules]
+"""
+from __future__ import annotations
+
+import random
+import sys
+import time
+from dataclasses import asdict
+from typing import Any, Dict, List
+
+from domain.policies.models import PolicyBundle, PolicyCondition, PolicyEffect, PolicyRule
+from domain.reasoning.decision_engine import DecisionEngine
+from domain.reasoning.models import DialoguePlan, ReasoningContext
+
+INTENTS = [f"intent_{i}" for i in range(60)] + ["smalltalk", "greeting", "weather", "time", "flirt", "sos"]
+EMOTIONS = ["neutral", "joy", "sadness", "anger", "anxiety", "fatigue"]
+WEATHER = ["rainy", "clear", "unknown"]
+TOD = ["morning", "day", "evening", "night"]
+TONES = ["warm", "cozy", "playful", "supportive", "calm"]
+
+
+def make_rules(n: int, seed: int = 1) -> List[PolicyRule]:
+    rng = random.Random(seed)
+    rules = []
+    for i in range(n):
+        when: Dict[str, Any] = {}
+        if rng.random() < 0.9:
+            when["intents"] = rng.sample(INTENTS, rng.randint(1, 3))
+        if rng.random() < 0.3:
+            when["min_affinity"] = rng.randint(0, 3)
+        if rng.random() < 0.2:
+            when["emotions"] = rng.sample(EMOTIONS, 2)
+        if rng.random() < 0.2:
+            when["weather"] = [rng.choice(WEATHER)]
+        if rng.random() < 0.2:
+            when["time_of_day"] = rng.sample(TOD, 2)
+        if rng.random() < 0.1:
+            when["memory_tags"] = [rng.choice(["age", "name", "location", "intolerance"])]
+        if rng.random() < 0.05:
+            when["require_adult"] = True
+        effect = PolicyEffect(
+            tone=rng.choice(TONES),
+            content_goals=[f"goal_{rng.randint(0, 30)}"],
+            style_mods={"variation": rng.randint(1, 5)},
+        )
+        rules.append(PolicyRule(f"r{i}", "", rng.randint(0, 300), PolicyCondition(**when), effect))
+    rules.sort(key=lambda r: r.priority, reverse=True)
+    return rules
+
+
+def make_contexts(n: int, seed: int = 2) -> List[ReasoningContext]:
+    rng = random.Random(seed)
+    return [
+        ReasoningContext(
+            user_message="",
+            persona={},
+            world_state={},
+            memory_facts=(),
+            chat_history=(),
+            intent=rng.choice(INTENTS),
+            user_emotion=rng.choice(EMOTIONS),
+            affinity=rng.randint(0, 4),
+            closeness=rng.randint(0, 4),
+            adult_confirmed=rng.random() < 0.5,
+            flirt_level="off",
+            persona_traits=("warm", "Санкт-Петербург"),
+            memory_tags=tuple(rng.sample(["age", "name", "location"], 2)),
+            time_of_day=rng.choice(TOD),
+            weather_condition=rng.choice(WEATHER),
+        )
+        for _ in range(n)
+    ]
+
+
+def legacy_plan(engine: DecisionEngine, ctx: ReasoningContext) -> DialoguePlan:
+    policy_ctx = ctx.as_policy_context()
+    policy_ctx["persona_traits"] = list(ctx.persona_traits)
+    policy_ctx["memory_tags"] = list(ctx.memory_tags)
+    plan = engine._base_plan(ctx)
+    for rules in (engine.bundle.content, engine.bundle.style, engine.bundle.safety):
+        for rule in rules:
+            if rule.applies_to(policy_ctx):
+                plan.apply_effect(rule.id, asdict(rule.effect))
+    return plan
+
+
+def main(n_rules: str = "10000") -> None:
+    n = int(n_rules)
+    rules = make_rules(n)
+    third = n // 3
+    bundle = PolicyBundle(content=rules[:third], style=rules[third : 2 * third], safety=rules[2 * third :])
+    t0 = time.perf_counter()
+    engine = DecisionEngine(bundle)
+    print(f"{n} rules compiled in {(time.perf_counter() - t0) * 1000:.1f}ms")
+    contexts = make_contexts(2000)
+
+    import logging
+
+    logging.disable(logging.DEBUG)
+    for name, fn in (("legacy", lambda c: legacy_plan(engine, c)), ("compiled", engine.plan)):
+        runs = contexts if name == "compiled" else contexts[:200]
+        t0 = time.perf_counter()
+        for ctx in runs:
+            fn(ctx)
+        per_plan = (time.perf_counter() - t0) / len(runs) * 1e6
+        print(f"{name:9s}: {per_plan:10.1f} us/plan")
+
+
+if __name__ == "__main__":
+    main(*sys.argv[1:])
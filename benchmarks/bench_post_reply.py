@@ -0,0 +1,114 @@
+"""Reply latency of ``AyaBrain.respond`` with inline writes vs the post-reply pipeline.
+
+Latency is measured up to the moment the reply text is available (what the
+handler waits for before ``message.answer``). Turns arrive ``gap_ms`` apart
+(users do not type back-to-back); with ``gap_ms=0`` the deferred writes
+compete with the next turn for the single SQLite connection and the
+comparison shows that cost instead. The deferred run also reports how long
+the pipeline took to drain afterwards.
+
+Run: python -m benchmarks.bench_post_reply [turns] [users] [gap_ms]
+"""
+# mypy: ignore-errors
+from __future__ import annotations
+
+import asyncio
+import logging
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import List, Optional
+
+import structlog
+
+from domain.memory.manager import MemoryManager
+from domain.persona.service import PersonaService
+from domain.policies.loader import load_policy_bundle
+from domain.reasoning.decision_engine import DecisionEngine
+from domain.world_state.service import WorldStateService
+from memory.chat_history import ChatHistoryRepo
+from memory.facts_repo import FactsRepo
+from memory.repo import MemoryRepo
+from orchestrator.aya_brain import AyaBrain
+from orchestrator.post_reply import PostReplyPipeline
+from services.world_state import WorldState
+from storage.db import DB
+
+MESSAGES = [
+    "привет",
+    "меня зовут Маша",
+    "мне 27 и я живу в казани",
+    "какая сегодня погода?",
+    "у меня непереносимость лактозы",
+    "что ты помнишь обо мне?",
+    "я люблю слушать Земфиру",
+    "как дела?",
+]
+
+
+class _SilentLLM:
+    async def health_check(self):
+        return False, "bench"
+
+
+async def _world(location=None):
+    return {
+        "city": "Санкт-Петербург",
+        "local_time_iso": "2024-05-01T18:30:00+03:00",
+        "weather": {"temp_c": 12, "is_rainy": False},
+    }
+
+
+async def _run(
+    path: Path, turns: int, users: int, gap_ms: int, post_reply: Optional[PostReplyPipeline]
+) -> List[float]:
+    db = DB(path)
+    await db.connect()
+    memory_repo = MemoryRepo(db)
+    facts_repo = FactsRepo(db)
+    memory_manager = MemoryManager(memory_repo, facts_repo, ChatHistoryRepo(db))
+    brain = AyaBrain(
+        _SilentLLM(),
+        memory_repo,
+        memory_manager,
+        WorldStateService(WorldState(db=db, fetcher=_world, ttl_sec=3600)),
+        PersonaService(),
+        DecisionEngine(load_policy_bundle(Path("policies"))),
+        facts_repo,
+        post_reply=post_reply,
+    )
+    latencies = []
+    try:
+        for i in range(turns):
+            t0 = time.perf_counter()
+            await brain.respond(1000 + i % users, MESSAGES[i % len(MESSAGES)])
+            latencies.append((time.perf_counter() - t0) * 1000)
+            await asyncio.sleep(gap_ms / 1000)
+        if post_reply is not None:
+            t0 = time.perf_counter()
+            await post_reply.stop(drain=True)
+            print(f"  drain after run: {(time.perf_counter() - t0) * 1000:.1f} ms, {post_reply.snapshot()}")
+    finally:
+        await db.close()
+    return latencies
+
+
+def _report(name: str, latencies: List[float]) -> None:
+    ordered = sorted(latencies)
+    p95 = ordered[int(len(ordered) * 0.95) - 1]
+    print(f"{name:9s}: p50={statistics.median(ordered):6.2f} ms  p95={p95:6.2f} ms  mean={statistics.fmean(ordered):6.2f} ms")
+
+
+async def main(turns: int = 400, users: int = 20, gap_ms: int = 5) -> None:
+    structlog.configure(wrapper_class=structlog.make_filtering_bound_logger(logging.WARNING))
+    with tempfile.TemporaryDirectory() as tmp:
+        inline = await _run(Path(tmp) / "inline.db", turns, users, gap_ms, None)
+        _report("inline", inline)
+        deferred = await _run(Path(tmp) / "deferred.db", turns, users, gap_ms, PostReplyPipeline())
+        _report("deferred", deferred)
+
+
+if __name__ == "__main__":
+    asyncio.run(main(*(int(a) for a in sys.argv[1:4])))
@@ -0,0 +1,130 @@
+"""Turn throughput of the sharded supervisor mode versus worker count.
+
+Every worker process builds its own ``AyaBrain`` on one shared, file-backed
+SQLite database (WAL, ``busy_timeout``) and handles the updates routed to it
+by ``tg_user_id``. Telegram itself is not involved: the worker feeds updates
+straight into ``AyaBrain.respond``. Worker start-up is excluded from the
+timing, and the clock stops once every worker has drained its queue.
+
+Scaling is bounded by the number of cores (``os.cpu_count()``) and by the
+single SQLite writer. Near-linear speed-up has NOT been shown: on a 1-core
+host 1 worker gives about 620 turns/s and 2 workers about 450 (negative
+scaling); multi-core hosts have not been measured.
+
+Run: python -m benchmarks.bench_sharding [updates] [users] [workers,...]
+"""
+# mypy: ignore-errors
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import List
+
+import structlog
+
+from adapters.telegram.sharding import ShardChannel, ShardSupervisor, user_id_of
+from benchmarks.bench_post_reply import MESSAGES, _SilentLLM, _world
+from domain.memory.manager import MemoryManager
+from domain.persona.service import PersonaService
+from domain.policies.loader import load_policy_bundle
+from domain.reasoning.decision_engine import DecisionEngine
+from domain.world_state.service import WorldStateService
+from memory.chat_history import ChatHistoryRepo
+from memory.facts_repo import FactsRepo
+from memory.repo import MemoryRepo
+from orchestrator.aya_brain import AyaBrain
+from orchestrator.post_reply import PostReplyPipeline
+from services.world_state import WorldState
+from storage.db import DB
+
+DB_ENV = "AYA_BENCH_SHARD_DB"
+
+
+def _quiet() -> None:
+    structlog.configure(wrapper_class=structlog.make_filtering_bound_logger(logging.WARNING))
+
+
+class _BrainDispatcher:
+    def __init__(self, brain: AyaBrain) -> None:
+        self.brain = brain
+
+    async def feed_raw_update(self, bot, update) -> None:
+        await self.brain.respond(user_id_of(update), update["message"]["text"])
+
+
+async def _serve(channel: ShardChannel) -> None:
+    db = DB(os.environ[DB_ENV], autocommit=True)
+    await db.connect()
+    memory_repo = MemoryRepo(db)
+    facts_repo = FactsRepo(db)
+    post_reply = PostReplyPipeline()
+    brain = AyaBrain(
+        _SilentLLM(),
+        memory_repo,
+        MemoryManager(memory_repo, facts_repo, ChatHistoryRepo(db)),
+        WorldStateService(WorldState(db=db, fetcher=_world, ttl_sec=3600)),
+        PersonaService(refresh_sec=0),
+        DecisionEngine(load_policy_bundle(Path("policies"))),
+        facts_repo,
+        post_reply=post_reply,
+    )
+    try:
+        await channel.serve(_BrainDispatcher(brain), None)
+        await post_reply.stop(drain=True, grace_sec=600)
+    finally:
+        await db.close()
+
+
+def bench_worker(channel: ShardChannel) -> None:
+    _quiet()
+    asyncio.run(_serve(channel))
+
+
+def _updates(n: int, users: int) -> List[dict]:
+    return [
+        {"update_id": i, "message": {"from": {"id": 1000 + i % users}, "text": MESSAGES[i % len(MESSAGES)]}}
+        for i in range(n)
+    ]
+
+
+async def _run(db_path: Path, workers: int, updates: List[dict]) -> float:
+    os.environ[DB_ENV] = str(db_path)
+    db = DB(db_path)
+    await db.connect()  # schema once, before the workers race for it
+    await FactsRepo(db).get_all(0, limit=1)
+    await db.close()
+    supervisor = ShardSupervisor(bench_worker, workers=workers, queue_size=len(updates) + 1, concurrency=8)
+    supervisor.start()
+    deadline = time.monotonic() + 60
+    while not supervisor.ready():
+        if time.monotonic() > deadline:
+            raise RuntimeError("workers did not start")
+        await asyncio.sleep(0.05)
+    t0 = time.perf_counter()
+    for update in updates:
+        await supervisor.feed_raw_update(None, update)
+    await supervisor.stop(grace_sec=600)
+    return len(updates) / (time.perf_counter() - t0)
+
+
+async def main(n_updates: int = 4000, users: int = 200, worker_counts: str = "") -> None:
+    _quiet()
+    counts = [int(c) for c in worker_counts.split(",") if c] or sorted({1, 2, 4, os.cpu_count() or 1})
+    updates = _updates(n_updates, users)
+    print(f"cpu_count={os.cpu_count()} updates={n_updates} users={users}")
+    base = None
+    with tempfile.TemporaryDirectory() as tmp:
+        for workers in counts:
+            rate = await _run(Path(tmp) / f"shard{workers}.db", workers, updates)
+            base = base or rate
+            print(f"workers={workers:2d}: {rate:8.0f} turns/s  speed-up x{rate / base:.2f}")
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    asyncio.run(main(*(int(a) for a in args[:2]), *args[2:3]))
@@ -0,0 +1,43 @@
+"""Deterministic synthetic message corpus shared by the benchmarks."""
+from __future__ import annotations
+
+import random
+from typing import List
+
+_OPENERS = ["", "слушай, ", "ну ", "эй, ", "а ", "кстати, "]
+_TEMPLATES = [
+    "привет{p}",
+    "добрый вечер{p}",
+    "какая погода сегодня{p}",
+    "что по погоде на выходные{p}",
+    "который час{p}",
+    "сколько сейчас времени{p}",
+    "какое число{p}",
+    "что ты помнишь обо мне{p}",
+    "давай флирт{p}",
+    "добавь романтики{p}",
+    "что делать вечером{p}",
+    "куда сходить в субботу{p}",
+    "мне плохо{p}",
+    "я не справляюсь с работой{p}",
+    "пока{p}",
+    "спокойной ночи{p}",
+    "меня зовут Алексей и мне 31{p}",
+    "живу в калуге, у меня непереносимость лактозы{p}",
+    "сегодня был отличный день, я так рада{p}",
+    "устал после смены, ничего не хочется{p}",
+    "просто поговорим о музыке и фильмах{p}",
+    "расскажи что-нибудь интересное про петербург{p}",
+    "ага{p}",
+    "ок{p}",
+]
+_TAILS = ["", "?", "!", " :)", ", как думаешь?", " очень интересно", ". я тут подумала о разном"]
+
+
+def make_corpus(size: int = 20000, seed: int = 7) -> List[str]:
+    rng = random.Random(seed)
+    out: List[str] = []
+    for _ in range(size):
+        text = rng.choice(_OPENERS) + rng.choice(_TEMPLATES).format(p=rng.choice(_TAILS))
+        out.append(text.capitalize() if rng.random() < 0.3 else text)
+    return out
@@ -1,12 +1,46 @@
 # mypy: ignore-errors
 # bot/middlewares/user_context.py
+from collections import OrderedDict
 from aiogram import BaseMiddleware
 from typing import Callable, Dict, Any, Awaitable
 
 class UserContextMiddleware(BaseMiddleware):
-    def __init__(self, memory_repo):
+    """
+    Регистрирует пользователя в users. UPSERT + commit делаем только когда
+    пользователь впервые встретился процессу или поменял username/имя/локаль:
+    держим LRU tg_user_id -> хэш профиля на max_users записей.
+    """
+
+    def __init__(self, memory_repo, max_users: int = 50000):
         super().__init__()
         self.memory = memory_repo
+        self.max_users = max_users
+        self._seen: "OrderedDict[int, int]" = OrderedDict()
+        self.writes = 0
+        self.writes_avoided = 0
+
+    async def _ensure_user(self, m) -> None:
+        locale = getattr(m, "language_code", None)
+        digest = hash((m.username, m.first_name, m.last_name, locale))
+        if self._seen.get(m.id) == digest:
+            self._seen.move_to_end(m.id)
+            self.writes_avoided += 1
+            return
+        await self.memory.ensure_user(
+            tg_user_id=m.id,
+            username=m.username,
+            first=m.first_name,
+            last=m.last_name,
+            locale=locale,
+        )
+        self.writes += 1
+        self._seen[m.id] = digest
+        self._seen.move_to_end(m.id)
+        if len(self._seen) > self.max_users:
+            self._seen.popitem(last=False)
+
+    def snapshot(self) -> Dict[str, int]:
+        return {"cached_users": len(self._seen), "writes": self.writes, "writes_avoided": self.writes_avoided}
 
     async def __call__(self,
                        handler: Callable[[Any, Dict[str, Any]], Awaitable[Any]],
@@ -15,12 +49,7 @@ class UserContextMiddleware(BaseMiddleware):
         # Регистрация/обновление пользователя
         m = getattr(event, "from_user", None) or data.get("event_from_user")
         if m:
-            await self.memory.ensure_user(
-                tg_user_id=m.id,
-                username=m.username,
-                first=m.first_name,
-                last=m.last_name,
-                locale=getattr(m, "language_code", None),
-            )
+            await self._ensure_user(m)
             data["tg_user_id"] = m.id
+        data["user_context"] = self
         return await handler(event, data)
@@ -4,7 +4,12 @@ from __future__ import annotations
 from aiogram import Router, types, F
 from aiogram.filters import Command, CommandStart
 
+from core.settings import settings
+from adapters.telegram.outbox import OutboxClosed, OutboxFull, SendScheduler
+from bot.middlewares.user_context import UserContextMiddleware
+from domain.world_state.service import WorldStateService
 from orchestrator.aya_brain import AyaBrain
+from orchestrator.mailbox import UserMailboxes
 from memory.repo import MemoryRepo
 
 router = Router(name="basic")
@@ -24,7 +29,10 @@ async def cmd_start(message: types.Message, aya_brain: AyaBrain, memory_repo: Me
 
 @router.message(Command("help"))
 async def cmd_help(message: types.Message) -> None:
-    await message.answer("Я рядом, чтобы обсудить настроение, планы, погоду или просто поболтать.")
+    await message.answer(
+        "Я рядом, чтобы обсудить настроение, планы, погоду или просто поболтать. "
+        "Свой город для погоды и времени можно указать командой /city."
+    )
 
 
 @router.message(Command("me"))
@@ -40,8 +48,42 @@ async def cmd_me(message: types.Message, memory_repo: MemoryRepo, tg_user_id: in
     await message.answer("\n".join(lines))
 
 
+@router.message(Command("city"))
+async def cmd_city(
+    message: types.Message, memory_repo: MemoryRepo, world_state: WorldStateService, tg_user_id: int
+) -> None:
+    # /city — текущий город, /city Новосибирск Asia/Novosibirsk — сменить, /city - — сбросить
+    arg = (message.text or "").partition(" ")[2].strip()
+    if not arg:
+        city, tz = await memory_repo.get_user_location(tg_user_id)
+        location = world_state.location_for(city, tz)
+        suffix = "" if city else " (по умолчанию)"
+        await message.answer(f"Город: {location.city}, часовой пояс {location.tz}{suffix}")
+        return
+    if arg == "-":
+        await memory_repo.set_user_location(tg_user_id, None)
+        await message.answer(f"Вернулась к городу по умолчанию: {world_state.default_location.city}")
+        return
+    city, _, tz = arg.rpartition(" ")
+    if "/" not in tz:
+        city, tz = arg, ""
+    location = world_state.location_for(city, tz or None)
+    if tz and location.tz != tz:
+        await message.answer(f"Не знаю часовой пояс {tz}. Пример: /city Новосибирск Asia/Novosibirsk")
+        return
+    await memory_repo.set_user_location(tg_user_id, location.city, tz or None)
+    await message.answer(f"Запомнила: {location.city}, часовой пояс {location.tz}")
+
+
 @router.message(Command("aya_diag"))
-async def cmd_diag(message: types.Message, aya_brain: AyaBrain, tg_user_id: int) -> None:
+async def cmd_diag(
+    message: types.Message,
+    aya_brain: AyaBrain,
+    tg_user_id: int,
+    user_context: UserContextMiddleware | None = None,
+    mailboxes: UserMailboxes | None = None,
+    outbox: SendScheduler | None = None,
+) -> None:
     diag = await aya_brain.diagnostics(tg_user_id)
     lines = ["Диагностика:"]
     metrics = diag.get("metrics", {})
@@ -50,9 +92,90 @@ async def cmd_diag(message: types.Message, aya_brain: AyaBrain, tg_user_id: int)
         + ", ".join(f"{k}={v}" for k, v in metrics.items())
     )
     persona_traits = ", ".join(diag.get("persona_traits", []))
-    lines.append(f"persona_traits: {persona_traits}")
+    lines.append(f"persona_traits: {persona_traits} (v{diag.get('persona_version')})")
     llm = diag.get("llm", {})
     lines.append(f"llm: ok={llm.get('ok')} note={llm.get('note')}")
+    if "cache_hit_rate" in llm:
+        lines.append(f"llm_cache: hit_rate={llm['cache_hit_rate']} bypassed={llm.get('cache_bypassed')}")
+    if "facts" in llm:
+        facts = llm["facts"]
+        lines.append(
+            f"llm_facts: batches={facts['batches']} accepted={facts['facts_accepted']} "
+            f"avg_ms={facts['avg_latency_ms']} cost=${facts['cost_usd']}"
+        )
+    plan_cache = diag.get("plan_cache")
+    if plan_cache:
+        lines.append(
+            f"plan_cache: hit_rate={plan_cache['hit_rate']} entries={plan_cache['entries']} "
+            f"bundle_v={plan_cache['bundle_version']}"
+        )
+    policy_errors = diag.get("policy_errors") or []
+    if policy_errors:
+        lines.append(f"policies: перезагрузка отклонена, работает прежний набор ({len(policy_errors)} ошибок)")
+        lines.extend(f"  - {err}" for err in policy_errors[:5])
+    playbooks = diag.get("playbooks")
+    if playbooks:
+        lines.append(f"playbooks: v={playbooks['version']} templates={playbooks['templates']}")
+        if playbooks["errors"]:
+            lines.append(f"playbooks: перезагрузка отклонена ({len(playbooks['errors'])} ошибок)")
+            lines.extend(f"  - {err}" for err in playbooks["errors"][:5])
+    if user_context is not None:
+        seen = user_context.snapshot()
+        lines.append(
+            f"users: cached={seen['cached_users']} writes={seen['writes']} avoided={seen['writes_avoided']}"
+        )
+    if mailboxes is not None:
+        box = mailboxes.snapshot()
+        lines.append(
+            f"mailboxes: open={box['mailboxes']} turns={box['turns']} coalesced={box['coalesced']} "
+            f"peak_active={box['peak_active']}"
+        )
+    if outbox is not None:
+        out = outbox.snapshot()
+        lines.append(
+            f"outbox: depth={out['depth']} sent={out['sent']} retry_after={out['retry_after']} "
+            f"parked={out['parked_chats']} lag_ms avg={out['lag_ms_avg']} max={out['lag_ms_max']}"
+        )
+    post_reply = diag.get("post_reply")
+    if post_reply:
+        lines.append(
+            f"post_reply: depth={post_reply['depth']} done={post_reply['completed']} retried={post_reply['retried']} "
+            f"failed={post_reply['failed']} max_lag_ms={post_reply['max_lag_ms']}"
+        )
+    extractors = diag.get("extractors", {})
+    if extractors:
+        lines.append(
+            "extractors: "
+            + ", ".join(f"{name}={s.get('hits', s.get('messages'))}/{s['ms']}ms" for name, s in extractors.items())
+        )
+    await message.answer("\n".join(lines))
+
+
+@router.message(Command("aya_trace"))
+async def cmd_trace(message: types.Message, aya_brain: AyaBrain, tg_user_id: int) -> None:
+    if tg_user_id not in settings.admin_ids and not settings.is_diag:
+        return
+    tracer = aya_brain.decision_engine.tracer
+    if tracer is None:
+        await message.answer("Трассировка выключена (POLICY_TRACE=0).")
+        return
+    arg = (message.text or "").partition(" ")[2].strip()
+    if arg == "dump":
+        written = tracer.dump_jsonl(settings.POLICY_TRACE_PATH)
+        await message.answer(f"Записано {written} трасс в {settings.POLICY_TRACE_PATH}")
+        return
+    limit = min(max(int(arg), 1), tracer.capacity) if arg.isdigit() else 5
+    traces = tracer.recent(limit)
+    if not traces:
+        await message.answer("Трасс пока нет.")
+        return
+    lines = [f"Последние решения (записано всего {tracer.recorded}):"]
+    for trace in traces:
+        changed = ", ".join(f"{rule}.{field}" for rule, field, _ in trace.changes) or "—"
+        lines.append(
+            f"{trace.intent} v{trace.bundle_version}: {len(trace.considered)} кандидатов, "
+            f"сработали {', '.join(trace.matched) or '—'}; изменили {changed}"
+        )
     await message.answer("\n".join(lines))
 
 
@@ -68,7 +191,28 @@ async def cmd_health(message: types.Message, aya_brain: AyaBrain, tg_user_id: in
 
 
 @router.message(F.text)
-async def all_text(message: types.Message, aya_brain: AyaBrain, tg_user_id: int) -> None:
+async def all_text(
+    message: types.Message,
+    aya_brain: AyaBrain,
+    tg_user_id: int,
+    mailboxes: UserMailboxes | None = None,
+    outbox: SendScheduler | None = None,
+) -> None:
     user_text = message.text or ""
-    response = await aya_brain.respond(tg_user_id, user_text)
+    if mailboxes is None:
+        response = await aya_brain.respond(tg_user_id, user_text)
+    else:
+        response = await mailboxes.submit(tg_user_id, user_text)
+        if response is None:
+            return  # сообщение склеено с более поздним, ответ уйдёт на него
+    if outbox is not None:
+        # отправку ведёт планировщик (лимиты Telegram, RetryAfter); ждём доставки, чтобы
+        # ошибка не терялась. Напрямую отвечаем, только если сообщение точно не ушло
+        # в Telegram; RetryAfter и сетевые ошибки — в обработчик ошибок aiogram: повтор
+        # в обход планировщика упёрся бы во флуд-лимит или задублировал ответ
+        try:
+            await outbox.send(message.chat.id, response.text)
+        except (OutboxFull, OutboxClosed):
+            await message.answer(response.text)
+        return
     await message.answer(response.text)
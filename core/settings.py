@@ -12,17 +12,88 @@ class Settings(BaseSettings):
     DEEPSEEK_API_KEY: Optional[str] = None
 
     OPENWEATHER_API_KEY: Optional[str] = None
+    OPENWEATHER_BASE_URL: str = "https://api.openweathermap.org/data/2.5"
+    OPENWEATHER_MAX_PER_MIN: int = 50
+    OPENWEATHER_CONCURRENCY: int = 4
     NEWS_API_KEY: Optional[str] = None
+    NEWS_BASE_URL: str = "https://newsapi.org/v2"
+    NEWS_COUNTRY: str = "ru"
+    NEWS_POLL_SEC: int = 600
 
     AYA_CITY: str = "Saint Petersburg"
     AYA_TZ: str = "Europe/Moscow"
 
+    WORLD_TTL_SEC: int = 900
+    WORLD_MAX_LOCATIONS: int = 256
+    WORLD_PREFETCH_INTERVAL_SEC: int = 60
+    WORLD_ACTIVE_WINDOW_SEC: int = 1800
+    WORLD_IDLE_EVICT_SEC: int = 21600
+    WORLD_PREFETCH_BATCH: int = 10
+    WORLD_FETCH_PER_MIN: int = 30
+
     LOG_LEVEL: str = "INFO"
     ENV: str = "dev"
     DIAG: int = 0
     POLICY_TRACE: int = 0
+    POLICY_TRACE_SAMPLE: float = 1.0
+    POLICY_TRACE_SIZE: int = 512
+    POLICY_TRACE_PATH: str = "logs/policy_trace.jsonl"
+    ADMIN_IDS: str = ""
+
+    LLM_CACHE: int = 0
+    LLM_CACHE_SIZE: int = 512
+    LLM_CACHE_TTL_SEC: int = 3600
+    LLM_CACHE_PERSIST: int = 0
+    LLM_REPLIES: int = 0
+
+    LLM_FACTS: int = 0
+    LLM_FACTS_BATCH: int = 20
+    LLM_FACTS_FLUSH_SEC: float = 30.0
+    LLM_FACTS_MIN_CONFIDENCE: float = 0.6
+    LLM_PRICE_PROMPT_PER_M: float = 0.27
+    LLM_PRICE_COMPLETION_PER_M: float = 1.10
 
     DB_PATH: str = "aya.db"
+    DB_BUSY_TIMEOUT_MS: int = 5000
+    INTENT_MODEL_PATH: str = "data/intent_model.npz"
+    INTENT_MODEL_MIN_CONFIDENCE: float = 0.5
+    FACT_EXTRACTORS_PATH: str = "data/fact_extractors.yaml"
+    PLAN_CACHE_SIZE: int = 1024
+    POLICY_RELOAD_SEC: float = 2.0
+    PLAYBOOKS_PATH: str = "dialogue/playbooks.yml"
+    SPEECH_PROFILE_ALPHA: float = 0.1
+    PERSONA_REFRESH_SEC: float = 5.0
+    USER_SEEN_CACHE_SIZE: int = 50000
+
+    TELEGRAM_MODE: str = "polling"
+    WEBHOOK_URL: Optional[str] = None
+    WEBHOOK_PATH: str = "/telegram/webhook"
+    WEBHOOK_HOST: str = "0.0.0.0"
+    WEBHOOK_PORT: int = 8080
+    WEBHOOK_SECRET: Optional[str] = None
+    WEBHOOK_QUEUE_SIZE: int = 1000
+    WEBHOOK_WORKERS: int = 8
+
+    MAILBOX_COALESCE_MS: int = 0
+    MAILBOX_MAX_BATCH: int = 5
+    MAILBOX_IDLE_SEC: float = 60.0
+    MAILBOX_MAX_ACTIVE: int = 64
+
+    POST_REPLY_DEFER: bool = True
+    POST_REPLY_SHARDS: int = 4
+    POST_REPLY_QUEUE_SIZE: int = 1000
+    POST_REPLY_MAX_RETRIES: int = 5
+
+    OUTBOX_GLOBAL_RATE: float = 25.0
+    OUTBOX_BURST: float = 5.0
+    OUTBOX_CHAT_INTERVAL_SEC: float = 1.0
+    OUTBOX_MAX_QUEUE: int = 10000
+    OUTBOX_MAX_ATTEMPTS: int = 3
+
+    SHARD_WORKERS: int = 0
+    SHARD_QUEUE_SIZE: int = 1000
+    SHARD_CONCURRENCY: int = 16
+    SHARD_HEARTBEAT_TIMEOUT_SEC: float = 30.0
 
     model_config = SettingsConfigDict(
         env_file=".env",
@@ -38,6 +109,10 @@ class Settings(BaseSettings):
     def is_diag(self) -> bool:
         return bool(int(self.DIAG))
 
+    @cached_property
+    def admin_ids(self) -> frozenset[int]:
+        return frozenset(int(x) for x in self.ADMIN_IDS.replace(" ", "").split(",") if x)
+
     def bot_token(self) -> str:
         token = (self.TELEGRAM_TOKEN or "").strip()
         if token:
@@ -2,63 +2,36 @@
 from __future__ import annotations
 
 import random
-from dataclasses import dataclass
+from pathlib import Path
 from typing import Any, Dict, List, Sequence
 
-from jinja2 import Environment
-
 from domain.reasoning.models import DialoguePlan
+from domain.reasoning.speech import SpeechProfile
 
+from .playbooks import DEFAULT_PLAYBOOKS_PATH, PlaybookError, TemplateRegistry, load_registry, make_env
 
-@dataclass(slots=True)
-class SpeechProfile:
-    avg_words: float = 10.0
-    q_ratio: float = 0.2
-    emoji_ratio: float = 0.05
-    short_bias: float = 0.5
-
-
-_PLAYBOOKS: Dict[str, List[str]] = {
-    "greeting": [
-        "Привет{{ user_name_hint }}! Я {{ persona_name }}. Расскажи, как проходит твой день?",
-        "Рада встрече{{ user_name_hint }}. Чем сегодня дышишь?",
-    ],
-    "weather": [
-        "Погода сейчас {{ weather_text }}. Хочешь подстроим планы под такие условия?",
-        "Сейчас на улице {{ weather_text }}, погода явно даёт настроение. Что бы ты хотел(а) сделать?",
-    ],
-    "time": [
-        "Сейчас {{ local_time }} в {{ city }}. Нужно что-то успеть?",
-        "По моим часам {{ local_time }}. Что планируешь дальше?",
-    ],
-    "memory_query": [
-        "Ты говорила мне, что {{ recalled_fact }}. Может, расскажешь ещё детали?",
-        "Помню, что {{ recalled_fact }}. Правильно?",
-    ],
-    "sos": [
-        "Мне очень жаль, что тебе тяжело. Я рядом и могу помочь найти профессиональные ресурсы, если нужно.",
-        "Слышать это непросто. Давай подумаем, что могло бы поддержать тебя прямо сейчас.",
-    ],
-    "smalltalk": [
-        "{{ smalltalk_reply }}",
-        "{{ smalltalk_reply }}",
-    ],
-    "flirt": [
-        "Мне нравится, когда мы так шутим{{ user_name_hint }}. Поделись, что тебя радует сегодня?",
-        "Я улыбаюсь, читая это. Что ещё сделает твой вечер особенным?",
-    ],
-    "plan": [
-        "{{ rainy_overlay }}Можем придумать что-то вместе: {{ plan_hint }}. Что думаешь?",
-        "{{ rainy_overlay }}Как вариант: {{ plan_hint }}. Хочется чего-то спокойного или активного?",
-    ],
-}
+__all__ = ["Humanizer", "SpeechProfile"]
 
-_DEFAULT_PLAYBOOK = ["Мне интересно, что у тебя происходит. Расскажи?", "Я здесь, слушаю тебя."]
+MIRROR_EMOJI_RATIO = 0.3
 
 
 class Humanizer:
-    def __init__(self) -> None:
-        self.env = Environment(autoescape=False, trim_blocks=True, lstrip_blocks=True)
+    def __init__(self, playbooks_path: str | Path = DEFAULT_PLAYBOOKS_PATH) -> None:
+        self.env = make_env()
+        self.playbooks_path = Path(playbooks_path)
+        self.load_errors: List[str] = []
+        self.registry: TemplateRegistry = load_registry(self.playbooks_path, self.env)
+
+    def reload(self) -> int:
+        """Recompiles the playbook file and swaps the registry; on error the old one stays."""
+        try:
+            registry = load_registry(self.playbooks_path, self.env, self.registry.version + 1)
+        except PlaybookError as exc:
+            self.load_errors = list(exc.errors)
+            raise
+        self.registry = registry
+        self.load_errors = []
+        return registry.version
 
     def realize(
         self,
@@ -68,21 +41,25 @@ class Humanizer:
         memory_facts: Sequence[Dict[str, Any]],
         world: Dict[str, Any],
         user_profile: Dict[str, Any],
+        speech_profile: SpeechProfile | None = None,
+        news: Sequence[Dict[str, Any]] = (),
     ) -> str:
-        template = self._pick_template(plan.intent, plan.style_mods.get("variation", 2))
+        template = self.registry.pick(plan.intent, plan.style_mods.get("variation", 2))
         context = self._build_context(plan, persona, memory_facts, world, user_profile)
-        rendered = self.env.from_string(template).render(**context)
+        context["news_text"] = self._format_news(news)
+        context["speech"] = speech_profile or SpeechProfile()
+        rendered = template.render(**context)
         rendered = rendered.strip()
         if plan.follow_up_strategy in {"ask_name", "offer_plan", "invite_response", "light_follow_up"} and not rendered.endswith("?"):
             rendered += "?"
+        if (
+            plan.style_mods.get("emoji") == "mirror"
+            and speech_profile is not None
+            and speech_profile.emoji_ratio >= MIRROR_EMOJI_RATIO
+        ):
+            rendered += " 🙂"
         return rendered
 
-    def _pick_template(self, intent: str, variation: int) -> str:
-        options = _PLAYBOOKS.get(intent, _DEFAULT_PLAYBOOK)
-        if variation <= 1 or len(options) == 1:
-            return options[0]
-        return random.choice(options[:max(1, min(len(options), variation))])
-
     def _build_context(
         self,
         plan: DialoguePlan,
@@ -127,6 +104,11 @@ class Humanizer:
             "rainy_overlay": rainy_overlay,
         }
 
+    def _format_news(self, news: Sequence[Dict[str, Any]]) -> str:
+        if not news:
+            return "свежих новостей у меня пока нет"
+        return "; ".join(f"«{item['title']}»" for item in news[:3])
+
     def _format_recalled_fact(self, facts: Sequence[Dict[str, Any]]) -> str | None:
         if not facts:
             return None
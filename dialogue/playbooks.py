@@ -0,0 +1,156 @@
+"""Playbook templates compiled once into an (intent, variant) registry."""
+from __future__ import annotations
+
+import asyncio
+import random
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
+
+import yaml
+from jinja2 import Environment, Template, TemplateSyntaxError
+
+from core.logging import get_logger
+
+if TYPE_CHECKING:
+    from .humanizer import Humanizer
+
+log = get_logger("dialogue.playbooks")
+
+DEFAULT_PLAYBOOKS_PATH = Path(__file__).with_name("playbooks.yml")
+DEFAULT_KEY = "default"
+
+
+class PlaybookError(ValueError):
+    def __init__(self, errors: List[str]):
+        super().__init__("; ".join(errors))
+        self.errors = errors
+
+
+def make_env() -> Environment:
+    return Environment(autoescape=False, trim_blocks=True, lstrip_blocks=True)
+
+
+def load_playbooks(path: str | Path) -> Dict[str, Tuple[str, ...]]:
+    try:
+        data = yaml.safe_load(Path(path).read_text(encoding="utf-8")) or {}
+    except (OSError, yaml.YAMLError) as exc:
+        raise PlaybookError([f"{path}: {exc}"]) from exc
+    if not isinstance(data, dict):
+        raise PlaybookError([f"{path}: expected a mapping of intent -> variants"])
+    errors: List[str] = []
+    out: Dict[str, Tuple[str, ...]] = {}
+    for intent, variants in data.items():
+        if not isinstance(variants, list) or not variants or not all(isinstance(v, str) for v in variants):
+            errors.append(f"{intent}: expected a non-empty list of strings")
+            continue
+        out[str(intent)] = tuple(variants)
+    if DEFAULT_KEY not in out:
+        errors.append(f"missing '{DEFAULT_KEY}' playbook")
+    if errors:
+        raise PlaybookError(errors)
+    return out
+
+
+@dataclass(frozen=True, slots=True)
+class TemplateRegistry:
+    """Compiled templates keyed by ``(intent, variant index)``; immutable once built."""
+
+    templates: Dict[Tuple[str, int], Template]
+    counts: Dict[str, int]
+    version: int
+    loaded_at: float
+
+    def pick(self, intent: str, variation: int) -> Template:
+        """Same selection rule as before: ``variation <= 1`` pins the first variant."""
+        if intent not in self.counts:
+            intent = DEFAULT_KEY
+        n = self.counts[intent]
+        if variation <= 1 or n == 1:
+            return self.templates[(intent, 0)]
+        return self.templates[(intent, random.randrange(max(1, min(n, variation))))]
+
+
+def compile_registry(
+    playbooks: Dict[str, Tuple[str, ...]], env: Environment | None = None, version: int = 1
+) -> TemplateRegistry:
+    env = env or make_env()
+    templates: Dict[Tuple[str, int], Template] = {}
+    errors: List[str] = []
+    for intent, variants in playbooks.items():
+        for idx, source in enumerate(variants):
+            try:
+                templates[(intent, idx)] = env.from_string(source)
+            except TemplateSyntaxError as exc:
+                errors.append(f"{intent}[{idx}]: {exc.message}")
+    if errors:
+        raise PlaybookError(errors)
+    return TemplateRegistry(templates, {k: len(v) for k, v in playbooks.items()}, version, time.time())
+
+
+def load_registry(path: str | Path, env: Environment | None = None, version: int = 1) -> TemplateRegistry:
+    return compile_registry(load_playbooks(path), env, version)
+
+
+def _stamp(path: Path) -> Optional[Tuple[int, int]]:
+    try:
+        st = path.stat()
+    except FileNotFoundError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+
+class PlaybookWatcher:
+    """Polls the playbook file and swaps a freshly compiled registry into the humanizer.
+
+    Like ``PolicyWatcher``: parsing and compiling happen in a worker thread,
+    a file that fails to load is recorded in ``humanizer.load_errors`` and
+    the previous registry keeps serving.
+    """
+
+    def __init__(self, humanizer: "Humanizer", *, interval_sec: float = 2.0) -> None:
+        self.humanizer = humanizer
+        self.path = Path(humanizer.playbooks_path)
+        self.interval_sec = interval_sec
+        self.reloads = 0
+        self.failures = 0
+        self._stamp = _stamp(self.path)
+        self._task: Optional[asyncio.Task[None]] = None
+
+    async def check_once(self) -> bool:
+        stamp = await asyncio.to_thread(_stamp, self.path)
+        if stamp == self._stamp or stamp is None:
+            return False
+        self._stamp = stamp
+        try:
+            await asyncio.to_thread(self.humanizer.reload)
+        except PlaybookError as exc:
+            self.failures += 1
+            log.warning("playbooks.reload_rejected", errors=exc.errors)
+            return False
+        self.reloads += 1
+        log.info("playbooks.reloaded", version=self.humanizer.registry.version)
+        return True
+
+    async def run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval_sec)
+            try:
+                await self.check_once()
+            except Exception:
+                log.exception("playbooks.watch_failed")
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self.run())
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
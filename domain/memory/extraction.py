@@ -1,36 +1,265 @@
-"""Simple fact extraction utilities."""
+"""Fact extraction: a registry of regex extractors compiled into one scan per message."""
 from __future__ import annotations
 
 import re
-from typing import List
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import yaml
 
 from .models import Fact
 
-_AGE_RE = re.compile(r"\bмне\s+(?P<age>\d{1,3})\b", re.IGNORECASE)
-_INTOLERANCE_RE = re.compile(r"\bнепереносимост[ьи]\s+(?P<item>[а-яa-z\s]+)\b", re.IGNORECASE)
-_LOCATION_RE = re.compile(r"\b(живу|живет|живём|я\s+из)\s+(?P<city>[а-яa-z\s\-]+)\b", re.IGNORECASE)
-_NAME_RE = re.compile(r"\bменя\s+зовут\s+(?P<name>[а-яa-z\-]{2,25})\b", re.IGNORECASE)
+Normalizer = Callable[[str], Optional[str]]
+
+
+def _title(text: str) -> Optional[str]:
+    return text.strip().title() or None
+
+
+def _lower(text: str) -> Optional[str]:
+    return text.strip().lower() or None
+
+
+def _age(text: str) -> Optional[str]:
+    text = text.strip()
+    if not text.isdecimal():
+        return None
+    age = int(text)
+    return str(age) if 5 <= age <= 120 else None
+
+
+NORMALIZERS: Dict[str, Normalizer] = {
+    "title": _title,
+    "lower": _lower,
+    "strip": lambda text: text.strip() or None,
+    "age": _age,
+}
+
+
+def register_normalizer(name: str, func: Normalizer) -> None:
+    NORMALIZERS[name] = func
+
+
+@dataclass(frozen=True, slots=True)
+class Extractor:
+    """One fact type: a pattern with a ``value`` group and a normalizer name.
+
+    A normalizer returning ``None`` rejects the match.
+    """
+
+    name: str
+    predicate: str
+    pattern: str
+    normalizer: str = "strip"
+    confidence: float = 0.7
+    tags: Tuple[str, ...] = ()
+    group: str = "value"
+
+
+DEFAULT_EXTRACTORS: Tuple[Extractor, ...] = (
+    Extractor("age", "age", r"\bмне\s+(?P<value>\d{1,3})\b", "age", 0.9, ("profile", "age")),
+    Extractor(
+        "intolerance", "intolerance", r"\bнепереносимост[ьи]\s+(?P<value>[а-яa-z\s]+)\b", "lower", 0.8, ("health",)
+    ),
+    Extractor(
+        "location", "location", r"\b(?:живу|живет|живём|я\s+из)\s+(?P<value>[а-яa-z\s\-]+)\b", "title", 0.7, ("location",)
+    ),
+    Extractor("name", "name", r"\bменя\s+зовут\s+(?P<value>[а-яa-z\-]{2,25})\b", "title", 0.95, ("identity",)),
+)
+
+
+def load_extractors(path: str | Path) -> List[Extractor]:
+    """Reads extractors from YAML::
+
+        extractors:
+          - name: music
+            predicate: music_artists
+            pattern: '\\bслушаю\\s+(?P<value>...)'
+            normalizer: title
+            confidence: 0.6
+            tags: [music]
+    """
+    data = yaml.safe_load(Path(path).read_text(encoding="utf-8")) or {}
+    extractors: List[Extractor] = []
+    for raw in data.get("extractors", []):
+        if not raw.get("name") or not raw.get("pattern"):
+            continue
+        extractors.append(
+            Extractor(
+                name=raw["name"],
+                predicate=raw.get("predicate", raw["name"]),
+                pattern=raw["pattern"],
+                normalizer=raw.get("normalizer", "strip"),
+                confidence=float(raw.get("confidence", 0.7)),
+                tags=tuple(raw.get("tags", ())),
+                group=raw.get("group", "value"),
+            )
+        )
+    return extractors
+
+
+def merge_extractors(base: Iterable[Extractor], extra: Iterable[Extractor]) -> List[Extractor]:
+    """Extractors from ``extra`` replace same-named ones from ``base``; new ones are appended."""
+    merged = {e.name: e for e in base}
+    merged.update((e.name, e) for e in extra)
+    return list(merged.values())
+
+
+@dataclass(slots=True)
+class ExtractorStats:
+    hits: int = 0
+    rejected: int = 0
+    seconds: float = 0.0
+
+
+_GROUP_RE = re.compile(r"\(\?P([<=])(\w+)")
+# \1 или (?(1)...) — номера групп съезжают, когда паттерн становится частью общей альтернативы
+_NUMBERED_REF_RE = re.compile(r"(?<!\\)(?:\\\\)*\\[1-9]|\(\?\(\d+\)")
+
+
+def _has_top_level_branch(pattern: str) -> bool:
+    # «|» вне скобок и классов: у такого паттерна ведущий \b относится только к первой ветке
+    depth, class_at, escaped = 0, -1, False
+    for pos, ch in enumerate(pattern):
+        if escaped:
+            escaped = False
+        elif ch == "\\":
+            escaped = True
+        elif class_at >= 0:
+            # «]» сразу после «[» или «[^» — литерал, а не конец класса
+            if ch == "]" and pos > class_at + 1 and pattern[class_at + 1 : pos] != "^":
+                class_at = -1
+        elif ch == "[":
+            class_at = pos
+        elif ch == "(":
+            depth += 1
+        elif ch == ")":
+            depth -= 1
+        elif ch == "|" and depth == 0:
+            return True
+    return False
+
+
+def _scoped(index: int, pattern: str) -> str:
+    # уникальные имена групп в общей альтернативе: value -> e2_value
+    return _GROUP_RE.sub(lambda m: f"(?P{m.group(1)}e{index}_{m.group(2)}", pattern)
+
+
+class ExtractionPipeline:
+    """Finds facts for every registered extractor in a single ``finditer`` scan.
+
+    Each extractor becomes a capturing lookahead in one alternation, so matches
+    of different extractors may overlap just like with separate passes; a
+    per-extractor ``last_end`` keeps each extractor's own matches non-overlapping.
+    Extractors sharing a start position are re-checked with their own pattern.
+    """
+
+    def __init__(self, extractors: Sequence[Extractor] = DEFAULT_EXTRACTORS) -> None:
+        names = [e.name for e in extractors]
+        if len(set(names)) != len(names):
+            raise ValueError("duplicate extractor names")
+        for e in extractors:
+            if e.normalizer not in NORMALIZERS:
+                raise ValueError(f"unknown normalizer {e.normalizer!r} for extractor {e.name!r}")
+            if _NUMBERED_REF_RE.search(e.pattern):
+                raise ValueError(f"extractor {e.name!r}: use named backreferences (?P=name), not numbered ones")
+        self.extractors: Tuple[Extractor, ...] = tuple(extractors)
+        self._normalizers = [NORMALIZERS[e.normalizer] for e in self.extractors]
+        self._patterns = [re.compile(e.pattern, re.IGNORECASE) for e in self.extractors]
+        self._value_groups = [f"e{i}_{e.group}" for i, e in enumerate(self.extractors)]
+        bodies = [_scoped(i, e.pattern) for i, e in enumerate(self.extractors)]
+        bodies = [f"(?:{b})" if _has_top_level_branch(b) else b for b in bodies]
+        # общий ведущий \b выносим за альтернативу: движок проверяет его один раз на позицию
+        anchor = r"\b" if bodies and all(b.startswith(r"\b") for b in bodies) else ""
+        if anchor:
+            bodies = [b[len(anchor):] for b in bodies]
+        alternatives = "|".join(f"(?=(?P<e{i}>{body}))" for i, body in enumerate(bodies))
+        self._combined = re.compile(f"{anchor}(?:{alternatives})" if alternatives else r"(?!)", re.IGNORECASE)
+        self._owner = {self._combined.groupindex[f"e{i}"]: i for i in range(len(self.extractors))}
+        self.stats: Dict[str, ExtractorStats] = {e.name: ExtractorStats() for e in self.extractors}
+        self.scan_seconds = 0.0
+        self.messages = 0
+
+    def _emit(self, i: int, value: Optional[str], span: Tuple[int, int], subject: str, out: List[Fact]) -> None:
+        extractor = self.extractors[i]
+        stats = self.stats[extractor.name]
+        t0 = time.perf_counter()
+        normalized = self._normalizers[i](value) if value is not None else None
+        stats.seconds += time.perf_counter() - t0
+        if normalized is None:
+            stats.rejected += 1
+            return
+        stats.hits += 1
+        out.append(Fact(subject, extractor.predicate, normalized, extractor.confidence, extractor.tags, span))
+
+    def extract(self, text: str, *, subject: str) -> List[Fact]:
+        if not text:
+            return []
+        t0 = time.perf_counter()
+        facts: List[Fact] = []
+        last_end = [0] * len(self.extractors)
+        for match in self._combined.finditer(text):
+            if match.lastindex is None:
+                continue
+            pos = match.start()
+            i = self._owner[match.lastindex]  # внешняя группа eK закрывается последней
+            hits = [(i, match.start(f"e{i}"), match.end(f"e{i}"), match.group(self._value_groups[i]))]
+            for j in range(i + 1, len(self.extractors)):
+                own = self._patterns[j].match(text, pos)
+                if own is not None:
+                    hits.append((j, own.start(), own.end(), own.group(self.extractors[j].group)))
+            for k, start, end, value in hits:
+                if start < last_end[k]:
+                    continue
+                last_end[k] = end
+                self._emit(k, value, (start, end), subject, facts)
+        self.scan_seconds += time.perf_counter() - t0
+        self.messages += 1
+        return dedupe_facts(facts)
+
+    def extract_batch(self, texts: Iterable[str], *, subjects: Iterable[str] | str) -> List[List[Fact]]:
+        """Runs :meth:`extract` over many messages with the shared compiled scanner."""
+        texts = list(texts)
+        subject_list = [subjects] * len(texts) if isinstance(subjects, str) else list(subjects)
+        extract = self.extract
+        return [extract(text, subject=subject) for text, subject in zip(texts, subject_list, strict=True)]
+
+    def snapshot_stats(self) -> Dict[str, Dict[str, float]]:
+        return {
+            name: {"hits": s.hits, "rejected": s.rejected, "ms": round(s.seconds * 1000, 3)}
+            for name, s in self.stats.items()
+        } | {"_scan": {"messages": self.messages, "ms": round(self.scan_seconds * 1000, 3)}}
+
+
+def dedupe_facts(facts: Sequence[Fact]) -> List[Fact]:
+    """Drops repeats of (predicate, object) and same-predicate facts whose spans overlap."""
+    kept: List[Fact] = []
+    seen: set[Tuple[str, str]] = set()
+    for fact in facts:
+        key = (fact.predicate, fact.object)
+        if key in seen:
+            continue
+        if fact.span is not None and any(
+            k.predicate == fact.predicate and k.span is not None and k.span[0] < fact.span[1] and fact.span[0] < k.span[1]
+            for k in kept
+        ):
+            continue
+        seen.add(key)
+        kept.append(fact)
+    return kept
+
+
+_default_pipeline: Optional[ExtractionPipeline] = None
 
 
-def _norm(text: str) -> str:
-    return text.strip().title()
+def default_pipeline() -> ExtractionPipeline:
+    global _default_pipeline
+    if _default_pipeline is None:
+        _default_pipeline = ExtractionPipeline(DEFAULT_EXTRACTORS)
+    return _default_pipeline
 
 
 def extract_facts(text: str, *, subject: str) -> List[Fact]:
-    if not text:
-        return []
-    facts: List[Fact] = []
-    for match in _AGE_RE.finditer(text):
-        age = int(match.group("age"))
-        if 5 <= age <= 120:
-            facts.append(Fact(subject, "age", str(age), confidence=0.9, tags=("profile", "age")))
-    for match in _INTOLERANCE_RE.finditer(text):
-        item = match.group("item").strip().lower()
-        facts.append(Fact(subject, "intolerance", item, confidence=0.8, tags=("health",)))
-    for match in _LOCATION_RE.finditer(text):
-        city = _norm(match.group("city"))
-        facts.append(Fact(subject, "location", city, confidence=0.7, tags=("location",)))
-    for match in _NAME_RE.finditer(text):
-        name = _norm(match.group("name"))
-        facts.append(Fact(subject, "name", name, confidence=0.95, tags=("identity",)))
-    return facts
+    return default_pipeline().extract(text, subject=subject)
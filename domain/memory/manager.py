@@ -4,7 +4,7 @@ from __future__ import annotations
 
 from typing import List, Sequence
 
-from domain.memory.extraction import extract_facts
+from domain.memory.extraction import ExtractionPipeline, default_pipeline
 from domain.memory.models import Fact, MemoryMetrics
 
 from memory.chat_history import ChatHistoryRepo
@@ -22,14 +22,32 @@ _TOPIC_PREDICATES = {
 
 
 class MemoryManager:
-    def __init__(self, memory_repo: MemoryRepo, facts_repo: FactsRepo, chat_history: ChatHistoryRepo):
+    def __init__(
+        self,
+        memory_repo: MemoryRepo,
+        facts_repo: FactsRepo,
+        chat_history: ChatHistoryRepo,
+        extraction: ExtractionPipeline | None = None,
+        llm_extractor=None,
+    ):
         self.memory_repo = memory_repo
         self.facts_repo = facts_repo
         self.chat_history = chat_history
+        self.extraction = extraction or default_pipeline()
+        self.llm_extractor = llm_extractor
         self.metrics = MemoryMetrics()
 
     async def store_user_message(self, tg_user_id: int, message: str, *, message_id: int | None = None) -> List[Fact]:
-        facts = extract_facts(message, subject=str(tg_user_id))
+        facts = self.extract_facts(tg_user_id, message)
+        await self.persist_facts(tg_user_id, message, facts, message_id=message_id)
+        return facts
+
+    def extract_facts(self, tg_user_id: int, message: str) -> List[Fact]:
+        return self.extraction.extract(message, subject=str(tg_user_id))
+
+    async def persist_facts(
+        self, tg_user_id: int, message: str, facts: Sequence[Fact], *, message_id: int | None = None
+    ) -> None:
         if facts:
             payload = [
                 {"predicate": f.predicate, "object": f.object, "confidence": f.confidence, "tags": list(f.tags)}
@@ -37,7 +55,8 @@ class MemoryManager:
             ]
             await self.facts_repo.upsert_many(tg_user_id, payload, source_msg_id=message_id)
             self.metrics.facts_stored += len(facts)
-        return facts
+        if self.llm_extractor is not None:
+            self.llm_extractor.submit(tg_user_id, message, message_id)
 
     async def recall(self, tg_user_id: int, topic: str, limit: int = 3) -> List[Fact]:
         self.metrics.recall_attempts += 1
@@ -14,6 +14,7 @@ class Fact:
     object: str
     confidence: float
     tags: tuple[str, ...] = ()
+    span: tuple[int, int] | None = None
 
 
 @dataclass(slots=True)
@@ -2,44 +2,136 @@
 # mypy: ignore-errors
 from __future__ import annotations
 
-from typing import Dict, List
+import asyncio
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
 
+from core.logging import get_logger
 from persona.loader import PersonaManager as _PersonaManager
 
+log = get_logger("persona")
+
+PERSONA_FILES: Tuple[str, ...] = ("persona.yml", "policy.md", "system_prompt.j2")
+
+Stamp = Tuple[Optional[Tuple[int, int]], ...]
+
+
+@dataclass(frozen=True, slots=True)
+class PersonaSnapshot:
+    """Parsed persona files plus everything derived from them; treat ``data`` as read-only."""
+
+    data: Dict[str, Any]
+    traits: Tuple[str, ...]
+    policy: str
+    template: Any
+    version: int
+    loaded_at: float
+
+
+def extract_traits(persona: Dict[str, Any]) -> Tuple[str, ...]:
+    identity = persona.get("identity", {})
+    style = persona.get("style", {})
+    traits: List[str] = []
+    for key in ("tone", "avoid"):
+        values = style.get(key)
+        if isinstance(values, list):
+            traits.extend(values)
+    if isinstance(identity.get("city"), str):
+        traits.append(identity["city"])
+    return tuple(traits)
+
 
 class PersonaService:
-    def __init__(self, base_dir: str = "persona") -> None:
+    """Serves an immutable :class:`PersonaSnapshot`; the turn path never touches the filesystem.
+
+    ``check_once`` (run periodically by ``start``) stats the persona files and
+    rebuilds the snapshot only when one of them changed.
+    """
+
+    def __init__(self, base_dir: str = "persona", *, refresh_sec: float = 5.0) -> None:
         self._manager = _PersonaManager(base_dir)
+        self.refresh_sec = refresh_sec
+        self._snapshot: PersonaSnapshot = self._build(1)
+        self._stamp = self._file_stamp()
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def snapshot(self) -> PersonaSnapshot:
+        return self._snapshot
 
     def data(self) -> Dict[str, object]:
-        persona, _, _ = self._manager.load()
-        return persona
-
-    def traits(self) -> List[str]:
-        persona = self.data()
-        identity = persona.get("identity", {})
-        style = persona.get("style", {})
-        traits: List[str] = []
-        for key in ("tone", "avoid"):
-            values = style.get(key)
-            if isinstance(values, list):
-                traits.extend(values)
-        if isinstance(identity.get("city"), str):
-            traits.append(identity["city"])
-        return traits
+        return self._snapshot.data
+
+    def traits(self) -> Tuple[str, ...]:
+        return self._snapshot.traits
 
     def render_system_prompt(self, world: dict | None, user: dict | None, dialog: dict | None = None) -> str:
-        _, _, template = self._manager.load()
-        persona = self.data()
-        policy = (self._manager.base / "policy.md").read_text(encoding="utf-8")
-        return template.render(
-            persona=persona,
-            policy=policy,
-            policies_yaml=policy,
+        snapshot = self._snapshot
+        return snapshot.template.render(
+            persona=snapshot.data,
+            policy=snapshot.policy,
+            policies_yaml=snapshot.policy,
             world=world or {},
             user=user or {},
             dialog=dialog or {},
         )
 
-    def reload(self) -> None:
+    def _build(self, version: int) -> PersonaSnapshot:
         self._manager.reload()
+        persona, policy, template = self._manager.load()
+        return PersonaSnapshot(persona, extract_traits(persona), policy, template, version, time.time())
+
+    def _file_stamp(self) -> Stamp:
+        out = []
+        for name in PERSONA_FILES:
+            try:
+                st = (self._manager.base / name).stat()
+            except FileNotFoundError:
+                out.append(None)
+                continue
+            out.append((st.st_mtime_ns, st.st_size))
+        return tuple(out)
+
+    def reload(self) -> int:
+        """Rebuilds the snapshot unconditionally; returns the new version."""
+        self._snapshot = self._build(self._snapshot.version + 1)
+        self._stamp = self._file_stamp()
+        return self._snapshot.version
+
+    async def check_once(self) -> bool:
+        stamp = await asyncio.to_thread(self._file_stamp)
+        if stamp == self._stamp:
+            return False
+        try:
+            snapshot = await asyncio.to_thread(self._build, self._snapshot.version + 1)
+        except Exception:
+            log.exception("persona.reload_failed")
+            return False
+        finally:
+            self._stamp = stamp
+        self._snapshot = snapshot
+        log.info("persona.reloaded", version=snapshot.version)
+        return True
+
+    async def run(self) -> None:
+        while True:
+            await asyncio.sleep(self.refresh_sec)
+            try:
+                await self.check_once()
+            except Exception:
+                log.exception("persona.watch_failed")
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self.run())
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
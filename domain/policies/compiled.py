@@ -0,0 +1,127 @@
+"""Load-time compilation of policy rules into intent-indexed, allocation-free evaluators."""
+from __future__ import annotations
+
+import heapq
+from dataclasses import dataclass, fields
+from typing import Any, Callable, Dict, Iterable, List, Tuple
+
+from .models import PolicyBundle, PolicyCondition, PolicyEffect, PolicyRule
+
+Predicate = Callable[[Dict[str, Any]], bool]
+EffectItems = Tuple[Tuple[str, Any], ...]
+
+BUCKETS: Tuple[str, ...] = ("content", "style", "safety")
+
+
+def compile_condition(cond: PolicyCondition) -> Tuple[Predicate, ...]:
+    """Turns a condition into checks for the constraints it actually sets.
+
+    The intent constraint is not included: it is answered by the intent index.
+    Sequences become frozensets once, here, instead of on every evaluation.
+    The context is expected to carry ``persona_traits``/``memory_tags`` as sets.
+    """
+    preds: List[Predicate] = []
+    if cond.min_affinity is not None:
+        lo = cond.min_affinity
+        preds.append(lambda c: c.get("affinity", 0) >= lo)
+    if cond.max_affinity is not None:
+        hi = cond.max_affinity
+        preds.append(lambda c: c.get("affinity", 0) <= hi)
+    if cond.min_closeness is not None:
+        close = cond.min_closeness
+        preds.append(lambda c: c.get("closeness", 0) >= close)
+    if cond.require_adult or not cond.allow_when_not_adult:
+        preds.append(lambda c: bool(c.get("adult_confirmed", False)))
+    if cond.only_when_not_adult:
+        preds.append(lambda c: not c.get("adult_confirmed", False))
+    if cond.emotions:
+        emotions = frozenset(cond.emotions)
+        preds.append(lambda c: c.get("user_emotion") in emotions)
+    if cond.weather:
+        weather = frozenset(cond.weather)
+        preds.append(lambda c: c.get("weather_condition") in weather)
+    if cond.time_of_day:
+        tod = frozenset(cond.time_of_day)
+        preds.append(lambda c: c.get("time_of_day") in tod)
+    if cond.persona_traits:
+        traits = frozenset(cond.persona_traits)
+        preds.append(lambda c: traits <= c.get("persona_traits", frozenset()))
+    if cond.memory_tags:
+        tags = frozenset(cond.memory_tags)
+        preds.append(lambda c: not tags.isdisjoint(c.get("memory_tags", ())))
+    return tuple(preds)
+
+
+def flatten_effect(effect: PolicyEffect) -> EffectItems:
+    """Effect fields that carry a value, lists frozen to tuples, in declaration order."""
+    items: List[Tuple[str, Any]] = []
+    for f in fields(effect):
+        value = getattr(effect, f.name)
+        if value is None or (isinstance(value, (list, dict)) and not value):
+            continue
+        if isinstance(value, list):
+            value = tuple(value)
+        elif isinstance(value, dict):
+            value = dict(value)
+        items.append((f.name, value))
+    return tuple(items)
+
+
+@dataclass(frozen=True, slots=True)
+class CompiledRule:
+    id: str
+    priority: int
+    predicates: Tuple[Predicate, ...]
+    effect_items: EffectItems
+
+    def matches(self, context: Dict[str, Any]) -> bool:
+        for pred in self.predicates:
+            if not pred(context):
+                return False
+        return True
+
+
+@dataclass(frozen=True, slots=True)
+class CompiledBucket:
+    """Rules of one bucket in priority order, pre-merged per intent with the wildcard rules."""
+
+    by_intent: Dict[str, Tuple[CompiledRule, ...]]
+    wildcard: Tuple[CompiledRule, ...]
+    size: int
+
+    def candidates(self, intent: str) -> Tuple[CompiledRule, ...]:
+        return self.by_intent.get(intent, self.wildcard)
+
+
+def compile_rules(rules: Iterable[PolicyRule]) -> CompiledBucket:
+    wildcard: List[Tuple[int, CompiledRule]] = []
+    specific: Dict[str, List[Tuple[int, CompiledRule]]] = {}
+    # loader already sorts by priority; the position keeps that order when merging
+    for pos, rule in enumerate(rules):
+        entry = (pos, CompiledRule(rule.id, rule.priority, compile_condition(rule.condition), flatten_effect(rule.effect)))
+        if not rule.condition.intents:
+            wildcard.append(entry)
+        for intent in dict.fromkeys(rule.condition.intents):
+            specific.setdefault(intent, []).append(entry)
+    by_intent = {
+        intent: tuple(r for _, r in heapq.merge(entries, wildcard, key=lambda e: e[0]))
+        for intent, entries in specific.items()
+    }
+    size = len({pos for entries in specific.values() for pos, _ in entries}) + len(wildcard)
+    return CompiledBucket(by_intent=by_intent, wildcard=tuple(r for _, r in wildcard), size=size)
+
+
+@dataclass(frozen=True, slots=True)
+class CompiledPolicies:
+    buckets: Tuple[CompiledBucket, ...]
+
+    def candidates(self, intent: str) -> Tuple[CompiledRule, ...]:
+        out: Tuple[CompiledRule, ...] = ()
+        for bucket in self.buckets:
+            out += bucket.candidates(intent)
+        return out
+
+
+def compile_bundle(bundle: PolicyBundle) -> CompiledPolicies:
+    return CompiledPolicies(tuple(compile_rules(getattr(bundle, name)) for name in BUCKETS))
+
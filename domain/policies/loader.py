@@ -34,6 +34,53 @@ def load_policy_bundle(base_path: Path) -> PolicyBundle:
     )
 
 
+class PolicyValidationError(ValueError):
+    def __init__(self, errors: List[str]):
+        super().__init__("; ".join(errors))
+        self.errors = errors
+
+
+POLICY_FILES = ("content_policies.yaml", "style_policies.yaml", "safety_policies.yaml")
+
+
+def validate_bundle(bundle: PolicyBundle) -> List[str]:
+    """Problems that would make a bundle behave unexpectedly; empty when it is fine."""
+    errors: List[str] = []
+    seen: Dict[str, str] = {}
+    for bucket in ("content", "style", "safety"):
+        for rule in getattr(bundle, bucket):
+            if rule.id in seen:
+                errors.append(f"{bucket}/{rule.id}: duplicate id (also in {seen[rule.id]})")
+            seen[rule.id] = bucket
+            cond = rule.condition
+            if cond.min_affinity is not None and cond.max_affinity is not None and cond.min_affinity > cond.max_affinity:
+                errors.append(f"{bucket}/{rule.id}: min_affinity > max_affinity")
+            if cond.require_adult and cond.only_when_not_adult:
+                errors.append(f"{bucket}/{rule.id}: require_adult together with only_when_not_adult")
+            for name in ("intents", "emotions", "weather", "time_of_day", "persona_traits", "memory_tags"):
+                if isinstance(getattr(cond, name), str):
+                    errors.append(f"{bucket}/{rule.id}: when.{name} must be a list")
+            for name in ("content_goals", "forbid_topics", "require_topics", "safety"):
+                if not isinstance(getattr(rule.effect, name), list):
+                    errors.append(f"{bucket}/{rule.id}: effects.{name} must be a list")
+            for name in ("style_mods", "metadata"):
+                if not isinstance(getattr(rule.effect, name), dict):
+                    errors.append(f"{bucket}/{rule.id}: effects.{name} must be a mapping")
+    return errors
+
+
+def load_validated_bundle(base_path: Path) -> PolicyBundle:
+    """Like :func:`load_policy_bundle`, but raises :class:`PolicyValidationError` on any problem."""
+    try:
+        bundle = load_policy_bundle(base_path)
+    except (OSError, yaml.YAMLError, TypeError, ValueError, AttributeError) as exc:
+        raise PolicyValidationError([f"{type(exc).__name__}: {exc}"]) from exc
+    errors = validate_bundle(bundle)
+    if errors:
+        raise PolicyValidationError(errors)
+    return bundle
+
+
 def bundle_to_dict(bundle: PolicyBundle) -> Dict[str, List[Dict[str, Any]]]:
     def serialize(rules: Iterable[PolicyRule]) -> List[Dict[str, Any]]:
         out: List[Dict[str, Any]] = []
@@ -0,0 +1,408 @@
+"""Offline, vectorized coverage and conflict analysis of a policy bundle.
+
+The policy context space (intent x affinity x adult x flirt level x user
+emotion x time of day x weather x memory-tag set x persona-trait set) is
+enumerated, or sampled,
+as mixed-radix integers.  Each batch is decoded into NumPy arrays once and
+every rule's condition becomes a boolean mask over the batch, in the order
+``DecisionEngine`` applies the rules, so the surviving value of each scalar
+plan field is a chain of ``np.where`` calls instead of a plan per context::
+
+    python -m domain.policies.simulator policies
+    python -m domain.policies.simulator policies --sample 5000000 --json report.json
+
+The masks re-implement ``PolicyCondition`` matching, so every run replays a
+sample of contexts through ``DecisionEngine`` (``--verify N``, 0 to skip) and
+fails when the two disagree.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+import time
+import typing
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from core.logging import setup_logging
+
+from .compiled import BUCKETS
+from .loader import load_policy_bundle
+from .models import PolicyBundle, PolicyRule
+
+if TYPE_CHECKING:
+    from domain.reasoning.decision_engine import DecisionEngine
+
+SCALAR_FIELDS: Tuple[str, ...] = ("tone", "emotion", "register", "response_length", "follow_up")
+_FOLLOW_UP = SCALAR_FIELDS.index("follow_up")
+_FORCED = -2  # follow_up replaced by the engine's grounding heuristic
+_DEFAULT = -1  # no rule set the field
+
+
+def _classifier_intents() -> Tuple[str, ...]:
+    from domain.reasoning.intent_classifier import Intent
+
+    return typing.get_args(Intent)
+
+
+@dataclass(frozen=True)
+class ContextSpace:
+    """Axes of ``ReasoningContext.as_policy_context()``; closeness follows affinity as in ``AyaBrain``."""
+
+    intents: Tuple[str, ...] = field(default_factory=_classifier_intents)
+    affinity: Tuple[int, ...] = (0, 1, 2, 3, 4, 5)
+    adult: Tuple[bool, ...] = (False, True)
+    flirt_levels: Tuple[str, ...] = ("off", "soft", "bounded")
+    emotions: Tuple[str, ...] = ("neutral", "joy", "sadness", "anger", "anxiety", "fatigue")
+    times_of_day: Tuple[str, ...] = ("morning", "day", "evening", "night", "unknown")
+    weather: Tuple[str, ...] = ("clear", "rainy", "cold")
+    memory_tags: Tuple[str, ...] = ("age", "intolerance", "location", "name", "music_artists")
+    persona_traits: Tuple[str, ...] = ()
+
+    @classmethod
+    def for_bundle(cls, bundle: PolicyBundle, **overrides: Any) -> "ContextSpace":
+        """Default axes plus every memory tag and persona trait the bundle mentions; both are open-ended."""
+        space = cls(**overrides)
+        tags = dict.fromkeys(space.memory_tags)
+        traits = dict.fromkeys(space.persona_traits)
+        for rule in bundle.all_rules():
+            tags.update(dict.fromkeys(rule.condition.memory_tags))
+            traits.update(dict.fromkeys(rule.condition.persona_traits))
+        return cls(**{**overrides, "memory_tags": tuple(tags), "persona_traits": tuple(traits)})
+
+    @property
+    def radices(self) -> Tuple[int, ...]:
+        return (
+            len(self.intents),
+            len(self.affinity),
+            len(self.adult),
+            len(self.flirt_levels),
+            len(self.emotions),
+            len(self.times_of_day),
+            len(self.weather),
+            1 << len(self.memory_tags),
+            1 << len(self.persona_traits),
+        )
+
+    @property
+    def size(self) -> int:
+        out = 1
+        for radix in self.radices:
+            out *= radix
+        return out
+
+    def digits(self, index: np.ndarray) -> List[np.ndarray]:
+        out: List[np.ndarray] = []
+        rest = np.asarray(index, dtype=np.int64)
+        for radix in self.radices:
+            rest, digit = np.divmod(rest, radix)
+            out.append(digit)
+        return out
+
+    def decode(self, index: int) -> Dict[str, Any]:
+        """The policy context for one index, shaped like ``as_policy_context()``."""
+        i, a, ad, fl, em, tod, w, tags, traits = (int(d) for d in self.digits(np.asarray(index)))
+        return {
+            "intent": self.intents[i],
+            "affinity": self.affinity[a],
+            "closeness": self.affinity[a],
+            "adult_confirmed": self.adult[ad],
+            "flirt_level": self.flirt_levels[fl],
+            "user_emotion": self.emotions[em],
+            "persona_traits": frozenset(t for b, t in enumerate(self.persona_traits) if traits >> b & 1),
+            "memory_tags": frozenset(t for b, t in enumerate(self.memory_tags) if tags >> b & 1),
+            "time_of_day": self.times_of_day[tod],
+            "weather_condition": self.weather[w],
+        }
+
+
+def ordered_rules(bundle: PolicyBundle) -> List[Tuple[str, PolicyRule]]:
+    """Rules in the order the engine applies them: bucket by bucket, each already priority-sorted."""
+    return [(name, rule) for name in BUCKETS for rule in getattr(bundle, name)]
+
+
+def _bits(values: Sequence[str], axis: Sequence[str]) -> int:
+    return sum(1 << b for b, v in enumerate(axis) if v in values)
+
+
+def _codes(values: Sequence[Any], axis: Sequence[Any]) -> np.ndarray:
+    index = {v: i for i, v in enumerate(axis)}
+    return np.asarray(sorted({index[v] for v in values if v in index}), dtype=np.int64)
+
+
+class PolicySimulator:
+    def __init__(self, bundle: PolicyBundle, space: Optional[ContextSpace] = None) -> None:
+        self.bundle = bundle
+        self.space = space or ContextSpace.for_bundle(bundle)
+        self.rules = ordered_rules(bundle)
+        self.values: Dict[str, List[str]] = {name: [""] for name in SCALAR_FIELDS}
+        # (rule, field) -> code of the value the rule sets, 0 when it leaves the field alone
+        self.effect_codes = np.zeros((len(self.rules), len(SCALAR_FIELDS)), dtype=np.int32)
+        for r, (_, rule) in enumerate(self.rules):
+            for f, name in enumerate(SCALAR_FIELDS):
+                value = getattr(rule.effect, name)
+                if value:
+                    if value not in self.values[name]:
+                        self.values[name].append(value)
+                    self.effect_codes[r, f] = self.values[name].index(value)
+        self.has_collection_effect = np.array(
+            [
+                bool(e.content_goals or e.forbid_topics or e.require_topics or e.safety or e.style_mods or e.metadata)
+                for e in (rule.effect for _, rule in self.rules)
+            ],
+            dtype=bool,
+        )
+        self._escalates = np.array([("escalate" in rule.effect.safety) for _, rule in self.rules], dtype=bool)
+        self._sos = self.space.intents.index("sos") if "sos" in self.space.intents else -1
+
+    def masks(self, index: np.ndarray) -> Tuple[np.ndarray, List[np.ndarray]]:
+        """Boolean ``(n_rules, len(index))`` matrix of which rule fires where, plus the decoded digits."""
+        digits = self.space.digits(index)
+        intent, a, ad, _flirt, emotion, tod, weather, tags, traits = digits
+        affinity = np.asarray(self.space.affinity, dtype=np.int64)[a]
+        adult = np.asarray(self.space.adult, dtype=bool)[ad]
+        fired = np.empty((len(self.rules), len(index)), dtype=bool)
+        for r, (_, rule) in enumerate(self.rules):
+            cond = rule.condition
+            m = np.full(len(index), set(cond.persona_traits) <= set(self.space.persona_traits), dtype=bool)
+            if cond.persona_traits:
+                required = _bits(cond.persona_traits, self.space.persona_traits)
+                m &= (traits & required) == required
+            if cond.intents:
+                m &= np.isin(intent, _codes(cond.intents, self.space.intents))
+            if cond.min_affinity is not None:
+                m &= affinity >= cond.min_affinity
+            if cond.max_affinity is not None:
+                m &= affinity <= cond.max_affinity
+            if cond.min_closeness is not None:
+                m &= affinity >= cond.min_closeness
+            if cond.require_adult or not cond.allow_when_not_adult:
+                m &= adult
+            if cond.only_when_not_adult:
+                m &= ~adult
+            if cond.emotions:
+                m &= np.isin(emotion, _codes(cond.emotions, self.space.emotions))
+            if cond.time_of_day:
+                m &= np.isin(tod, _codes(cond.time_of_day, self.space.times_of_day))
+            if cond.weather:
+                m &= np.isin(weather, _codes(cond.weather, self.space.weather))
+            if cond.memory_tags:
+                m &= (tags & _bits(cond.memory_tags, self.space.memory_tags)) != 0
+            fired[r] = m
+        return fired, digits
+
+    def winners(self, fired: np.ndarray, intent: np.ndarray) -> np.ndarray:
+        """``(n_fields, n)``: index of the rule whose value survives, ``-1`` default, ``-2`` heuristic."""
+        win = np.full((len(SCALAR_FIELDS), fired.shape[1]), _DEFAULT, dtype=np.int32)
+        for r in range(len(self.rules)):
+            for f in np.flatnonzero(self.effect_codes[r]):
+                win[f] = np.where(fired[r], r, win[f])
+        forced = intent == self._sos
+        if self._escalates.any():
+            forced |= fired[self._escalates].any(axis=0)
+        win[_FOLLOW_UP] = np.where(forced, _FORCED, win[_FOLLOW_UP])
+        return win
+
+    def _batches(self, batch_size: int, sample: Optional[int], seed: int) -> Iterator[np.ndarray]:
+        total = self.space.size
+        if sample is None or sample >= total:
+            for start in range(0, total, batch_size):
+                yield np.arange(start, min(total, start + batch_size), dtype=np.int64)
+            return
+        rng = np.random.default_rng(seed)
+        for start in range(0, sample, batch_size):
+            yield rng.integers(0, total, size=min(batch_size, sample - start), dtype=np.int64)
+
+    def run(self, *, sample: Optional[int] = None, batch_size: int = 1 << 18, seed: int = 0) -> "SimulationReport":
+        """Enumerates the whole space, or ``sample`` random contexts of it."""
+        n_rules = len(self.rules)
+        report = SimulationReport(
+            self,
+            fired=np.zeros(n_rules, dtype=np.int64),
+            effective=np.zeros(n_rules, dtype=np.int64),
+            overridden=np.zeros((len(SCALAR_FIELDS), n_rules, n_rules), dtype=np.int64),
+        )
+        started = time.perf_counter()
+        for index in self._batches(batch_size, sample, seed):
+            fired, digits = self.masks(index)
+            win = self.winners(fired, digits[0])
+            report.evaluated += len(index)
+            report.fired += fired.sum(axis=1)
+            for r in range(n_rules):
+                kept = fired[r] if self.has_collection_effect[r] else fired[r] & (win == r).any(axis=0)
+                report.effective[r] += int(kept.sum())
+            for f in range(len(SCALAR_FIELDS)):
+                codes = self.effect_codes[:, f]
+                for r in np.flatnonzero(codes).tolist():
+                    # fired, but a later rule left a different value in the plan
+                    lost = fired[r] & (win[f] >= 0)
+                    lost &= codes[np.maximum(win[f], 0)] != codes[r]
+                    if not lost.any():
+                        continue
+                    counts = np.bincount(win[f][lost], minlength=n_rules)
+                    report.overridden[f, r] += counts
+                    for other in np.flatnonzero(counts):
+                        first = int(index[lost][win[f][lost] == other][0])
+                        report.examples.setdefault((f, int(r), int(other)), first)
+        report.seconds = time.perf_counter() - started
+        return report
+
+    def verify(self, engine: "DecisionEngine", n: int = 200, seed: int = 1) -> List[Dict[str, Any]]:
+        """Replays ``n`` sampled contexts through ``engine.plan``; returns the contexts that disagree."""
+        from domain.reasoning.models import ReasoningContext
+
+        index = np.random.default_rng(seed).integers(0, self.space.size, size=n, dtype=np.int64)
+        fired, digits = self.masks(index)
+        win = self.winners(fired, digits[0])
+        mismatches: List[Dict[str, Any]] = []
+        for col, idx in enumerate(index):
+            ctx = self.space.decode(int(idx))
+            plan = engine.plan(
+                ReasoningContext(
+                    user_message="",
+                    persona={},
+                    world_state={},
+                    memory_facts=(),
+                    chat_history=(),
+                    intent=ctx["intent"],
+                    user_emotion=ctx["user_emotion"],
+                    affinity=ctx["affinity"],
+                    closeness=ctx["closeness"],
+                    adult_confirmed=ctx["adult_confirmed"],
+                    flirt_level=ctx["flirt_level"],
+                    persona_traits=tuple(ctx["persona_traits"]),
+                    memory_tags=tuple(ctx["memory_tags"]),
+                    time_of_day=ctx["time_of_day"],
+                    weather_condition=ctx["weather_condition"],
+                )
+            )
+            expected = [rule.id for r, (_, rule) in enumerate(self.rules) if fired[r, col]]
+            scalars_ok = all(
+                getattr(plan, "follow_up_strategy" if name == "follow_up" else name)
+                == getattr(self.rules[w][1].effect, name)
+                for name, w in zip(SCALAR_FIELDS, win[:, col], strict=True)
+                if w >= 0
+            )
+            if plan.applied_rules != expected or not scalars_ok:
+                mismatches.append(ctx)
+        return mismatches
+
+
+@dataclass
+class SimulationReport:
+    simulator: PolicySimulator
+    fired: np.ndarray
+    effective: np.ndarray
+    overridden: np.ndarray  # (field, loser, winner) -> contexts
+    examples: Dict[Tuple[int, int, int], int] = field(default_factory=dict)
+    evaluated: int = 0
+    seconds: float = 0.0
+
+    @property
+    def throughput(self) -> float:
+        return self.evaluated / self.seconds if self.seconds else 0.0
+
+    def _ids(self, mask: np.ndarray) -> List[str]:
+        return [self.simulator.rules[r][1].id for r in np.flatnonzero(mask)]
+
+    def unreachable(self) -> List[str]:
+        """Rules whose condition no context in the space satisfies."""
+        return self._ids(self.fired == 0)
+
+    def shadowed(self) -> List[str]:
+        """Rules that fire but never leave anything in the final plan."""
+        return self._ids((self.fired > 0) & (self.effective == 0))
+
+    def conflicts(self, min_count: int = 1) -> List[Dict[str, Any]]:
+        sim = self.simulator
+        out = []
+        for f, r, other in zip(*np.nonzero(self.overridden >= min_count), strict=True):
+            name = SCALAR_FIELDS[f]
+            example = sim.space.decode(self.examples[(int(f), int(r), int(other))])
+            out.append(
+                {
+                    "field": name,
+                    "rule": sim.rules[r][1].id,
+                    "value": sim.values[name][sim.effect_codes[r, f]],
+                    "overridden_by": sim.rules[other][1].id,
+                    "by_value": sim.values[name][sim.effect_codes[other, f]],
+                    "contexts": int(self.overridden[f, r, other]),
+                    "example": {k: sorted(v) if isinstance(v, frozenset) else v for k, v in example.items()},
+                }
+            )
+        return sorted(out, key=lambda c: -c["contexts"])
+
+    def as_dict(self) -> Dict[str, Any]:
+        total = max(1, self.evaluated)
+        return {
+            "evaluated": self.evaluated,
+            "seconds": round(self.seconds, 3),
+            "contexts_per_sec": round(self.throughput),
+            "coverage": {
+                rule.id: {
+                    "bucket": bucket,
+                    "fired": round(int(self.fired[r]) / total, 6),
+                    "effective": round(int(self.effective[r]) / total, 6),
+                }
+                for r, (bucket, rule) in enumerate(self.simulator.rules)
+            },
+            "unreachable": self.unreachable(),
+            "shadowed": self.shadowed(),
+            "conflicts": self.conflicts(),
+        }
+
+    def format(self) -> str:
+        data = self.as_dict()
+        lines = [
+            f"{self.evaluated:,} contexts x {len(self.simulator.rules)} rules in {self.seconds:.2f}s "
+            f"({self.throughput / 1e6:.1f}M contexts/s)",
+            "coverage (fired / effective):",
+        ]
+        for rule_id, cov in data["coverage"].items():
+            lines.append(f"  {cov['bucket']:<8}{rule_id:<28}{cov['fired']:>8.2%} /{cov['effective']:>8.2%}")
+        lines.append(f"unreachable: {', '.join(data['unreachable']) or '-'}")
+        lines.append(f"shadowed:    {', '.join(data['shadowed']) or '-'}")
+        lines.append("conflicts:" if data["conflicts"] else "conflicts:   -")
+        for c in data["conflicts"]:
+            ex = c["example"]
+            lines.append(
+                f"  {c['field']}: {c['rule']}={c['value']} <- {c['overridden_by']}={c['by_value']} "
+                f"in {c['contexts']:,} contexts, e.g. intent={ex['intent']} affinity={ex['affinity']} "
+                f"emotion={ex['user_emotion']} adult={ex['adult_confirmed']}"
+            )
+        return "\n".join(lines)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Policy coverage and conflict simulator")
+    parser.add_argument("policies", nargs="?", default="policies")
+    parser.add_argument("--sample", type=int, default=None, help="sample N contexts instead of enumerating")
+    parser.add_argument("--batch", type=int, default=1 << 18)
+    parser.add_argument("--json", dest="json_path", default=None, help="also write the report as JSON")
+    parser.add_argument(
+        "--verify", type=int, default=200, help="cross-check N sampled contexts against DecisionEngine (0 to skip)"
+    )
+    args = parser.parse_args(argv)
+
+    bundle = load_policy_bundle(Path(args.policies))
+    simulator = PolicySimulator(bundle)
+    report = simulator.run(sample=args.sample, batch_size=args.batch)
+    print(report.format())
+    if args.json_path:
+        Path(args.json_path).write_text(json.dumps(report.as_dict(), ensure_ascii=False, indent=2), encoding="utf-8")
+    if args.verify:
+        from domain.reasoning.decision_engine import DecisionEngine
+
+        mismatches = simulator.verify(DecisionEngine(bundle), n=args.verify)
+        print(f"verify: {args.verify - len(mismatches)}/{args.verify} contexts agree with DecisionEngine")
+        return 1 if mismatches else 0
+    return 0
+
+
+if __name__ == "__main__":
+    setup_logging("WARNING")  # the engine's per-plan debug lines would bury the report
+    sys.exit(main())
@@ -0,0 +1,93 @@
+"""Background mtime-polling reload of the policy YAML bundle."""
+from __future__ import annotations
+
+import asyncio
+from pathlib import Path
+from typing import TYPE_CHECKING, Dict, Optional, Tuple
+
+from core.logging import get_logger
+
+from .compiled import CompiledPolicies, compile_bundle
+from .loader import POLICY_FILES, PolicyValidationError, load_validated_bundle
+from .models import PolicyBundle
+
+if TYPE_CHECKING:
+    from domain.reasoning.decision_engine import DecisionEngine
+
+log = get_logger("policies.watcher")
+
+Stamp = Dict[str, Tuple[int, int]]
+
+
+def _stamp(base_path: Path) -> Stamp:
+    out: Stamp = {}
+    for name in POLICY_FILES:
+        try:
+            st = (base_path / name).stat()
+        except FileNotFoundError:
+            continue
+        out[name] = (st.st_mtime_ns, st.st_size)
+    return out
+
+
+def _load_and_compile(base_path: Path) -> Tuple[PolicyBundle, CompiledPolicies]:
+    bundle = load_validated_bundle(base_path)
+    return bundle, compile_bundle(bundle)
+
+
+class PolicyWatcher:
+    """Polls file mtimes and swaps a freshly parsed, validated and compiled bundle into the engine.
+
+    Parsing and compiling run in a worker thread; the swap itself is one
+    assignment inside ``DecisionEngine.load``. A bundle that fails validation
+    is recorded via ``DecisionEngine.reject`` and the old one keeps serving.
+    """
+
+    def __init__(self, engine: "DecisionEngine", base_path: Path, *, interval_sec: float = 2.0) -> None:
+        self.engine = engine
+        self.base_path = Path(base_path)
+        self.interval_sec = interval_sec
+        self.reloads = 0
+        self.failures = 0
+        self._stamp = _stamp(self.base_path)
+        self._task: Optional[asyncio.Task[None]] = None
+
+    async def check_once(self) -> bool:
+        """Returns True when a new bundle was swapped in."""
+        stamp = await asyncio.to_thread(_stamp, self.base_path)
+        if stamp == self._stamp:
+            return False
+        self._stamp = stamp
+        try:
+            bundle, compiled = await asyncio.to_thread(_load_and_compile, self.base_path)
+        except PolicyValidationError as exc:
+            self.failures += 1
+            self.engine.reject(exc.errors)
+            log.warning("policies.reload_rejected", errors=exc.errors)
+            return False
+        version = self.engine.load(bundle, compiled)
+        self.reloads += 1
+        log.info("policies.reloaded", version=version)
+        return True
+
+    async def run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval_sec)
+            try:
+                await self.check_once()
+            except Exception:
+                log.exception("policies.watch_failed")
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self.run())
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
@@ -1,13 +1,18 @@
 """Policy-driven decision engine."""
 from __future__ import annotations
 
-from dataclasses import asdict
-from typing import Dict, Iterable, List
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Tuple
 
 from core.logging import get_logger
-from domain.policies.models import PolicyBundle, PolicyEffect, PolicyRule
+from domain.policies.compiled import CompiledBucket, CompiledPolicies, EffectItems, compile_bundle
+from domain.policies.models import PolicyBundle, PolicyEffect
 
 from .models import DialoguePlan, ReasoningContext
+from .plan_cache import PlanCache, canonical_key
+from .speech import SpeechProfile
+from .trace import DecisionTrace, FieldChange, TraceRing, effect_changes
 
 log = get_logger("decision_engine")
 
@@ -21,10 +26,60 @@ _DEFAULT_EFFECT = PolicyEffect(
     content_goals=["acknowledge_user"],
 )
 
+SPEECH_MIN_MESSAGES = 5
+TERSE_SHORT_BIAS = 0.6
+
+
+@dataclass(frozen=True, slots=True)
+class PolicySnapshot:
+    bundle: PolicyBundle
+    compiled: CompiledPolicies
+    version: int
+    loaded_at: float
+
 
 class DecisionEngine:
-    def __init__(self, bundle: PolicyBundle):
-        self.bundle = bundle
+    """Plans turns against an immutable :class:`PolicySnapshot`.
+
+    ``load`` replaces the snapshot with a single attribute assignment, so a
+    turn that already read it keeps planning against the old bundle.
+    """
+
+    def __init__(self, bundle: PolicyBundle, *, plan_cache_size: int = 1024, tracer: TraceRing | None = None):
+        self.plan_cache = PlanCache(plan_cache_size)
+        self.tracer = tracer
+        self.load_errors: List[str] = []
+        self._snapshot: PolicySnapshot | None = None
+        self.load(bundle)
+
+    @property
+    def snapshot(self) -> PolicySnapshot:
+        assert self._snapshot is not None
+        return self._snapshot
+
+    @property
+    def bundle(self) -> PolicyBundle:
+        return self.snapshot.bundle
+
+    @property
+    def compiled(self) -> CompiledPolicies:
+        return self.snapshot.compiled
+
+    @property
+    def version(self) -> int:
+        return self.snapshot.version
+
+    def load(self, bundle: PolicyBundle, compiled: CompiledPolicies | None = None) -> int:
+        """Swaps in a new bundle (compiling it unless given); plans of older versions are dropped."""
+        version = self._snapshot.version + 1 if self._snapshot else 1
+        self._snapshot = PolicySnapshot(bundle, compiled or compile_bundle(bundle), version, time.time())
+        self.load_errors = []
+        self.plan_cache.clear()
+        return version
+
+    def reject(self, errors: List[str]) -> None:
+        """Records a failed reload; the active bundle stays in place."""
+        self.load_errors = list(errors)
 
     def _base_plan(self, ctx: ReasoningContext) -> DialoguePlan:
         return DialoguePlan(
@@ -37,18 +92,51 @@ class DecisionEngine:
             content_goals=list(_DEFAULT_EFFECT.content_goals),
         )
 
-    def _apply_rules(self, plan: DialoguePlan, rules: Iterable[PolicyRule], ctx: Dict[str, object]) -> None:
-        for rule in rules:
-            if rule.applies_to(ctx):
-                effect_dict = asdict(rule.effect)
-                plan.apply_effect(rule.id, effect_dict)
+    @staticmethod
+    def _matching(bucket: CompiledBucket, intent: str, ctx: Dict[str, object]) -> List[Tuple[str, EffectItems]]:
+        return [(rule.id, rule.effect_items) for rule in bucket.candidates(intent) if rule.matches(ctx)]
 
     def plan(self, ctx: ReasoningContext) -> DialoguePlan:
+        snapshot = self.snapshot
         policy_ctx = ctx.as_policy_context()
+        key = canonical_key(policy_ctx, snapshot.version)
+        if self.tracer is not None and self.tracer.should_sample():
+            plan = self._evaluate(snapshot, ctx, policy_ctx, traced=True)
+            self.plan_cache.put(key, plan)
+            return self._adapt_to_speech(plan, ctx.speech_profile)
+        cached = self.plan_cache.get(key)
+        if cached is not None:
+            return self._adapt_to_speech(cached, ctx.speech_profile)
+        plan = self._evaluate(snapshot, ctx, policy_ctx)
+        self.plan_cache.put(key, plan)
+        return self._adapt_to_speech(plan, ctx.speech_profile)
+
+    @staticmethod
+    def _adapt_to_speech(plan: DialoguePlan, profile: SpeechProfile | None) -> DialoguePlan:
+        """Per-user tweaks applied on top of the (possibly cached) plan; never part of the cache key."""
+        if profile is None or profile.messages < SPEECH_MIN_MESSAGES:
+            return plan
+        if profile.short_bias >= TERSE_SHORT_BIAS and plan.response_length == "medium":
+            plan.response_length = "short"
+        plan.metadata["speech"] = {
+            "avg_words": round(profile.avg_words, 1),
+            "q_ratio": round(profile.q_ratio, 2),
+            "emoji_ratio": round(profile.emoji_ratio, 2),
+            "short_bias": round(profile.short_bias, 2),
+        }
+        return plan
+
+    def _evaluate(
+        self, snapshot: PolicySnapshot, ctx: ReasoningContext, policy_ctx: Dict[str, object], traced: bool = False
+    ) -> DialoguePlan:
         plan = self._base_plan(ctx)
-        self._apply_rules(plan, self.bundle.content, policy_ctx)
-        self._apply_rules(plan, self.bundle.style, policy_ctx)
-        self._apply_rules(plan, self.bundle.safety, policy_ctx)
+        if traced:
+            self._evaluate_traced(snapshot, plan, policy_ctx)
+        else:
+            matched: List[Tuple[str, EffectItems]] = []
+            for bucket in snapshot.compiled.buckets:
+                matched.extend(self._matching(bucket, ctx.intent, policy_ctx))
+            plan.apply_many(matched)
 
         # derived safety heuristics
         if ctx.intent == "sos" or "escalate" in plan.safety_directives:
@@ -68,8 +156,31 @@ class DecisionEngine:
         )
         return plan
 
+    def _evaluate_traced(self, snapshot: PolicySnapshot, plan: DialoguePlan, policy_ctx: Dict[str, object]) -> None:
+        # rule-by-rule so every effect's field changes can be recorded; only runs for sampled turns
+        considered: List[str] = []
+        changes: List[FieldChange] = []
+        for bucket in snapshot.compiled.buckets:
+            for rule in bucket.candidates(plan.intent):
+                considered.append(rule.id)
+                if rule.matches(policy_ctx):
+                    changes.extend(effect_changes(plan, rule.id, rule.effect_items))
+                    plan.apply_items(rule.id, rule.effect_items)
+        assert self.tracer is not None
+        self.tracer.record(
+            DecisionTrace(
+                ts=time.time(),
+                intent=plan.intent,
+                bundle_version=snapshot.version,
+                considered=tuple(considered),
+                matched=tuple(plan.applied_rules),
+                changes=tuple(changes),
+            )
+        )
+
     def describe(self) -> Dict[str, List[str]]:
         info: Dict[str, List[str]] = {"content": [], "style": [], "safety": []}
-        for bucket, rules in (("content", self.bundle.content), ("style", self.bundle.style), ("safety", self.bundle.safety)):
+        bundle = self.bundle
+        for bucket, rules in (("content", bundle.content), ("style", bundle.style), ("safety", bundle.safety)):
             info[bucket] = [f"{r.id}: {r.description}" for r in rules]
         return info
@@ -0,0 +1,182 @@
+"""Lexicon-driven user emotion detection with a decayed per-user state."""
+from __future__ import annotations
+
+import re
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, FrozenSet, Iterable, List, Optional, Tuple
+
+import yaml
+
+NEUTRAL = "neutral"
+
+_TOKEN_RE = re.compile(r"[0-9a-zа-яё]+")
+_MEMO_LIMIT = 50_000
+
+
+@dataclass(frozen=True, slots=True)
+class EmotionLexicon:
+    labels: Tuple[str, ...] = ()
+    stems: Dict[str, Tuple[int, float]] = field(default_factory=dict)
+    words: Dict[str, Tuple[int, float]] = field(default_factory=dict)
+    intensifiers: Dict[str, float] = field(default_factory=dict)
+    negations: FrozenSet[str] = frozenset()
+    negation_window: int = 3
+    negation_weight: float = -0.5
+
+    @property
+    def stem_lengths(self) -> Tuple[int, ...]:
+        return tuple(sorted({len(s) for s in self.stems}, reverse=True))
+
+
+def load_lexicon(path: str | Path) -> EmotionLexicon:
+    """Reads ``persona/lexicon.yml``; a missing or empty file yields an empty lexicon.
+
+    Entries match as token prefixes; an entry ending in ``$`` matches only
+    the whole token (``ура$`` must not fire on «ураган»).
+    """
+    path = Path(path)
+    data = yaml.safe_load(path.read_text(encoding="utf-8")) if path.exists() else None
+    data = data or {}
+    labels = tuple((data.get("emotions") or {}).keys())
+    stems: Dict[str, Tuple[int, float]] = {}
+    words: Dict[str, Tuple[int, float]] = {}
+    for idx, label in enumerate(labels):
+        for stem, weight in (data["emotions"][label] or {}).items():
+            stem = str(stem).lower()
+            if stem.endswith("$"):
+                words[stem[:-1]] = (idx, float(weight))
+            else:
+                stems[stem] = (idx, float(weight))
+    return EmotionLexicon(
+        labels=labels,
+        stems=stems,
+        words=words,
+        intensifiers={str(k).lower(): float(v) for k, v in (data.get("intensifiers") or {}).items()},
+        negations=frozenset(str(n).lower() for n in data.get("negations") or ()),
+        negation_window=int(data.get("negation_window", 3)),
+        negation_weight=float(data.get("negation_weight", -0.5)),
+    )
+
+
+class EmotionScorer:
+    """Scores a message in one pass over its tokens.
+
+    Whole-word entries are checked first, then stems by prefix, longest
+    first; the result per token is
+    memoized, so steady-state scoring is one dict lookup per token.
+    Intensifiers multiply the next emotional word, a negation within
+    ``negation_window`` tokens flips and dampens it, and ``!`` adds emphasis.
+    """
+
+    def __init__(self, lexicon: EmotionLexicon) -> None:
+        self.lexicon = lexicon
+        self._lengths = lexicon.stem_lengths
+        self._memo: Dict[str, Optional[Tuple[int, float]]] = {}
+
+    @property
+    def labels(self) -> Tuple[str, ...]:
+        return self.lexicon.labels
+
+    def _lookup(self, token: str) -> Optional[Tuple[int, float]]:
+        memo = self._memo
+        if token in memo:
+            return memo[token]
+        stems = self.lexicon.stems
+        hit = self.lexicon.words.get(token)
+        if hit is None:
+            for length in self._lengths:
+                if length <= len(token):
+                    hit = stems.get(token[:length])
+                    if hit is not None:
+                        break
+        if len(memo) >= _MEMO_LIMIT:
+            memo.clear()
+        memo[token] = hit
+        return hit
+
+    def score(self, text: str) -> Tuple[float, ...]:
+        """Per-label intensity in ``[0, 1)``, in ``labels`` order."""
+        lex = self.lexicon
+        raw = [0.0] * len(lex.labels)
+        if not raw or not text:
+            return tuple(raw)
+        multiplier = 1.0
+        negated = 0
+        for token in _TOKEN_RE.findall(text.lower()):
+            if token in lex.negations:
+                negated = lex.negation_window
+                continue
+            boost = lex.intensifiers.get(token)
+            if boost is not None:
+                multiplier *= boost
+                continue
+            hit = self._lookup(token)
+            if hit is None:
+                if negated:
+                    negated -= 1
+                continue
+            idx, weight = hit
+            weight *= multiplier
+            if negated:
+                weight *= lex.negation_weight
+                negated = 0
+            raw[idx] += weight
+            multiplier = 1.0
+        emphasis = 1.0 + 0.1 * min(text.count("!"), 3)
+        return tuple((s * emphasis) / (1.0 + s * emphasis) if s > 0 else 0.0 for s in raw)
+
+    def score_batch(self, texts: Iterable[str]) -> List[Tuple[float, ...]]:
+        score = self.score
+        return [score(t) for t in texts]
+
+
+class EmotionTracker:
+    """Keeps a decayed emotion vector per user, updated in O(labels) per turn.
+
+    ``state = min(1, decay * state + score)``; the dominant label is reported
+    once it reaches ``threshold``, otherwise the user is ``neutral``. The
+    number of tracked users is bounded (least recently updated are dropped).
+    """
+
+    def __init__(
+        self,
+        scorer: EmotionScorer,
+        *,
+        decay: float = 0.7,
+        threshold: float = 0.3,
+        max_users: int = 10_000,
+    ) -> None:
+        self.scorer = scorer
+        self.decay = decay
+        self.threshold = threshold
+        self.max_users = max_users
+        self._state: "OrderedDict[int, List[float]]" = OrderedDict()
+
+    def _label(self, state: List[float]) -> str:
+        if not state:
+            return NEUTRAL
+        best = max(range(len(state)), key=state.__getitem__)
+        return self.scorer.labels[best] if state[best] >= self.threshold else NEUTRAL
+
+    def update(self, user_id: int, text: str) -> str:
+        scores = self.scorer.score(text)
+        state = self._state.pop(user_id, None) or [0.0] * len(scores)
+        decay = self.decay
+        state = [min(1.0, decay * s + x) for s, x in zip(state, scores, strict=True)]
+        self._state[user_id] = state
+        if len(self._state) > self.max_users:
+            self._state.popitem(last=False)
+        return self._label(state)
+
+    def current(self, user_id: int) -> str:
+        return self._label(self._state.get(user_id) or [])
+
+    def snapshot(self, user_id: int) -> Dict[str, float]:
+        state = self._state.get(user_id) or [0.0] * len(self.scorer.labels)
+        return {label: round(v, 3) for label, v in zip(self.scorer.labels, state, strict=True)}
+
+
+def default_tracker(lexicon_path: str | Path = "persona/lexicon.yml") -> EmotionTracker:
+    return EmotionTracker(EmotionScorer(load_lexicon(lexicon_path)))
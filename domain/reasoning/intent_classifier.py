@@ -3,7 +3,7 @@ from __future__ import annotations
 
 import re
 from dataclasses import dataclass
-from typing import Literal
+from typing import Dict, FrozenSet, Iterable, List, Literal, Optional, Sequence, Tuple
 
 Intent = Literal[
     "greeting",
@@ -14,6 +14,7 @@ Intent = Literal[
     "memory_query",
     "flirt",
     "plan",
+    "news",
     "smalltalk",
     "sos",
     "unknown",
@@ -34,32 +35,99 @@ _FAREWELL_RE = re.compile(r"\b(пока|до\s+свидания|спокойно
 _MEMORY_RE = re.compile(r"\b(что\s+ты\s+(?:помнишь|запомнила)\s+обо\s+мне)\b", re.IGNORECASE)
 _FLIRT_RE = re.compile(r"флирт|поцелу\w*|романтик\w*|мило\s+говори", re.IGNORECASE)
 _SOS_RE = re.compile(r"\b(помоги|плохо|депрессия|тревога|я\s+сломал(ся)?|не\s+справляюсь)\b", re.IGNORECASE)
+_NEWS_RE = re.compile(r"\b(новост\w*|что\s+(?:пишут|слышно)\s+в\s+мире)", re.IGNORECASE)
 _PLAN_RE = re.compile(r"\b(план|что\s+делать|как\s+провести|куда\s+сходить)\b", re.IGNORECASE)
 
 
-def classify_intent(text: str) -> IntentResult:
-    if not text:
-        return IntentResult("unknown", 0.0)
-    stripped = text.strip()
-    lower = stripped.lower()
-    if _SOS_RE.search(lower):
-        return IntentResult("sos", 0.9)
-    if _WEATHER_RE.search(lower):
-        return IntentResult("weather", 0.85)
-    if _TIME_RE.search(lower):
-        return IntentResult("time", 0.8)
-    if _DATE_RE.search(lower):
-        return IntentResult("date", 0.7)
-    if _MEMORY_RE.search(lower):
-        return IntentResult("memory_query", 0.75)
-    if _FLIRT_RE.search(lower):
-        return IntentResult("flirt", 0.6)
-    if _PLAN_RE.search(lower):
-        return IntentResult("plan", 0.6)
-    if _GREETING_RE.search(lower):
-        return IntentResult("greeting", 0.6)
-    if _FAREWELL_RE.search(lower):
-        return IntentResult("farewell", 0.6)
+@dataclass(frozen=True, slots=True)
+class _IntentRule:
+    intent: Intent
+    confidence: float
+    pattern: re.Pattern[str]
+    keywords: Tuple[str, ...]
+
+
+# Priority order. Every match of ``pattern`` contains at least one of ``keywords``,
+# which makes the keyword scan in IntentMatcher an exact prefilter.
+_RULES: Tuple[_IntentRule, ...] = (
+    _IntentRule("sos", 0.9, _SOS_RE, ("помоги", "плохо", "депрессия", "тревога", "сломал", "справляюсь")),
+    _IntentRule("weather", 0.85, _WEATHER_RE, ("погода", "погоде", "погоды")),
+    _IntentRule("time", 0.8, _TIME_RE, ("час", "времени")),
+    _IntentRule("date", 0.7, _DATE_RE, ("дата", "число")),
+    _IntentRule("memory_query", 0.75, _MEMORY_RE, ("помнишь", "запомнила")),
+    _IntentRule("flirt", 0.6, _FLIRT_RE, ("флирт", "поцелу", "романтик", "мило")),
+    _IntentRule("news", 0.7, _NEWS_RE, ("новост", "пишут", "слышно")),
+    _IntentRule("plan", 0.6, _PLAN_RE, ("план", "делать", "провести", "сходить")),
+    _IntentRule("greeting", 0.6, _GREETING_RE, ("привет", "здравствуй", "доброе", "добрый")),
+    _IntentRule("farewell", 0.6, _FAREWELL_RE, ("пока", "свидания", "ночи")),
+)
+
+
+def _can_overlap(a: str, b: str) -> bool:
+    if a in b or b in a:
+        return True
+    shortest = min(len(a), len(b))
+    return any(a[-k:] == b[:k] or b[-k:] == a[:k] for k in range(1, shortest))
+
+
+class IntentMatcher:
+    """Single-pass matcher over a prioritized rule table.
+
+    One scan of a combined keyword alternation yields the candidate rules; only
+    those are verified with their full regex, highest priority first. A
+    non-overlapping scan can hide a keyword that overlaps a found one, so each
+    keyword also nominates the rules of every keyword it can overlap with.
+    """
+
+    def __init__(self, rules: Sequence[_IntentRule]) -> None:
+        self.rules = tuple(rules)
+        owners: Dict[str, set[int]] = {}
+        for rank, rule in enumerate(self.rules):
+            for kw in rule.keywords:
+                owners.setdefault(kw, set()).add(rank)
+        self._candidates: Dict[str, FrozenSet[int]] = {}
+        for kw in owners:
+            ranks = set(owners[kw])
+            for other, other_ranks in owners.items():
+                if other != kw and _can_overlap(kw, other):
+                    ranks |= other_ranks
+            self._candidates[kw] = frozenset(ranks)
+        alternation = "|".join(re.escape(k) for k in sorted(owners, key=len, reverse=True))
+        self._prefilter = re.compile(alternation)
+
+    def match(self, lower: str) -> Optional[_IntentRule]:
+        hits = self._prefilter.findall(lower)
+        if not hits:
+            return None
+        candidates = self._candidates
+        ranks: set[int] = set()
+        for hit in hits:
+            ranks |= candidates[hit]
+        for idx in sorted(ranks):
+            rule = self.rules[idx]
+            if rule.pattern.search(lower):
+                return rule
+        return None
+
+
+_MATCHER = IntentMatcher(_RULES)
+
+
+def _classify_lower(lower: str) -> IntentResult:
+    rule = _MATCHER.match(lower)
+    if rule is not None:
+        return IntentResult(rule.intent, rule.confidence)
     if len(lower) <= 3:
         return IntentResult("smalltalk", 0.3)
     return IntentResult("smalltalk", 0.4)
+
+
+def classify_intent(text: str) -> IntentResult:
+    if not text:
+        return IntentResult("unknown", 0.0)
+    return _classify_lower(text.strip().lower())
+
+
+def classify_batch(texts: Iterable[str]) -> List[IntentResult]:
+    """Classifies many messages (replays, analytics) with the shared compiled matcher."""
+    return [_classify_lower(t.strip().lower()) if t else IntentResult("unknown", 0.0) for t in texts]
@@ -1,8 +1,10 @@
 """Core reasoning data structures."""
 from __future__ import annotations
 
-from dataclasses import dataclass, field
-from typing import Any, Dict, List, Sequence
+from dataclasses import dataclass, field, replace
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from .speech import SpeechProfile
 
 
 @dataclass(slots=True)
@@ -21,33 +23,58 @@ class DialoguePlan:
     applied_rules: List[str] = field(default_factory=list)
     metadata: Dict[str, Any] = field(default_factory=dict)
 
+    def copy(self) -> "DialoguePlan":
+        """Independent copy: list and dict fields are duplicated, scalars shared."""
+        return replace(
+            self,
+            content_goals=list(self.content_goals),
+            forbid_topics=list(self.forbid_topics),
+            require_topics=list(self.require_topics),
+            safety_directives=list(self.safety_directives),
+            style_mods=dict(self.style_mods),
+            applied_rules=list(self.applied_rules),
+            metadata=dict(self.metadata),
+        )
+
     def apply_effect(self, rule_id: str, effect: Dict[str, Any]) -> None:
-        self.applied_rules.append(rule_id)
-        for key, value in effect.items():
-            if value is None:
-                continue
-            if key == "tone":
-                self.tone = value
-            elif key == "emotion":
-                self.emotion = value
-            elif key == "register":
-                self.register = value
-            elif key == "response_length":
-                self.response_length = value
-            elif key == "follow_up":
-                self.follow_up_strategy = value
-            elif key == "content_goals":
-                self.content_goals = list({*self.content_goals, *value})
-            elif key == "forbid_topics":
-                self.forbid_topics = list({*self.forbid_topics, *value})
-            elif key == "require_topics":
-                self.require_topics = list({*self.require_topics, *value})
-            elif key == "safety":
-                self.safety_directives = list({*self.safety_directives, *value})
-            elif key == "style_mods":
-                self.style_mods.update(value)
-            elif key == "metadata":
-                self.metadata.update(value)
+        self.apply_many(((rule_id, effect.items()),))
+
+    def apply_items(self, rule_id: str, items: Iterable[Tuple[str, Any]]) -> None:
+        self.apply_many(((rule_id, items),))
+
+    def apply_many(self, matched: Iterable[Tuple[str, Iterable[Tuple[str, Any]]]]) -> None:
+        """Applies rule effects in order: scalars last-wins, lists unioned once at the end."""
+        lists = {name: dict.fromkeys(getattr(self, attr)) for name, attr in _LIST_FIELDS.items()}
+        for rule_id, items in matched:
+            self.applied_rules.append(rule_id)
+            for key, value in items:
+                if value is None:
+                    continue
+                if key in _SCALAR_FIELDS:
+                    setattr(self, _SCALAR_FIELDS[key], value)
+                elif key in lists:
+                    lists[key].update(dict.fromkeys(value))
+                elif key == "style_mods":
+                    self.style_mods.update(value)
+                elif key == "metadata":
+                    self.metadata.update(value)
+        for name, attr in _LIST_FIELDS.items():
+            setattr(self, attr, list(lists[name]))
+
+
+_SCALAR_FIELDS = {
+    "tone": "tone",
+    "emotion": "emotion",
+    "register": "register",
+    "response_length": "response_length",
+    "follow_up": "follow_up_strategy",
+}
+_LIST_FIELDS = {
+    "content_goals": "content_goals",
+    "forbid_topics": "forbid_topics",
+    "require_topics": "require_topics",
+    "safety": "safety_directives",
+}
 
 
 @dataclass(slots=True)
@@ -67,6 +94,8 @@ class ReasoningContext:
     memory_tags: Sequence[str]
     time_of_day: str
     weather_condition: str
+    speech_profile: Optional[SpeechProfile] = None
+    news: Sequence[Dict[str, Any]] = ()
 
     def as_policy_context(self) -> Dict[str, Any]:
         return {
@@ -76,8 +105,8 @@ class ReasoningContext:
             "adult_confirmed": self.adult_confirmed,
             "flirt_level": self.flirt_level,
             "user_emotion": self.user_emotion,
-            "persona_traits": list(self.persona_traits),
-            "memory_tags": list(self.memory_tags),
+            "persona_traits": frozenset(self.persona_traits),
+            "memory_tags": frozenset(self.memory_tags),
             "time_of_day": self.time_of_day,
             "weather_condition": self.weather_condition,
         }
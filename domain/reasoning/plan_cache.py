@@ -0,0 +1,66 @@
+"""LRU memoization of dialogue plans keyed by the canonical policy context."""
+from __future__ import annotations
+
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+from .models import DialoguePlan
+
+PlanKey = Tuple[Hashable, ...]
+
+
+def canonical_key(policy_ctx: Dict[str, Any], bundle_version: int) -> PlanKey:
+    """Order-independent, hashable form of ``as_policy_context()`` plus the bundle version."""
+    items = []
+    for name in sorted(policy_ctx):
+        value = policy_ctx[name]
+        if isinstance(value, (set, frozenset, list, tuple)):
+            value = tuple(sorted(value))
+        items.append((name, value))
+    return (bundle_version, *items)
+
+
+@dataclass(slots=True)
+class PlanCacheMetrics:
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+
+class PlanCache:
+    """Stores private plan instances and hands out copies, so callers may mutate what they get."""
+
+    def __init__(self, max_entries: int = 1024) -> None:
+        self.max_entries = max_entries
+        self.metrics = PlanCacheMetrics()
+        self._entries: "OrderedDict[PlanKey, DialoguePlan]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: PlanKey) -> Optional[DialoguePlan]:
+        plan = self._entries.get(key)
+        if plan is None:
+            self.metrics.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.metrics.hits += 1
+        return plan.copy()
+
+    def put(self, key: PlanKey, plan: DialoguePlan) -> None:
+        if self.max_entries <= 0:
+            return
+        self._entries[key] = plan.copy()
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.metrics.evictions += 1
+
+    def clear(self) -> None:
+        self._entries.clear()
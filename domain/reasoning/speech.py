@@ -0,0 +1,64 @@
+"""Per-user speech statistics, maintained as exponentially decayed running means."""
+from __future__ import annotations
+
+import re
+from dataclasses import asdict, dataclass
+from typing import Any, Dict, Optional, Tuple
+
+_EMOJI_RE = re.compile(r"[\U0001F300-\U0001FAFF\u2600-\u27BF]|[:;]-?[)(DP]|\){2,}")
+SHORT_WORDS = 4
+
+
+def message_features(text: str) -> Tuple[int, float, float, float]:
+    """(words, is_question, has_emoji, is_short) of one message."""
+    words = len(text.split())
+    return (
+        words,
+        1.0 if "?" in text else 0.0,
+        1.0 if _EMOJI_RE.search(text) else 0.0,
+        1.0 if words <= SHORT_WORDS else 0.0,
+    )
+
+
+@dataclass(frozen=True, slots=True)
+class SpeechProfile:
+    avg_words: float = 10.0
+    q_ratio: float = 0.2
+    emoji_ratio: float = 0.05
+    short_bias: float = 0.5
+    messages: int = 0
+
+    def observe(self, text: str, alpha: float = 0.1) -> "SpeechProfile":
+        """O(1) update; the step is ``1/n`` until it reaches ``alpha``, so early values are plain means."""
+        text = (text or "").strip()
+        if not text:
+            return self
+        words, question, emoji, short = message_features(text)
+        a = max(alpha, 1.0 / (self.messages + 1))
+        return SpeechProfile(
+            avg_words=self.avg_words + a * (words - self.avg_words),
+            q_ratio=self.q_ratio + a * (question - self.q_ratio),
+            emoji_ratio=self.emoji_ratio + a * (emoji - self.emoji_ratio),
+            short_bias=self.short_bias + a * (short - self.short_bias),
+            messages=self.messages + 1,
+        )
+
+    def encode(self) -> str:
+        """Compact ``memories`` value: ``avg,q,emoji,short,n``."""
+        return (
+            f"{self.avg_words:.2f},{self.q_ratio:.4f},{self.emoji_ratio:.4f},"
+            f"{self.short_bias:.4f},{self.messages}"
+        )
+
+    @classmethod
+    def decode(cls, raw: Optional[str]) -> Optional["SpeechProfile"]:
+        if not raw:
+            return None
+        try:
+            avg, q, emoji, short, n = raw.split(",")
+            return cls(float(avg), float(q), float(emoji), float(short), int(n))
+        except ValueError:
+            return None
+
+    def as_dict(self) -> Dict[str, Any]:
+        return asdict(self)
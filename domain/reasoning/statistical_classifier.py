@@ -0,0 +1,270 @@
+"""Hashed char n-gram linear intent classifier (pure NumPy) with a regex override layer.
+
+Train offline from a labeled JSONL corpus (``{"text": ..., "intent": ...}`` per line)::
+
+    python -m domain.reasoning.statistical_classifier data/intent_corpus.jsonl data/intent_model.npz
+"""
+from __future__ import annotations
+
+import json
+import re
+import sys
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterable, List, Sequence, Tuple, cast
+
+import numpy as np
+
+from .intent_classifier import IntentResult, classify_batch, classify_intent
+
+_WS_RE = re.compile(r"\s+")
+
+
+@dataclass(frozen=True, slots=True)
+class HashingConfig:
+    n_features: int = 1 << 15
+    ngram_min: int = 2
+    ngram_max: int = 4
+
+    def __post_init__(self) -> None:
+        if self.n_features & (self.n_features - 1):
+            raise ValueError("n_features must be a power of two")
+
+
+DEFAULT_HASHING = HashingConfig()
+
+
+def _normalize(text: str) -> str:
+    return " " + _WS_RE.sub(" ", text.strip().lower()) + " "
+
+
+_MULT = np.uint64(0x100000001B3)
+_MIX = np.uint64(0xFF51AFD7ED558CCD)
+_SHIFT = np.uint64(33)
+
+
+def _mix(h: np.ndarray) -> np.ndarray:
+    h = h ^ (h >> _SHIFT)
+    h = h * _MIX
+    return cast(np.ndarray, h ^ (h >> _SHIFT))
+
+
+def featurize(texts: Sequence[str], config: HashingConfig) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Hashes char n-grams of a whole batch at once into CSR arrays.
+
+    The batch is joined into one code-point array; every n-gram hash is a
+    vectorized multiply-xor over shifted views, n-grams crossing a document
+    boundary are masked out, and ``np.unique`` over ``doc * n_features + hash``
+    yields per-document counts already in CSR order.
+    """
+    padded = [_normalize(t) for t in texts]
+    n_docs = len(padded)
+    lengths = np.fromiter(map(len, padded), dtype=np.int64, count=n_docs)
+    cps = np.frombuffer("".join(padded).encode("utf-32-le"), dtype=np.uint32).astype(np.uint64)
+    doc_of = np.repeat(np.arange(n_docs, dtype=np.int64), lengths)
+    mask = np.uint64(config.n_features - 1)
+    keys = []
+    for n in range(config.ngram_min, config.ngram_max + 1):
+        m = len(cps) - n + 1
+        if m <= 0:
+            continue
+        h = np.full(m, n, dtype=np.uint64)
+        for k in range(n):
+            h = (h * _MULT) ^ cps[k : k + m]
+        inside = doc_of[:m] == doc_of[n - 1 : n - 1 + m]
+        keys.append(doc_of[:m][inside] * config.n_features + (_mix(h[inside]) & mask).astype(np.int64))
+    uniq, counts = np.unique(np.concatenate(keys), return_counts=True)
+    docs = uniq // config.n_features
+    ptr = np.searchsorted(docs, np.arange(n_docs + 1))
+    vals = np.sqrt(counts.astype(np.float32))
+    norms = np.sqrt(np.add.reduceat(vals * vals, ptr[:-1]))
+    vals /= np.repeat(norms, np.diff(ptr))
+    return ptr, uniq % config.n_features, vals
+
+
+def _softmax(z: np.ndarray) -> np.ndarray:
+    z = z - z.max(axis=1, keepdims=True)
+    e = np.exp(z)
+    return cast(np.ndarray, e / e.sum(axis=1, keepdims=True))
+
+
+def _linear(weights: np.ndarray, bias: np.ndarray, ptr: np.ndarray, idx: np.ndarray, vals: np.ndarray) -> np.ndarray:
+    contrib = weights[idx] * vals[:, None]
+    return cast(np.ndarray, np.add.reduceat(contrib, ptr[:-1], axis=0) + bias)
+
+
+@dataclass(slots=True)
+class LinearIntentModel:
+    labels: Tuple[str, ...]
+    weights: np.ndarray
+    bias: np.ndarray
+    temperature: float = 1.0
+    config: HashingConfig = DEFAULT_HASHING
+
+    def logits(self, texts: Sequence[str]) -> np.ndarray:
+        return _linear(self.weights, self.bias, *featurize(texts, self.config))
+
+    def predict_proba(self, texts: Sequence[str]) -> np.ndarray:
+        """Calibrated class probabilities, shape ``(len(texts), len(labels))``."""
+        if not texts:
+            return np.zeros((0, len(self.labels)), dtype=np.float32)
+        return _softmax(self.logits(texts) / self.temperature)
+
+    def save(self, path: str | Path) -> None:
+        np.savez_compressed(
+            path,
+            weights=self.weights.astype(np.float16),
+            bias=self.bias.astype(np.float32),
+            labels=np.asarray(self.labels),
+            temperature=np.float32(self.temperature),
+            hashing=np.asarray([self.config.n_features, self.config.ngram_min, self.config.ngram_max]),
+        )
+
+    @classmethod
+    def load(cls, path: str | Path) -> "LinearIntentModel":
+        with np.load(path, allow_pickle=False) as data:
+            n_features, ngram_min, ngram_max = (int(v) for v in data["hashing"])
+            return cls(
+                labels=tuple(str(v) for v in data["labels"]),
+                weights=data["weights"].astype(np.float32),
+                bias=data["bias"].astype(np.float32),
+                temperature=float(data["temperature"]),
+                config=HashingConfig(n_features, ngram_min, ngram_max),
+            )
+
+
+def load_corpus(path: str | Path) -> Tuple[List[str], List[str]]:
+    texts: List[str] = []
+    labels: List[str] = []
+    for line in Path(path).read_text(encoding="utf-8").splitlines():
+        if not line.strip():
+            continue
+        row = json.loads(line)
+        texts.append(row["text"])
+        labels.append(row["intent"])
+    return texts, labels
+
+
+def _fit(
+    ptr: np.ndarray,
+    idx: np.ndarray,
+    vals: np.ndarray,
+    y: np.ndarray,
+    n_classes: int,
+    config: HashingConfig,
+    epochs: int,
+    lr: float,
+    l2: float,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Full-batch softmax regression with Adam over the sparse hashed features."""
+    n_docs = len(ptr) - 1
+    rows = np.repeat(np.arange(n_docs), np.diff(ptr))
+    onehot = np.eye(n_classes, dtype=np.float32)[y]
+    w = np.zeros((config.n_features, n_classes), dtype=np.float32)
+    b = np.zeros(n_classes, dtype=np.float32)
+    m_w, v_w = np.zeros_like(w), np.zeros_like(w)
+    m_b, v_b = np.zeros_like(b), np.zeros_like(b)
+    beta1, beta2, eps = 0.9, 0.999, 1e-8
+    for step in range(1, epochs + 1):
+        grad_out = (_softmax(_linear(w, b, ptr, idx, vals)) - onehot) / n_docs
+        g_w = l2 * w
+        np.add.at(g_w, idx, vals[:, None] * grad_out[rows])
+        g_b = grad_out.sum(axis=0)
+        for p, g, m, v in ((w, g_w, m_w, v_w), (b, g_b, m_b, v_b)):
+            m *= beta1
+            m += (1 - beta1) * g
+            v *= beta2
+            v += (1 - beta2) * g * g
+            p -= lr * (m / (1 - beta1**step)) / (np.sqrt(v / (1 - beta2**step)) + eps)
+    return w, b
+
+
+def _fit_temperature(logits: np.ndarray, y: np.ndarray) -> float:
+    best_t, best_nll = 1.0, float("inf")
+    for t in np.exp(np.linspace(np.log(0.25), np.log(10.0), 60)):
+        probs = _softmax(logits / t)
+        nll = float(-np.log(probs[np.arange(len(y)), y] + 1e-12).mean())
+        if nll < best_nll:
+            best_t, best_nll = float(t), nll
+    return best_t
+
+
+def train(
+    texts: Sequence[str],
+    labels: Sequence[str],
+    *,
+    config: HashingConfig = DEFAULT_HASHING,
+    epochs: int = 150,
+    lr: float = 0.05,
+    l2: float = 1e-4,
+    val_fraction: float = 0.2,
+    seed: int = 0,
+) -> LinearIntentModel:
+    """Fits on a train split, calibrates temperature on the held-out split, refits on all data."""
+    classes = tuple(sorted(set(labels)))
+    y = np.asarray([classes.index(label) for label in labels], dtype=np.int64)
+    order = np.random.default_rng(seed).permutation(len(texts))
+    n_val = int(len(texts) * val_fraction)
+    temperature = 1.0
+    if n_val:
+        val, fit = order[:n_val], order[n_val:]
+        w, b = _fit(*featurize([texts[i] for i in fit], config), y[fit], len(classes), config, epochs, lr, l2)
+        val_logits = _linear(w, b, *featurize([texts[i] for i in val], config))
+        temperature = _fit_temperature(val_logits, y[val])
+    w, b = _fit(*featurize(texts, config), y, len(classes), config, epochs, lr, l2)
+    return LinearIntentModel(classes, w, b, temperature, config)
+
+
+class HybridIntentClassifier:
+    """Regex rules win when they fire; otherwise the statistical model decides.
+
+    Messages the regexes leave as smalltalk are re-scored by the model, and its
+    label is used when the calibrated probability reaches ``min_confidence``.
+    """
+
+    _FALLTHROUGH = frozenset({"smalltalk", "unknown"})
+
+    def __init__(self, model: LinearIntentModel, *, min_confidence: float = 0.5) -> None:
+        self.model = model
+        self.min_confidence = min_confidence
+
+    def _decide(self, regex: IntentResult, probs: np.ndarray) -> IntentResult:
+        best = int(probs.argmax())
+        confidence = float(probs[best])
+        if confidence < self.min_confidence:
+            return regex
+        return IntentResult(self.model.labels[best], round(confidence, 3))  # type: ignore[arg-type]
+
+    def classify(self, text: str) -> IntentResult:
+        regex = classify_intent(text)
+        if regex.intent not in self._FALLTHROUGH or not text.strip():
+            return regex
+        return self._decide(regex, self.model.predict_proba([text])[0])
+
+    def classify_batch(self, texts: Iterable[str]) -> List[IntentResult]:
+        texts = list(texts)
+        results = classify_batch(texts)
+        pending = [i for i, r in enumerate(results) if r.intent in self._FALLTHROUGH and texts[i].strip()]
+        if pending:
+            probs = self.model.predict_proba([texts[i] for i in pending])
+            for row, i in enumerate(pending):
+                results[i] = self._decide(results[i], probs[row])
+        return results
+
+
+def main(argv: Sequence[str]) -> None:
+    if len(argv) != 2:
+        raise SystemExit("usage: python -m domain.reasoning.statistical_classifier CORPUS.jsonl MODEL.npz")
+    texts, labels = load_corpus(argv[0])
+    model = train(texts, labels)
+    model.save(argv[1])
+    predicted = model.predict_proba(texts).argmax(axis=1)
+    accuracy = float((predicted == [model.labels.index(label) for label in labels]).mean())
+    print(
+        f"trained on {len(texts)} examples, {len(model.labels)} intents, "
+        f"train_accuracy={accuracy:.3f}, temperature={model.temperature:.2f} -> {argv[1]}"
+    )
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,99 @@
+"""Sampled, bounded recording of policy decisions (``POLICY_TRACE``)."""
+from __future__ import annotations
+
+import json
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from .models import DialoguePlan
+
+FieldChange = Tuple[str, str, Any]  # (rule_id, field, new value)
+
+
+@dataclass(frozen=True, slots=True)
+class DecisionTrace:
+    ts: float
+    intent: str
+    bundle_version: int
+    considered: Tuple[str, ...]
+    matched: Tuple[str, ...]
+    changes: Tuple[FieldChange, ...]
+
+    def as_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+def effect_changes(plan: DialoguePlan, rule_id: str, items: Iterable[Tuple[str, Any]]) -> List[FieldChange]:
+    """Fields an effect would change on ``plan``; call before applying it."""
+    out: List[FieldChange] = []
+    for key, value in items:
+        if value is None:
+            continue
+        if key == "follow_up":
+            current: Any = plan.follow_up_strategy
+        elif key == "safety":
+            current = plan.safety_directives
+        else:
+            current = getattr(plan, key, None)
+        if isinstance(current, list):
+            added = [v for v in value if v not in current]
+            if added:
+                out.append((rule_id, key, added))
+        elif isinstance(current, dict):
+            updated = {k: v for k, v in value.items() if current.get(k, object()) != v}
+            if updated:
+                out.append((rule_id, key, updated))
+        elif current != value:
+            out.append((rule_id, key, value))
+    return out
+
+
+class TraceRing:
+    """Preallocated ring of the last ``capacity`` traces with deterministic 1-in-N sampling.
+
+    ``should_sample`` is a counter increment and a modulo, so the untraced path
+    stays cheap; a disabled ring (``sample_rate <= 0``) never samples.
+    """
+
+    def __init__(self, capacity: int = 512, sample_rate: float = 1.0) -> None:
+        self.capacity = max(1, capacity)
+        self._every = max(1, round(1 / sample_rate)) if sample_rate > 0 else 0
+        self._slots: List[Optional[DecisionTrace]] = [None] * self.capacity
+        self._next = 0
+        self._seen = 0
+        self._dumped = 0  # value of ``recorded`` at the last dump
+        self.recorded = 0
+
+    def should_sample(self) -> bool:
+        if not self._every:
+            return False
+        self._seen += 1
+        return self._seen % self._every == 0
+
+    def record(self, trace: DecisionTrace) -> None:
+        self._slots[self._next] = trace
+        self._next = (self._next + 1) % self.capacity
+        self.recorded += 1
+
+    def recent(self, limit: Optional[int] = None) -> List[DecisionTrace]:
+        """Oldest first."""
+        ordered = self._slots[self._next :] + self._slots[: self._next]
+        traces = [t for t in ordered if t is not None]
+        return traces[-limit:] if limit else traces
+
+    def dump_jsonl(self, path: str | Path) -> int:
+        """Appends the traces recorded since the previous dump; returns how many were written.
+
+        Traces overwritten in the ring before a dump are not written.
+        """
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fresh = min(self.recorded - self._dumped, self.capacity)
+        traces = self.recent(fresh) if fresh else []
+        self._dumped = self.recorded
+        with path.open("a", encoding="utf-8") as fh:
+            for trace in traces:
+                fh.write(json.dumps(trace.as_dict(), ensure_ascii=False, default=list) + "\n")
+        return len(traces)
+
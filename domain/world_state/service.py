@@ -2,8 +2,10 @@
 # mypy: ignore-errors
 from __future__ import annotations
 
-from typing import Dict
+from typing import Dict, Optional
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
 
+from services.world_state import Location
 from services.world_state import WorldState as _WorldState
 
 
@@ -11,11 +13,33 @@ class WorldStateService:
     def __init__(self, backend: _WorldState) -> None:
         self._backend = backend
 
-    async def snapshot(self) -> Dict[str, object]:
-        return await self._backend.get_context()
+    @property
+    def version(self) -> int:
+        return self._backend.version
 
-    async def weather_condition(self) -> str:
-        world = await self.snapshot()
+    @property
+    def default_location(self) -> Location:
+        return self._backend.default_location
+
+    def version_for(self, location: Optional[Location] = None) -> int:
+        return self._backend.version_for(location)
+
+    def location_for(self, city: Optional[str], tz: Optional[str]) -> Location:
+        """Builds a location, falling back to defaults for missing city or unknown tz."""
+        default = self._backend.default_location
+        city = (city or "").strip() or default.city
+        try:
+            ZoneInfo(tz or "")
+        except (ZoneInfoNotFoundError, ValueError):
+            tz = default.tz
+        return Location(city, tz)
+
+    async def snapshot(self, location: Optional[Location] = None) -> Dict[str, object]:
+        return await self._backend.get_context(location)
+
+    async def weather_condition(self, world: Optional[Dict[str, object]] = None) -> str:
+        if world is None:
+            world = await self.snapshot()
         weather = (world or {}).get("weather") or {}
         if weather.get("is_rainy"):
             return "rainy"
@@ -9,42 +9,158 @@ from aiogram import Bot, Dispatcher
 from aiogram.client.default import DefaultBotProperties
 from aiogram.enums import ParseMode
 
+from adapters.news.feed import NewsFeedClient
+from adapters.news.ingest import NewsIngestor
+from adapters.news.store import NewsStore
 from adapters.telegram.dev_runner import DevBotRunner
+from adapters.telegram.outbox import SendScheduler
+from adapters.telegram.sharding import ShardChannel, ShardSupervisor
+from adapters.telegram.webhook import WebhookIngress, serve
+from adapters.weather.openweather import OpenWeatherFetcher
 from bot.middlewares.user_context import UserContextMiddleware
 from bot.routers.basic import router as basic_router
 from core.logging import get_logger, setup_logging
 from core.settings import settings
+from dialogue.humanizer import Humanizer
+from dialogue.playbooks import PlaybookWatcher
+from domain.memory.extraction import DEFAULT_EXTRACTORS, ExtractionPipeline, load_extractors, merge_extractors
 from domain.memory.manager import MemoryManager
 from domain.persona.service import PersonaService
 from domain.policies.loader import load_policy_bundle
+from domain.policies.watcher import PolicyWatcher
 from domain.reasoning.decision_engine import DecisionEngine
+from domain.reasoning.trace import TraceRing
+from domain.reasoning.statistical_classifier import HybridIntentClassifier, LinearIntentModel
 from domain.world_state.service import WorldStateService
 from memory.chat_history import ChatHistoryRepo
 from memory.facts_repo import FactsRepo
 from memory.repo import MemoryRepo
+from memory.speech_profiles import SpeechProfileStore
 from orchestrator.aya_brain import AyaBrain
+from orchestrator.mailbox import UserMailboxes
+from orchestrator.post_reply import PostReplyPipeline
 from services.deepseek_client import DeepSeekClient
-from services.world_state import WorldState
+from services.llm_cache import CachedLLM, CompletionCache
+from services.llm_fact_extractor import LLMFactExtractor
+from services.world_state import Location, WorldPrefetcher, WorldState
 from storage.db import DB, ensure_db_ready
 
 log = get_logger("main")
 
 
-async def app() -> None:
+async def app(shard: ShardChannel | None = None) -> None:
     setup_logging(settings.LOG_LEVEL, json_mode=settings.is_prod, diag=settings.is_diag)
-    db = await ensure_db_ready(DB(settings.DB_PATH))
+    if shard is None and settings.SHARD_WORKERS > 0 and settings.bot_token() != "TEST:TOKEN":
+        await run_supervisor()
+        return
+    db = await ensure_db_ready(
+        DB(settings.DB_PATH, busy_timeout_ms=settings.DB_BUSY_TIMEOUT_MS, autocommit=shard is not None)
+    )
 
     memory_repo = MemoryRepo(db)
     chat_history = ChatHistoryRepo(db)
     facts_repo = FactsRepo(db)
     deepseek = DeepSeekClient(settings.DEEPSEEK_API_KEY or None)
-    world_backend = WorldState(db=db, fetcher=_dummy_weather_fetch, ttl_sec=900)
+    llm_extractor = None
+    if settings.LLM_FACTS and settings.DEEPSEEK_API_KEY:
+        # извлечение фактов идёт мимо кэша ответов: сообщения пользователей не повторяются
+        llm_extractor = LLMFactExtractor(
+            deepseek,
+            facts_repo,
+            batch_size=settings.LLM_FACTS_BATCH,
+            flush_interval_sec=settings.LLM_FACTS_FLUSH_SEC,
+            min_confidence=settings.LLM_FACTS_MIN_CONFIDENCE,
+            price_prompt_per_m=settings.LLM_PRICE_PROMPT_PER_M,
+            price_completion_per_m=settings.LLM_PRICE_COMPLETION_PER_M,
+        )
+        llm_extractor.start()
+    if settings.LLM_CACHE:
+        cache = CompletionCache(
+            db=db if settings.LLM_CACHE_PERSIST else None,
+            max_entries=settings.LLM_CACHE_SIZE,
+            ttl_sec=settings.LLM_CACHE_TTL_SEC,
+        )
+        deepseek = CachedLLM(deepseek, cache)
+    weather_fetcher = _dummy_weather_fetch
+    if settings.OPENWEATHER_API_KEY:
+        weather_fetcher = OpenWeatherFetcher(
+            settings.OPENWEATHER_API_KEY,
+            base_url=settings.OPENWEATHER_BASE_URL,
+            max_requests_per_min=settings.OPENWEATHER_MAX_PER_MIN,
+            concurrency=settings.OPENWEATHER_CONCURRENCY,
+        )
+    world_backend = WorldState(
+        db=db,
+        fetcher=weather_fetcher,
+        ttl_sec=settings.WORLD_TTL_SEC,
+        max_locations=settings.WORLD_MAX_LOCATIONS,
+    )
     world_service = WorldStateService(world_backend)
-    persona_service = PersonaService()
-    memory_manager = MemoryManager(memory_repo, facts_repo, chat_history)
+    world_prefetcher = WorldPrefetcher(
+        world_backend,
+        interval_sec=settings.WORLD_PREFETCH_INTERVAL_SEC,
+        active_window_sec=settings.WORLD_ACTIVE_WINDOW_SEC,
+        idle_evict_sec=settings.WORLD_IDLE_EVICT_SEC,
+        batch_size=settings.WORLD_PREFETCH_BATCH,
+        max_fetches_per_min=settings.WORLD_FETCH_PER_MIN,
+    )
+    world_prefetcher.start()
+    persona_service = PersonaService(refresh_sec=settings.PERSONA_REFRESH_SEC)
+    if settings.PERSONA_REFRESH_SEC > 0:
+        persona_service.start()
+    extractors = list(DEFAULT_EXTRACTORS)
+    if settings.FACT_EXTRACTORS_PATH and await asyncio.to_thread(Path(settings.FACT_EXTRACTORS_PATH).exists):
+        extractors = merge_extractors(extractors, await asyncio.to_thread(load_extractors, settings.FACT_EXTRACTORS_PATH))
+    memory_manager = MemoryManager(
+        memory_repo, facts_repo, chat_history, ExtractionPipeline(extractors), llm_extractor=llm_extractor
+    )
+
+    news_store = NewsStore(db)
+    news_client = None
+    news_ingestor = None
+    # в режиме шардов ленту новостей тянет только нулевой воркер
+    if settings.NEWS_API_KEY and (shard is None or shard.index == 0):
+        news_client = NewsFeedClient(
+            settings.NEWS_API_KEY,
+            base_url=settings.NEWS_BASE_URL,
+            params={"country": settings.NEWS_COUNTRY},
+        )
+        news_ingestor = NewsIngestor(news_client, news_store, poll_interval_sec=settings.NEWS_POLL_SEC)
+        news_ingestor.start()
 
     policy_bundle = load_policy_bundle(Path("policies"))
-    decision_engine = DecisionEngine(policy_bundle)
+    policy_tracer = None
+    if settings.POLICY_TRACE:
+        policy_tracer = TraceRing(settings.POLICY_TRACE_SIZE, settings.POLICY_TRACE_SAMPLE)
+    decision_engine = DecisionEngine(policy_bundle, plan_cache_size=settings.PLAN_CACHE_SIZE, tracer=policy_tracer)
+    policy_watcher = None
+    if settings.POLICY_RELOAD_SEC > 0:
+        policy_watcher = PolicyWatcher(decision_engine, Path("policies"), interval_sec=settings.POLICY_RELOAD_SEC)
+        policy_watcher.start()
+
+    humanizer = Humanizer(settings.PLAYBOOKS_PATH)
+    playbook_watcher = None
+    if settings.POLICY_RELOAD_SEC > 0:
+        playbook_watcher = PlaybookWatcher(humanizer, interval_sec=settings.POLICY_RELOAD_SEC)
+        playbook_watcher.start()
+
+    intent_classifier = None
+    intent_model_path = Path(settings.INTENT_MODEL_PATH)
+    if settings.INTENT_MODEL_PATH and await asyncio.to_thread(intent_model_path.exists):
+        intent_classifier = HybridIntentClassifier(
+            await asyncio.to_thread(LinearIntentModel.load, intent_model_path),
+            min_confidence=settings.INTENT_MODEL_MIN_CONFIDENCE,
+        )
+        log.info("intent_model.loaded", path=str(intent_model_path))
+
+    post_reply = None
+    if settings.POST_REPLY_DEFER:
+        post_reply = PostReplyPipeline(
+            shards=settings.POST_REPLY_SHARDS,
+            queue_size=settings.POST_REPLY_QUEUE_SIZE,
+            max_retries=settings.POST_REPLY_MAX_RETRIES,
+        )
+        post_reply.start()
 
     aya_brain = AyaBrain(
         deepseek,
@@ -54,6 +170,12 @@ async def app() -> None:
         persona_service,
         decision_engine,
         facts_repo,
+        intent_classifier=intent_classifier,
+        humanizer=humanizer,
+        speech_profiles=SpeechProfileStore(memory_repo, alpha=settings.SPEECH_PROFILE_ALPHA),
+        post_reply=post_reply,
+        llm_replies=bool(settings.LLM_REPLIES),
+        news=news_store if settings.NEWS_API_KEY else None,
     )
 
     token = settings.bot_token()
@@ -69,27 +191,145 @@ async def app() -> None:
     else:
         bot = Bot(token=token, default=DefaultBotProperties(parse_mode=ParseMode.HTML))
         dp = Dispatcher()
-        dp.update.middleware(UserContextMiddleware(memory_repo))
+        dp.update.middleware(UserContextMiddleware(memory_repo, max_users=settings.USER_SEEN_CACHE_SIZE))
         dp["aya_brain"] = aya_brain
         dp["memory_repo"] = memory_repo
         dp["world_state"] = world_service
         dp["chat_history"] = chat_history
         dp["facts_repo"] = facts_repo
+        dp["news_store"] = news_store
+        mailboxes = UserMailboxes(
+            aya_brain.respond,
+            coalesce_window_sec=settings.MAILBOX_COALESCE_MS / 1000,
+            max_batch=settings.MAILBOX_MAX_BATCH,
+            idle_ttl_sec=settings.MAILBOX_IDLE_SEC,
+            max_active=settings.MAILBOX_MAX_ACTIVE,
+        )
+        dp["mailboxes"] = mailboxes
+        outbox = SendScheduler(
+            bot,
+            # глобальный лимит Telegram общий на всех воркеров
+            global_rate=settings.OUTBOX_GLOBAL_RATE / max(1, settings.SHARD_WORKERS if shard else 1),
+            burst=settings.OUTBOX_BURST,
+            chat_interval_sec=settings.OUTBOX_CHAT_INTERVAL_SEC,
+            max_queue=settings.OUTBOX_MAX_QUEUE,
+            max_attempts=settings.OUTBOX_MAX_ATTEMPTS,
+        )
+        dp["outbox"] = outbox
         dp.include_router(basic_router)
-        log.info("Start polling")
-        await dp.start_polling(bot, allowed_updates=dp.resolve_used_update_types())
+        if shard is not None:
+            log.info("Start shard worker", shard=shard.index)
+            try:
+                await shard.serve(dp, bot)
+            finally:
+                await mailboxes.stop()
+                await outbox.stop(drain=True)
+                await bot.session.close()
+        elif settings.TELEGRAM_MODE == "webhook":
+            ingress = WebhookIngress(
+                dp,
+                bot,
+                path=settings.WEBHOOK_PATH,
+                queue_size=settings.WEBHOOK_QUEUE_SIZE,
+                workers=settings.WEBHOOK_WORKERS,
+                secret_token=settings.WEBHOOK_SECRET,
+            )
+            if settings.WEBHOOK_URL:
+                await bot.set_webhook(
+                    settings.WEBHOOK_URL.rstrip("/") + settings.WEBHOOK_PATH,
+                    secret_token=settings.WEBHOOK_SECRET,
+                    allowed_updates=dp.resolve_used_update_types(),
+                    max_connections=max(1, min(100, settings.WEBHOOK_WORKERS * 2)),
+                )
+            log.info("Start webhook")
+            try:
+                await serve(ingress, settings.WEBHOOK_HOST, settings.WEBHOOK_PORT)
+            finally:
+                await mailboxes.stop()
+                await outbox.stop(drain=True)
+                await bot.session.close()
+        else:
+            log.info("Start polling")
+            await dp.start_polling(bot, allowed_updates=dp.resolve_used_update_types())
+            await mailboxes.stop()
+            await outbox.stop(drain=True)
 
+    if post_reply is not None:
+        await post_reply.stop(drain=True)
+    if news_ingestor is not None:
+        await news_ingestor.stop()
+        await news_client.aclose()
+    if policy_watcher is not None:
+        await policy_watcher.stop()
+    if playbook_watcher is not None:
+        await playbook_watcher.stop()
+    await persona_service.stop()
+    if llm_extractor is not None:
+        await llm_extractor.stop()
+    await world_prefetcher.stop()
+    await world_backend.aclose()
+    if isinstance(weather_fetcher, OpenWeatherFetcher):
+        await weather_fetcher.aclose()
     await deepseek.aclose()
     await db.close()
 
 
-async def _dummy_weather_fetch() -> dict:
+def shard_worker(channel: ShardChannel) -> None:
+    """Entry point of a worker process started by :class:`ShardSupervisor`."""
+    asyncio.run(app(channel))
+
+
+async def run_supervisor() -> None:
+    """Ingress process: receives updates and routes them to worker processes by user id."""
+    db = await ensure_db_ready(DB(settings.DB_PATH, busy_timeout_ms=settings.DB_BUSY_TIMEOUT_MS))
+    await FactsRepo(db).get_all(0, limit=1)
+    await db.close()  # схема готова до старта воркеров, они не гоняются за миграциями
+    bot = Bot(token=settings.bot_token())
+    dp = Dispatcher()
+    dp.include_router(basic_router)
+    allowed_updates = dp.resolve_used_update_types()
+    supervisor = ShardSupervisor(
+        shard_worker,
+        workers=settings.SHARD_WORKERS,
+        queue_size=settings.SHARD_QUEUE_SIZE,
+        concurrency=settings.SHARD_CONCURRENCY,
+        heartbeat_timeout_sec=settings.SHARD_HEARTBEAT_TIMEOUT_SEC,
+    )
+    supervisor.start()
+    log.info("Start supervisor", workers=supervisor.workers, mode=settings.TELEGRAM_MODE)
+    try:
+        if settings.TELEGRAM_MODE == "webhook":
+            ingress = WebhookIngress(
+                supervisor,
+                bot,
+                path=settings.WEBHOOK_PATH,
+                queue_size=settings.WEBHOOK_QUEUE_SIZE,
+                workers=settings.WEBHOOK_WORKERS,
+                secret_token=settings.WEBHOOK_SECRET,
+            )
+            if settings.WEBHOOK_URL:
+                await bot.set_webhook(
+                    settings.WEBHOOK_URL.rstrip("/") + settings.WEBHOOK_PATH,
+                    secret_token=settings.WEBHOOK_SECRET,
+                    allowed_updates=allowed_updates,
+                    max_connections=max(1, min(100, settings.WEBHOOK_WORKERS * 2)),
+                )
+            await serve(ingress, settings.WEBHOOK_HOST, settings.WEBHOOK_PORT)
+        else:
+            await supervisor.poll(bot, allowed_updates=allowed_updates)
+    finally:
+        await supervisor.stop()
+        await bot.session.close()
+
+
+async def _dummy_weather_fetch(location: Location) -> dict:
     from datetime import datetime
     from zoneinfo import ZoneInfo
 
-    now = datetime.now(ZoneInfo(settings.AYA_TZ))
+    now = datetime.now(ZoneInfo(location.tz))
     return {
-        "city": settings.AYA_CITY,
+        "city": location.city,
+        "tz": location.tz,
         "local_time_iso": now.isoformat(timespec="seconds"),
         "weather": {"temp_c": 10, "is_rainy": False},
     }
@@ -0,0 +1,258 @@
+# mypy: ignore-errors
+# memory/fact_backfill.py
+"""
+Возобновляемый бэкфилл фактов по уже накопленной chat_history.
+
+    python -m memory.fact_backfill --db aya.db --workers 4
+
+Читаем сообщения пользователя по ключу (id > last_id ORDER BY id LIMIT batch),
+режем пачку на шарды и гоняем экстракцию в ProcessPoolExecutor (CPU-bound),
+пишем через FactsRepo.upsert_bulk. Чекпойнт (last_id) коммитится в той же
+транзакции, что и факты пачки — процесс можно убить и запустить снова.
+Имя задания включает отпечаток набора экстракторов: добавили экстрактор —
+новое задание пройдёт историю с нуля (upsert идемпотентен).
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import hashlib
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, List, Optional, Sequence, Tuple
+
+from core.logging import get_logger
+from domain.memory.extraction import DEFAULT_EXTRACTORS, ExtractionPipeline, Extractor, load_extractors, merge_extractors
+
+from .facts_repo import FactsRepo
+
+log = get_logger("memory.backfill")
+
+Row = Tuple[int, int, str]  # (message_id, user_id, content)
+FactRow = Tuple[int, str, str, float, int]  # (tg_user_id, predicate, object, confidence, source_msg_id)
+
+_WORKER_PIPELINE: Optional[ExtractionPipeline] = None
+
+
+def _init_worker(extractors: Sequence[Extractor]) -> None:
+    global _WORKER_PIPELINE
+    _WORKER_PIPELINE = ExtractionPipeline(extractors)
+
+
+def _extract_shard(rows: Sequence[Row]) -> List[FactRow]:
+    pipeline = _WORKER_PIPELINE
+    out: List[FactRow] = []
+    for msg_id, user_id, content in rows:
+        for f in pipeline.extract(content, subject=str(user_id)):
+            out.append((user_id, f.predicate, f.object, f.confidence, msg_id))
+    return out
+
+
+def extractors_fingerprint(extractors: Sequence[Extractor]) -> str:
+    raw = "\n".join(f"{e.name}|{e.predicate}|{e.pattern}|{e.normalizer}|{e.confidence}" for e in extractors)
+    return hashlib.blake2b(raw.encode("utf-8"), digest_size=6).hexdigest()
+
+
+@dataclass(slots=True)
+class BackfillReport:
+    job: str
+    last_id: int
+    messages: int
+    facts: int
+    seconds: float
+    done: bool
+
+
+class FactBackfill:
+    """
+    backfill_checkpoints(job PK, last_id, messages, facts, updated_at)
+
+    Троттлинг записи: одна короткая транзакция на write_chunk фактов,
+    не больше max_writes_per_sec фактов в секунду и пауза pause_sec между пачками,
+    чтобы живой трафик бота успевал взять блокировку записи.
+    """
+
+    def __init__(
+        self,
+        db: Any,
+        facts_repo: FactsRepo,
+        extractors: Sequence[Extractor] = DEFAULT_EXTRACTORS,
+        *,
+        job: Optional[str] = None,
+        batch_size: int = 2000,
+        workers: int = 2,
+        write_chunk: int = 200,
+        max_writes_per_sec: float = 2000.0,
+        pause_sec: float = 0.05,
+    ):
+        self.db = db
+        self.facts_repo = facts_repo
+        self.extractors = tuple(extractors)
+        self.job = job or f"facts:{extractors_fingerprint(self.extractors)}"
+        self.batch_size = batch_size
+        self.workers = max(0, workers)
+        self.write_chunk = max(1, write_chunk)
+        self.max_writes_per_sec = max_writes_per_sec
+        self.pause_sec = pause_sec
+        self._ready = False
+        self._stop = False
+
+    async def _ensure(self):
+        if self._ready:
+            return
+        await self.db.conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS backfill_checkpoints (
+                job TEXT PRIMARY KEY,
+                last_id INTEGER NOT NULL DEFAULT 0,
+                messages INTEGER NOT NULL DEFAULT 0,
+                facts INTEGER NOT NULL DEFAULT 0,
+                updated_at REAL NOT NULL
+            )
+            """
+        )
+        await self.db.conn.commit()
+        self._ready = True
+
+    async def checkpoint(self) -> Tuple[int, int, int]:
+        await self._ensure()
+        cur = await self.db.conn.execute(
+            "SELECT last_id, messages, facts FROM backfill_checkpoints WHERE job=?", (self.job,)
+        )
+        row = await cur.fetchone()
+        await cur.close()
+        return (int(row[0]), int(row[1]), int(row[2])) if row else (0, 0, 0)
+
+    async def reset(self):
+        await self._ensure()
+        await self.db.conn.execute("DELETE FROM backfill_checkpoints WHERE job=?", (self.job,))
+        await self.db.conn.commit()
+
+    def stop(self):
+        self._stop = True
+
+    async def _read_batch(self, after_id: int) -> List[Row]:
+        cur = await self.db.conn.execute(
+            """
+            SELECT id, user_id, content FROM chat_history
+            WHERE id > ? AND role = 'user'
+            ORDER BY id LIMIT ?
+            """,
+            (after_id, self.batch_size),
+        )
+        rows = await cur.fetchall()
+        await cur.close()
+        return [(int(r[0]), int(r[1]), r[2] or "") for r in rows]
+
+    async def _extract(self, pool, rows: List[Row]) -> List[FactRow]:
+        if pool is None:
+            return _extract_shard(rows)
+        loop = asyncio.get_running_loop()
+        n = min(self.workers, len(rows))
+        shards = [rows[i::n] for i in range(n)]
+        parts = await asyncio.gather(*(loop.run_in_executor(pool, _extract_shard, s) for s in shards))
+        facts = [f for part in parts for f in part]
+        facts.sort(key=lambda f: f[4])  # порядок записи = порядок сообщений
+        return facts
+
+    async def _write(self, facts: List[FactRow], last_id: int, messages: int, total_facts: int):
+        # всё, кроме последнего куска, — отдельными короткими транзакциями;
+        # последний кусок и чекпойнт коммитятся вместе
+        chunks = [facts[i : i + self.write_chunk] for i in range(0, len(facts), self.write_chunk)] or [[]]
+        for i, chunk in enumerate(chunks):
+            t0 = time.monotonic()
+            last = i == len(chunks) - 1
+            await self.facts_repo.upsert_bulk(chunk, commit=not last)
+            if last:
+                await self.db.conn.execute(
+                    "REPLACE INTO backfill_checkpoints (job, last_id, messages, facts, updated_at) VALUES (?, ?, ?, ?, ?)",
+                    (self.job, last_id, messages, total_facts, time.time()),
+                )
+                await self.db.conn.commit()
+            if self.max_writes_per_sec > 0 and chunk:
+                budget = len(chunk) / self.max_writes_per_sec
+                spent = time.monotonic() - t0
+                if spent < budget:
+                    await asyncio.sleep(budget - spent)
+
+    async def run(self, max_batches: Optional[int] = None) -> BackfillReport:
+        await self._ensure()
+        await self.facts_repo._ensure()
+        last_id, messages, total_facts = await self.checkpoint()
+        started = time.monotonic()
+        self._stop = False
+        pool = None
+        if self.workers:
+            pool = ProcessPoolExecutor(self.workers, initializer=_init_worker, initargs=(self.extractors,))
+        else:
+            _init_worker(self.extractors)
+        batches = 0
+        done = False
+        try:
+            while not self._stop and (max_batches is None or batches < max_batches):
+                rows = await self._read_batch(last_id)
+                if not rows:
+                    done = True
+                    break
+                facts = await self._extract(pool, rows)
+                last_id = rows[-1][0]
+                messages += len(rows)
+                total_facts += len(facts)
+                await self._write(facts, last_id, messages, total_facts)
+                batches += 1
+                log.info("backfill.batch", job=self.job, last_id=last_id, messages=messages, facts=total_facts)
+                if self.pause_sec:
+                    await asyncio.sleep(self.pause_sec)
+        finally:
+            if pool is not None:
+                pool.shutdown(cancel_futures=True)
+        return BackfillReport(self.job, last_id, messages, total_facts, time.monotonic() - started, done)
+
+
+async def _main(argv: Optional[Sequence[str]] = None) -> None:
+    from core.logging import setup_logging
+    from core.settings import settings
+    from storage.db import DB
+
+    parser = argparse.ArgumentParser(description="Backfill facts from chat_history")
+    parser.add_argument("--db", default=settings.DB_PATH)
+    parser.add_argument("--extractors", default=settings.FACT_EXTRACTORS_PATH)
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--batch", type=int, default=2000)
+    parser.add_argument("--max-writes-per-sec", type=float, default=2000.0)
+    parser.add_argument("--pause", type=float, default=0.05)
+    parser.add_argument("--restart", action="store_true", help="сбросить чекпойнт задания")
+    args = parser.parse_args(argv)
+
+    setup_logging(settings.LOG_LEVEL)
+    extractors = list(DEFAULT_EXTRACTORS)
+    if args.extractors and await asyncio.to_thread(Path(args.extractors).exists):
+        extractors = merge_extractors(extractors, await asyncio.to_thread(load_extractors, args.extractors))
+    db = DB(args.db)
+    await db.connect()
+    await db.conn.execute("PRAGMA busy_timeout=5000;")  # бот пишет в ту же базу
+    try:
+        job = FactBackfill(
+            db,
+            FactsRepo(db),
+            extractors,
+            batch_size=args.batch,
+            workers=args.workers,
+            max_writes_per_sec=args.max_writes_per_sec,
+            pause_sec=args.pause,
+        )
+        if args.restart:
+            await job.reset()
+        report = await job.run()
+        print(
+            f"{report.job}: last_id={report.last_id} messages={report.messages} "
+            f"facts={report.facts} done={report.done} in {report.seconds:.1f}s"
+        )
+    finally:
+        await db.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(_main())
@@ -1,7 +1,7 @@
 # mypy: ignore-errors
 # memory/facts_repo.py
 from __future__ import annotations
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Sequence, Tuple
 from sqlite3 import OperationalError
 import time
 import re
@@ -43,6 +43,16 @@ class FactsRepo:
     async def _ensure(self):
         if self._ready:
             return
+        # схема уже актуальна (триггер _au создаётся последним) — обходимся без DDL:
+        # в режиме шардов несколько процессов стартуют на одной базе одновременно
+        cur = await self.db.conn.execute(
+            "SELECT sql FROM sqlite_master WHERE type='trigger' AND name=?", (f"{self._table}_au",)
+        )
+        row = await cur.fetchone()
+        await cur.close()
+        if row and f"DELETE FROM {self._fts}" in (row[0] or ""):
+            self._ready = True
+            return
         await self.db.conn.execute(f"""
         CREATE TABLE IF NOT EXISTS {self._table}(
           id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -57,6 +67,9 @@ class FactsRepo:
         """)
         await self.db.conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{self._table}_user ON {self._table}(tg_user_id);")
         await self.db.conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{self._table}_pred ON {self._table}(predicate);")
+        await self.db.conn.execute(
+            f"CREATE INDEX IF NOT EXISTS idx_{self._table}_triple ON {self._table}(tg_user_id, predicate, object);"
+        )
         # FTS
         await self.db.conn.execute(f"""
         CREATE VIRTUAL TABLE IF NOT EXISTS {self._fts}
@@ -68,13 +81,17 @@ class FactsRepo:
           INSERT INTO {self._fts}(rowid, predicate, object, tg_user_id, fact_id)
           VALUES (new.id, new.predicate, new.object, new.tg_user_id, new.id);
         END;""")
+        # facts_fts — обычная (не external-content) fts5: команда 'delete' для неё
+        # падает с "SQL logic error", поэтому старые триггеры пересоздаём с DELETE
+        await self.db.conn.execute(f"DROP TRIGGER IF EXISTS {self._table}_ad;")
+        await self.db.conn.execute(f"DROP TRIGGER IF EXISTS {self._table}_au;")
         await self.db.conn.execute(f"""
         CREATE TRIGGER IF NOT EXISTS {self._table}_ad AFTER DELETE ON {self._table} BEGIN
-          INSERT INTO {self._fts}({self._fts}, rowid) VALUES ('delete', old.id);
+          DELETE FROM {self._fts} WHERE rowid = old.id;
         END;""")
         await self.db.conn.execute(f"""
         CREATE TRIGGER IF NOT EXISTS {self._table}_au AFTER UPDATE ON {self._table} BEGIN
-          INSERT INTO {self._fts}({self._fts}, rowid) VALUES ('delete', old.id);
+          DELETE FROM {self._fts} WHERE rowid = old.id;
           INSERT INTO {self._fts}(rowid, predicate, object, tg_user_id, fact_id)
           VALUES (new.id, new.predicate, new.object, new.tg_user_id, new.id);
         END;""")
@@ -124,6 +141,40 @@ class FactsRepo:
                 )
         await self.db.conn.commit()
 
+    async def upsert_bulk(self, rows: Sequence[Tuple], *, commit: bool = True) -> int:
+        """
+        rows: [(tg_user_id, predicate, object, confidence, source_msg_id)] — сразу по многим пользователям.
+        Та же семантика, что у upsert_many (порог, max(confidence)), но два executemany
+        вместо SELECT на каждый факт. commit=False — чтобы вызывающий мог дописать
+        в ту же транзакцию (например, чекпойнт бэкфилла). Возвращает число принятых строк.
+        """
+        await self._ensure()
+        now = time.time()
+        clean = []
+        for uid, pred, obj, conf, msg_id in rows:
+            pred, obj, conf = (pred or "").strip(), (obj or "").strip(), float(conf or 0.0)
+            if not pred or not obj or conf < 0.4 or len(pred) > 128 or len(obj) > 2048:
+                continue
+            clean.append((int(uid), pred, obj, conf, msg_id))
+        if not clean:
+            if commit:
+                await self.db.conn.commit()
+            return 0
+        await self.db.conn.executemany(
+            f"UPDATE {self._table} SET confidence=MAX(confidence, ?), updated_at=? "
+            f"WHERE tg_user_id=? AND predicate=? AND object=?",
+            [(conf, now, uid, pred, obj) for uid, pred, obj, conf, _ in clean],
+        )
+        await self.db.conn.executemany(
+            f"""INSERT INTO {self._table}(tg_user_id, predicate, object, confidence, source_msg_id, updated_at, created_at)
+                SELECT ?,?,?,?,?,?,?
+                WHERE NOT EXISTS (SELECT 1 FROM {self._table} WHERE tg_user_id=? AND predicate=? AND object=?)""",
+            [(uid, pred, obj, conf, msg_id, now, now, uid, pred, obj) for uid, pred, obj, conf, msg_id in clean],
+        )
+        if commit:
+            await self.db.conn.commit()
+        return len(clean)
+
     async def get_all(self, tg_user_id: int, limit: int = 200) -> List[Dict]:
         await self._ensure()
         cur = await self.db.conn.execute(
@@ -80,6 +80,7 @@ class MemoryRepo:
             (tg_user_id, kind, key),
         )
         row = await cur.fetchone()
+        await cur.close()  # иначе оператор держит снимок чтения, и запись ловит "database is locked"
         return row[0] if row else None
 
     async def del_kv(self, tg_user_id: int, kind: str, key: str):
@@ -225,6 +226,24 @@ class MemoryRepo:
     async def set_user_formality(self, tg_user_id: int, formality: str):
         await self.set_kv(tg_user_id, "user", "formality", formality)
 
+    # ---------- LOCATION ----------
+    async def get_user_location(self, tg_user_id: int) -> tuple[Optional[str], Optional[str]]:
+        city = await self.get_kv(tg_user_id, "world", "city")
+        tz = await self.get_kv(tg_user_id, "world", "tz")
+        return city, tz
+
+    async def set_user_location(self, tg_user_id: int, city: Optional[str], tz: Optional[str] = None) -> None:
+        city = (city or "").strip()
+        if not city:
+            await self.del_kv(tg_user_id, "world", "city")
+            await self.del_kv(tg_user_id, "world", "tz")
+            return
+        await self.set_kv(tg_user_id, "world", "city", city)
+        if tz:
+            await self.set_kv(tg_user_id, "world", "tz", tz)
+        else:
+            await self.del_kv(tg_user_id, "world", "tz")
+
     # ---------- DIALOG STATE / TOPIC ----------
     async def set_dialog_state(self, tg_user_id: int, intent: str, payload: str = ""):
         await self.set_kv(tg_user_id, "dialog", "last_intent", intent)
@@ -255,6 +274,7 @@ class MemoryRepo:
             (tg_user_id,),
         )
         row = await cur.fetchone()
+        await cur.close()
         n = int(row[0]) + 1 if row else 1
         await self.set_kv(tg_user_id, "dialog", "turn", str(n))
         return n
@@ -265,6 +285,7 @@ class MemoryRepo:
             (tg_user_id,),
         )
         row = await cur.fetchone()
+        await cur.close()
         return int(row[0]) if row else 0
 
     async def reset_turn(self, tg_user_id: int):
@@ -0,0 +1,148 @@
+# mypy: ignore-errors
+# memory/speech_profiles.py
+"""
+Профиль речи пользователя (SpeechProfile), который обновляется инкрементально.
+
+Каждое входящее сообщение сдвигает экспоненциально затухающие средние за O(1):
+одно чтение (или попадание в LRU) и одна запись в memories(kind='speech',
+key='profile') в компактном виде "avg,q,emoji,short,n". Полную историю
+не пересчитываем никогда. Для уже существующих пользователей есть разовый
+инициализатор, который идёт по chat_history потоком:
+
+    python -m memory.speech_profiles --db aya.db
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Sequence
+
+from core.logging import get_logger
+from domain.reasoning.speech import SpeechProfile
+
+log = get_logger("memory.speech")
+
+KIND, KEY = "speech", "profile"
+
+
+class SpeechProfileStore:
+    def __init__(self, memory_repo, *, alpha: float = 0.1, max_users: int = 10000):
+        self.memory_repo = memory_repo
+        self.alpha = alpha
+        self.max_users = max_users
+        self._cache: "OrderedDict[int, SpeechProfile]" = OrderedDict()
+
+    def _remember(self, tg_user_id: int, profile: SpeechProfile) -> None:
+        self._cache[tg_user_id] = profile
+        self._cache.move_to_end(tg_user_id)
+        if len(self._cache) > self.max_users:
+            self._cache.popitem(last=False)
+
+    async def get(self, tg_user_id: int) -> SpeechProfile:
+        profile = self._cache.get(tg_user_id)
+        if profile is None:
+            raw = await self.memory_repo.get_kv(tg_user_id, KIND, KEY)
+            profile = SpeechProfile.decode(raw) or SpeechProfile()
+            self._remember(tg_user_id, profile)
+        return profile
+
+    async def observe(self, tg_user_id: int, text: str, *, persist: bool = True) -> SpeechProfile:
+        """
+        Учитывает одно сообщение пользователя. С persist=False профиль обновляется
+        только в кэше, запись в базу — отдельным save() (отложенный конвейер).
+        """
+        before = await self.get(tg_user_id)
+        profile = before.observe(text, self.alpha)
+        if profile is not before:
+            self._remember(tg_user_id, profile)
+            if persist:
+                await self.save(tg_user_id, profile)
+        return profile
+
+    async def save(self, tg_user_id: int, profile: SpeechProfile) -> None:
+        await self.memory_repo.set_kv(tg_user_id, KIND, KEY, profile.encode())
+
+
+async def initialize_profiles(
+    db, *, alpha: float = 0.1, batch_size: int = 5000, force: bool = False, write_chunk: int = 1000
+) -> Dict[str, int]:
+    """
+    Разово строит профили по chat_history (role='user') в хронологическом порядке.
+    Сообщения читаются пачками по ключу id, в памяти держим только профили
+    (пять чисел на пользователя). Пользователей, у которых профиль уже есть,
+    пропускаем, если не force.
+    """
+    started = time.monotonic()
+    skip: set = set()
+    if not force:
+        cur = await db.conn.execute("SELECT tg_user_id FROM memories WHERE kind=? AND key=?", (KIND, KEY))
+        skip = {row[0] for row in await cur.fetchall()}
+        await cur.close()
+
+    profiles: Dict[int, SpeechProfile] = {}
+    last_id, messages = 0, 0
+    while True:
+        cur = await db.conn.execute(
+            "SELECT id, user_id, content FROM chat_history WHERE id > ? AND role = 'user' ORDER BY id LIMIT ?",
+            (last_id, batch_size),
+        )
+        rows = await cur.fetchall()
+        await cur.close()
+        if not rows:
+            break
+        for _, user_id, content in rows:
+            if user_id in skip:
+                continue
+            profiles[user_id] = profiles.get(user_id, SpeechProfile()).observe(content, alpha)
+        last_id = rows[-1][0]
+        messages += len(rows)
+        await asyncio.sleep(0)  # не держим цикл событий, если бот крутится рядом
+
+    items = [(uid, KIND, KEY, p.encode()) for uid, p in profiles.items() if p.messages]
+    for start in range(0, len(items), write_chunk):
+        await db.conn.executemany(
+            """
+            INSERT INTO memories (tg_user_id, kind, key, value)
+            VALUES (?, ?, ?, ?)
+            ON CONFLICT(tg_user_id, kind, key) DO UPDATE SET value=excluded.value
+            """,
+            items[start : start + write_chunk],
+        )
+        await db.conn.commit()
+    report = {
+        "messages": messages,
+        "users": len(items),
+        "skipped_users": len(skip),
+        "ms": int((time.monotonic() - started) * 1000),
+    }
+    log.info("speech_profiles.initialized", **report)
+    return report
+
+
+async def _main(argv: Optional[Sequence[str]] = None) -> None:
+    from core.logging import setup_logging
+    from core.settings import settings
+    from storage.db import DB
+
+    parser = argparse.ArgumentParser(description="Build speech profiles from chat_history")
+    parser.add_argument("--db", default=settings.DB_PATH)
+    parser.add_argument("--alpha", type=float, default=settings.SPEECH_PROFILE_ALPHA)
+    parser.add_argument("--batch", type=int, default=5000)
+    parser.add_argument("--force", action="store_true", help="пересчитать и уже существующие профили")
+    args = parser.parse_args(argv)
+
+    setup_logging(settings.LOG_LEVEL)
+    db = DB(args.db)
+    await db.connect()
+    await db.conn.execute("PRAGMA busy_timeout=5000;")
+    try:
+        report = await initialize_profiles(db, alpha=args.alpha, batch_size=args.batch, force=args.force)
+        print(f"messages={report['messages']} users={report['users']} skipped={report['skipped_users']} in {report['ms']}ms")
+    finally:
+        await db.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(_main())
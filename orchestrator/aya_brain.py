@@ -1,24 +1,39 @@
 """Central orchestrator connecting intent detection, policies and NLG."""
 from __future__ import annotations
 
+import re
 from dataclasses import dataclass
 from datetime import datetime
-from typing import Any, Dict, List, Sequence
+from typing import Any, Dict, List, Optional, Sequence
 
+from adapters.news.store import NewsStore
 from core.logging import get_logger
 from domain.memory.manager import MemoryManager
 from domain.persona.service import PersonaService
 from domain.reasoning.decision_engine import DecisionEngine
+from domain.reasoning.emotion import EmotionTracker, default_tracker
 from domain.reasoning.intent_classifier import classify_intent
 from domain.reasoning.models import ReasoningContext
+from domain.reasoning.statistical_classifier import HybridIntentClassifier
 from domain.world_state.service import WorldStateService
 from dialogue.humanizer import Humanizer
 from memory.facts_repo import FactsRepo
 from memory.repo import MemoryRepo
+from memory.speech_profiles import SpeechProfileStore
+from orchestrator.post_reply import PostReplyPipeline
 from services.deepseek_client import DeepSeekClient
+from services.llm_cache import CachedLLM, plan_is_cacheable
+from services.world_state import Location
 
 log = get_logger("aya.brain")
 
+_NEWS_TOPIC_RE = re.compile(r"новост\w*\s+(?:про|о|об|из)\s+(.+)", re.IGNORECASE)
+
+_REPLY_PROMPT = (
+    "Ты — Ая, тёплая собеседница из Петербурга. Ответь на сообщение пользователя по плану "
+    "диалога. Верни только текст ответа."
+)
+
 
 @dataclass(slots=True)
 class AyaResponse:
@@ -37,6 +52,13 @@ class AyaBrain:
         persona: PersonaService,
         decision_engine: DecisionEngine,
         facts_repo: FactsRepo,
+        intent_classifier: HybridIntentClassifier | None = None,
+        emotion_tracker: EmotionTracker | None = None,
+        humanizer: Humanizer | None = None,
+        speech_profiles: SpeechProfileStore | None = None,
+        post_reply: PostReplyPipeline | None = None,
+        llm_replies: bool = False,
+        news: NewsStore | None = None,
     ) -> None:
         self.llm = llm
         self.memory_repo = memory_repo
@@ -45,7 +67,13 @@ class AyaBrain:
         self.persona = persona
         self.decision_engine = decision_engine
         self.facts_repo = facts_repo
-        self.humanizer = Humanizer()
+        self.classify_intent = intent_classifier.classify if intent_classifier else classify_intent
+        self.emotions = emotion_tracker or default_tracker()
+        self.humanizer = humanizer or Humanizer()
+        self.speech_profiles = speech_profiles or SpeechProfileStore(memory_repo)
+        self.post_reply = post_reply
+        self.llm_replies = llm_replies
+        self.news = news
 
     async def reset_user(self, tg_user_id: int) -> None:
         await self.memory_repo.set_affinity(tg_user_id, 0)
@@ -56,38 +84,55 @@ class AyaBrain:
         await self.memory_repo.set_flirt_level(tg_user_id, "off")
 
     async def respond(self, tg_user_id: int, user_text: str) -> AyaResponse:
-        await self.memory_repo.touch_seen(tg_user_id)
-        await self.memory_manager.remember_dialogue(tg_user_id, "user", user_text)
-        await self.memory_manager.store_user_message(tg_user_id, user_text)
+        deferred = self.post_reply
+        if deferred is None:
+            await self.memory_repo.touch_seen(tg_user_id)
+            await self.memory_manager.remember_dialogue(tg_user_id, "user", user_text)
+            await self.memory_manager.store_user_message(tg_user_id, user_text)
+            new_facts: List[Any] = []
+        else:
+            # writes of the previous turn must be visible before we read memory
+            await deferred.wait_user(tg_user_id)
+            new_facts = self.memory_manager.extract_facts(tg_user_id, user_text)
 
-        persona_data = self.persona.data()
-        persona_traits = self.persona.traits()
-        world_snapshot = await self.world_state.snapshot()
-        weather_condition = await self.world_state.weather_condition()
+        persona_snapshot = self.persona.snapshot
+        persona_data = persona_snapshot.data
+        persona_traits = persona_snapshot.traits
+        location = await self._user_location(tg_user_id)
+        world_snapshot = await self.world_state.snapshot(location)
+        weather_condition = await self.world_state.weather_condition(world_snapshot)
 
-        intent_result = classify_intent(user_text)
+        intent_result = self.classify_intent(user_text)
+        user_emotion = self.emotions.update(tg_user_id, user_text)
+        speech_profile = await self.speech_profiles.observe(tg_user_id, user_text, persist=deferred is None)
         affinity = await self.memory_repo.get_affinity(tg_user_id)
         closeness = await self.memory_repo.get_affinity(tg_user_id)
         adult_confirmed = await self.memory_repo.get_adult_confirmed(tg_user_id)
         flirt_level = await self.memory_repo.get_flirt_level(tg_user_id)
         facts_recent = await self.facts_repo.get_all(tg_user_id, limit=25)
+        chat_history = await self.memory_manager.recall_recent_dialogue(tg_user_id, limit=6)
+        if deferred is not None:
+            facts_recent = _merge_pending_facts(new_facts, facts_recent)
+            chat_history = [*chat_history, {"id": None, "role": "user", "content": user_text, "created_at": None}][-6:]
 
         policy_ctx = ReasoningContext(
             user_message=user_text,
             persona=persona_data,
             world_state=world_snapshot,
             memory_facts=facts_recent,
-            chat_history=await self.memory_manager.recall_recent_dialogue(tg_user_id, limit=6),
+            chat_history=chat_history,
             intent=intent_result.intent,
-            user_emotion="neutral",
+            user_emotion=user_emotion,
             affinity=affinity,
             closeness=closeness,
             adult_confirmed=adult_confirmed,
             flirt_level=flirt_level,
-            persona_traits=tuple(persona_traits),
+            persona_traits=persona_traits,
             memory_tags=tuple({row["predicate"] for row in facts_recent}),
             time_of_day=_time_of_day(world_snapshot.get("local_time_iso")),
             weather_condition=weather_condition,
+            speech_profile=speech_profile,
+            news=await self._recent_news(intent_result.intent, user_text),
         )
 
         plan = self.decision_engine.plan(policy_ctx)
@@ -105,13 +150,22 @@ class AyaBrain:
             memory_facts=facts_for_output,
             world=world_snapshot,
             user_profile=user_profile,
+            speech_profile=speech_profile,
+            news=policy_ctx.news,
         )
 
-        await self.memory_manager.remember_dialogue(tg_user_id, "assistant", answer)
+        if self.llm_replies:
+            answer = await self._llm_reply(plan, user_text, answer, world_snapshot, location, policy_ctx.news)
+
+        if deferred is None:
+            await self.memory_manager.remember_dialogue(tg_user_id, "assistant", answer)
+        else:
+            await self._defer_writes(deferred, tg_user_id, user_text, new_facts, answer, speech_profile)
 
         log.info(
             "response",
             intent=plan.intent,
+            user_emotion=user_emotion,
             applied_rules=plan.applied_rules,
             emotion=plan.emotion,
             follow_up=plan.follow_up_strategy,
@@ -123,6 +177,14 @@ class AyaBrain:
     async def diagnostics(self, tg_user_id: int) -> Dict[str, Any]:
         metrics = self.memory_manager.snapshot_metrics()
         llm_ok, llm_note = await self.llm.health_check()
+        llm_info: Dict[str, Any] = {"ok": llm_ok, "note": llm_note}
+        cache_metrics = getattr(self.llm, "metrics", None)
+        if cache_metrics is not None:
+            llm_info["cache_hit_rate"] = round(cache_metrics.hit_rate, 3)
+            llm_info["cache_bypassed"] = cache_metrics.bypassed
+        llm_extractor = getattr(self.memory_manager, "llm_extractor", None)
+        if llm_extractor is not None:
+            llm_info["facts"] = llm_extractor.metrics.snapshot()
         return {
             "metrics": {
                 "facts_stored": metrics.facts_stored,
@@ -132,8 +194,22 @@ class AyaBrain:
             },
             "profile": await self._load_user_profile(tg_user_id),
             "persona_traits": self.persona.traits(),
+            "persona_version": self.persona.snapshot.version,
             "policies": self.decision_engine.describe(),
-            "llm": {"ok": llm_ok, "note": llm_note},
+            "plan_cache": {
+                "hit_rate": round(self.decision_engine.plan_cache.metrics.hit_rate, 3),
+                "entries": len(self.decision_engine.plan_cache),
+                "bundle_version": self.decision_engine.version,
+            },
+            "policy_errors": list(self.decision_engine.load_errors),
+            "playbooks": {
+                "version": self.humanizer.registry.version,
+                "templates": len(self.humanizer.registry.templates),
+                "errors": list(self.humanizer.load_errors),
+            },
+            "llm": llm_info,
+            "extractors": self.memory_manager.extraction.snapshot_stats(),
+            "post_reply": self.post_reply.snapshot() if self.post_reply is not None else None,
         }
 
     async def _load_user_profile(self, tg_user_id: int) -> Dict[str, Any]:
@@ -145,6 +221,91 @@ class AyaBrain:
             "nickname_allowed": prefs.get("nickname_allowed"),
         }
 
+    async def _llm_reply(
+        self,
+        plan: Any,
+        user_text: str,
+        draft: str,
+        world: Dict[str, Any],
+        location: Optional[Location],
+        news: Sequence[Dict[str, Any]] = (),
+    ) -> str:
+        """Asks the LLM for the reply; the template draft stays the fallback.
+
+        The prompt holds only the plan, the world snapshot and the message, so
+        the same question under the same weather is one cached completion for
+        every user. With a ``CachedLLM`` the entry is pinned to the location's
+        world version. Plans the policy bundle marks personal or sensitive skip
+        the cache, and only they get the draft with the user's facts.
+        """
+        cacheable = plan_is_cacheable(plan)
+        weather = world.get("weather") or {}
+        lines = [
+            f"План: интент={plan.intent}, тон={plan.tone}, эмоция={plan.emotion}, "
+            f"длина={plan.response_length}, цели={', '.join(plan.content_goals) or '-'}",
+            f"Мир: город={world.get('city')}, время={world.get('local_time_iso')}, "
+            f"температура={weather.get('temp_c')}, дождь={bool(weather.get('is_rainy'))}",
+        ]
+        if news:
+            lines.append("Новости: " + "; ".join(item["title"] for item in news))
+        if not cacheable:
+            lines.append(f"Черновик: {draft}")
+        lines.append(f"Сообщение: {user_text}")
+        messages = [
+            {"role": "system", "content": _REPLY_PROMPT},
+            {"role": "user", "content": "\n".join(lines)},
+        ]
+        try:
+            if isinstance(self.llm, CachedLLM):
+                reply = await self.llm.chat(
+                    messages, cacheable=cacheable, world_version=self.world_state.version_for(location)
+                )
+            else:
+                reply = await self.llm.chat(messages)
+        except Exception:
+            log.warning("llm_reply_failed", intent=plan.intent, exc_info=True)
+            return draft
+        return str((reply or {}).get("content") or "").strip() or draft
+
+    async def _defer_writes(
+        self,
+        deferred: PostReplyPipeline,
+        tg_user_id: int,
+        user_text: str,
+        facts: List[Any],
+        answer: str,
+        speech_profile: Any,
+    ) -> None:
+        """Queues this turn's writes in the order the inline path performs them.
+
+        Each write is its own job, so a retry after a lock never repeats a
+        write that already went through.
+        """
+        manager = self.memory_manager
+        await deferred.submit(tg_user_id, "touch_seen", lambda: self.memory_repo.touch_seen(tg_user_id))
+        await deferred.submit(tg_user_id, "user_message", lambda: manager.remember_dialogue(tg_user_id, "user", user_text))
+        await deferred.submit(tg_user_id, "facts", lambda: manager.persist_facts(tg_user_id, user_text, facts))
+        await deferred.submit(tg_user_id, "assistant_message", lambda: manager.remember_dialogue(tg_user_id, "assistant", answer))
+        await deferred.submit(tg_user_id, "speech_profile", lambda: self.speech_profiles.save(tg_user_id, speech_profile))
+
+    async def _recent_news(self, intent: str, user_text: str) -> List[Dict[str, Any]]:
+        """Fresh headlines for a news question, narrowed to "новости про X" when asked."""
+        if self.news is None or intent != "news":
+            return []
+        match = _NEWS_TOPIC_RE.search(user_text)
+        topic = match.group(1).strip(" ?!.") if match else ""
+        try:
+            return await self.news.top_recent(topic, limit=3)
+        except Exception:
+            log.warning("news_lookup_failed", exc_info=True)
+            return []
+
+    async def _user_location(self, tg_user_id: int) -> Optional[Location]:
+        city, tz = await self.memory_repo.get_user_location(tg_user_id)
+        if not city and not tz:
+            return None
+        return self.world_state.location_for(city, tz)
+
     async def _facts_for_topic(self, tg_user_id: int, topic: str) -> List[Dict[str, Any]]:
         topic_map = {
             "weather": [],
@@ -177,3 +338,19 @@ def _time_of_day(iso: Any) -> str:
     if 18 <= hour < 23:
         return "evening"
     return "night"
+
+
+def _merge_pending_facts(facts: Sequence[Any], rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Puts facts extracted this turn (not yet persisted) in front of the stored rows.
+
+    Uses the same 0.4 confidence floor as ``FactsRepo.upsert_many``.
+    """
+    if not facts:
+        return rows
+    pending = [
+        {"id": None, "predicate": f.predicate, "object": f.object, "confidence": f.confidence}
+        for f in facts
+        if f.confidence >= 0.4
+    ]
+    seen = {(row["predicate"], row["object"]) for row in pending}
+    return pending + [row for row in rows if (row["predicate"], row["object"]) not in seen]
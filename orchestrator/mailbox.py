@@ -0,0 +1,152 @@
+"""Per-user ordered mailboxes in front of ``AyaBrain.respond``."""
+from __future__ import annotations
+
+import asyncio
+from dataclasses import asdict, dataclass
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from core.logging import get_logger
+
+log = get_logger("mailbox")
+
+Respond = Callable[[int, str], Awaitable[Any]]
+Pending = Tuple[str, "asyncio.Future[Any]"]
+
+
+@dataclass(slots=True)
+class MailboxMetrics:
+    messages: int = 0
+    turns: int = 0
+    coalesced: int = 0
+    failed: int = 0
+    collected: int = 0
+    peak_active: int = 0
+
+
+@dataclass(slots=True)
+class _Mailbox:
+    queue: asyncio.Queue[Pending]
+    task: Optional[asyncio.Task[None]] = None
+
+
+class UserMailboxes:
+    """One queue and one worker task per user, so a user's turns never overlap.
+
+    A worker takes messages strictly in arrival order. With
+    ``coalesce_window_sec > 0`` it keeps collecting for as long as the next
+    message arrives within the window (up to ``max_batch``). The burst then
+    becomes one turn: the joined text goes to ``respond``, the last
+    message's ``submit`` gets the reply (or the turn's exception) and the
+    earlier ones get ``None``. A mailbox idle for ``idle_ttl_sec`` removes
+    itself. At most ``max_active`` turns run at once across all users.
+    """
+
+    def __init__(
+        self,
+        respond: Respond,
+        *,
+        coalesce_window_sec: float = 0.0,
+        max_batch: int = 5,
+        idle_ttl_sec: float = 60.0,
+        max_active: int = 64,
+        joiner: str = "\n",
+    ) -> None:
+        self.respond = respond
+        self.coalesce_window_sec = coalesce_window_sec
+        self.max_batch = max(1, max_batch)
+        self.idle_ttl_sec = idle_ttl_sec
+        self.max_active = max(1, max_active)
+        self.joiner = joiner
+        self.metrics = MailboxMetrics()
+        self._boxes: Dict[int, _Mailbox] = {}
+        self._slots = asyncio.Semaphore(self.max_active)
+        self._active = 0
+        self._pending: set[asyncio.Future[Any]] = set()
+
+    def __len__(self) -> int:
+        return len(self._boxes)
+
+    async def submit(self, tg_user_id: int, text: str) -> Any:
+        """Queues a message and waits for its turn; ``None`` means a later message carries the reply."""
+        box = self._boxes.get(tg_user_id)
+        if box is None:
+            box = self._boxes[tg_user_id] = _Mailbox(asyncio.Queue())
+            box.task = asyncio.create_task(self._run(tg_user_id, box))
+        future: asyncio.Future[Any] = asyncio.get_running_loop().create_future()
+        self._pending.add(future)
+        future.add_done_callback(self._pending.discard)
+        box.queue.put_nowait((text, future))
+        self.metrics.messages += 1
+        return await future
+
+    async def _collect(self, box: _Mailbox, first: Pending) -> List[Pending]:
+        batch = [first]
+        while len(batch) < self.max_batch:
+            if not box.queue.empty():
+                batch.append(box.queue.get_nowait())
+                continue
+            try:
+                batch.append(await asyncio.wait_for(box.queue.get(), self.coalesce_window_sec))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self, tg_user_id: int, box: _Mailbox) -> None:
+        while True:
+            try:
+                first = await asyncio.wait_for(box.queue.get(), self.idle_ttl_sec)
+            except asyncio.TimeoutError:
+                if box.queue.empty():
+                    # no await between the check and the removal: submit() cannot slip in
+                    del self._boxes[tg_user_id]
+                    self.metrics.collected += 1
+                    return
+                continue
+            batch = await self._collect(box, first) if self.coalesce_window_sec > 0 else [first]
+            await self._turn(tg_user_id, batch)
+
+    async def _turn(self, tg_user_id: int, batch: List[Pending]) -> None:
+        futures = [fut for _, fut in batch]
+        text = self.joiner.join(t for t, _ in batch)
+        async with self._slots:
+            self._active += 1
+            self.metrics.peak_active = max(self.metrics.peak_active, self._active)
+            try:
+                result = await self.respond(tg_user_id, text)
+            except Exception as exc:
+                self.metrics.failed += 1
+                log.exception("mailbox.turn_failed", tg_user_id=tg_user_id, batch=len(batch))
+                # one failure, one exception: only the sender that owns the reply sees it
+                for fut in futures[:-1]:
+                    if not fut.done():
+                        fut.set_result(None)
+                if not futures[-1].done():
+                    futures[-1].set_exception(exc)
+                return
+            finally:
+                self._active -= 1
+        self.metrics.turns += 1
+        self.metrics.coalesced += len(batch) - 1
+        for fut in futures[:-1]:
+            if not fut.done():
+                fut.set_result(None)
+        if not futures[-1].done():
+            futures[-1].set_result(result)
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {**asdict(self.metrics), "mailboxes": len(self._boxes), "active": self._active}
+
+    async def stop(self, drain: bool = True, grace_sec: float = 10.0) -> None:
+        """Lets queued and running turns finish (up to ``grace_sec``), then cancels the rest."""
+        if drain and self._pending:
+            _, left = await asyncio.wait(set(self._pending), timeout=grace_sec)
+            if left:
+                log.warning("mailbox.drain_timeout", left=len(left))
+        tasks = [box.task for box in self._boxes.values() if box.task is not None]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        # queued messages and the batch of a cancelled turn: their senders must not hang
+        for fut in list(self._pending):
+            fut.cancel()
+        self._boxes.clear()
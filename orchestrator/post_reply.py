@@ -0,0 +1,153 @@
+"""Post-reply work pipeline: persistence and bookkeeping that run after the answer is sent.
+
+Jobs are sharded by ``tg_user_id`` over a fixed set of bounded queues, one
+worker per shard, so all jobs of one user run strictly in submission order
+while different users proceed in parallel. A job that hits a transient
+SQLite lock (``database is locked`` / ``database is busy``) is retried with
+exponential backoff; anything else is logged and counted as failed.
+``wait_user`` is the read-your-writes barrier: the next turn of a user
+awaits it before reading memory.
+"""
+from __future__ import annotations
+
+import asyncio
+import sqlite3
+import time
+from dataclasses import asdict, dataclass
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from core.logging import get_logger
+
+log = get_logger("post_reply")
+
+Job = Callable[[], Awaitable[Any]]
+
+_TRANSIENT_MARKERS = ("database is locked", "database is busy", "database table is locked")
+
+
+def is_transient(exc: BaseException) -> bool:
+    return isinstance(exc, sqlite3.OperationalError) and any(m in str(exc).lower() for m in _TRANSIENT_MARKERS)
+
+
+@dataclass(slots=True)
+class PipelineMetrics:
+    submitted: int = 0
+    completed: int = 0
+    retried: int = 0
+    failed: int = 0
+    blocked_submits: int = 0
+    max_lag_ms: float = 0.0
+
+
+class PostReplyPipeline:
+    def __init__(
+        self,
+        *,
+        shards: int = 4,
+        queue_size: int = 1000,
+        max_retries: int = 5,
+        retry_base_sec: float = 0.05,
+    ) -> None:
+        self.shards = max(1, shards)
+        self.max_retries = max(0, max_retries)
+        self.retry_base_sec = retry_base_sec
+        self.metrics = PipelineMetrics()
+        per_shard = max(1, queue_size // self.shards)
+        self._queues: List[asyncio.Queue[Tuple[int, str, Job, float]]] = [
+            asyncio.Queue(maxsize=per_shard) for _ in range(self.shards)
+        ]
+        self._pending: Dict[int, int] = {}
+        self._idle: Dict[int, asyncio.Event] = {}
+        self._tasks: List[asyncio.Task[None]] = []
+
+    def shard_of(self, tg_user_id: int) -> int:
+        return tg_user_id % self.shards
+
+    async def submit(self, tg_user_id: int, name: str, job: Job) -> None:
+        """Queues ``job``; waits only when the user's shard is full (backpressure)."""
+        self.start()
+        queue = self._queues[self.shard_of(tg_user_id)]
+        self._pending[tg_user_id] = self._pending.get(tg_user_id, 0) + 1
+        event = self._idle.get(tg_user_id)
+        if event is None:
+            event = self._idle[tg_user_id] = asyncio.Event()
+        event.clear()
+        self.metrics.submitted += 1
+        item = (tg_user_id, name, job, time.perf_counter())
+        try:
+            queue.put_nowait(item)
+        except asyncio.QueueFull:
+            self.metrics.blocked_submits += 1
+            await queue.put(item)
+
+    async def wait_user(self, tg_user_id: int) -> None:
+        """Returns once every job submitted so far for this user has finished."""
+        event = self._idle.get(tg_user_id)
+        if event is not None:
+            await event.wait()
+
+    def pending(self, tg_user_id: Optional[int] = None) -> int:
+        if tg_user_id is not None:
+            return self._pending.get(tg_user_id, 0)
+        return sum(q.qsize() for q in self._queues)
+
+    async def _execute(self, tg_user_id: int, name: str, job: Job) -> None:
+        attempt = 0
+        while True:
+            try:
+                await job()
+                self.metrics.completed += 1
+                return
+            except Exception as exc:
+                if is_transient(exc) and attempt < self.max_retries:
+                    attempt += 1
+                    self.metrics.retried += 1
+                    await asyncio.sleep(self.retry_base_sec * (2 ** (attempt - 1)))
+                    continue
+                self.metrics.failed += 1
+                log.exception("post_reply.job_failed", job=name, tg_user_id=tg_user_id, attempts=attempt + 1)
+                return
+
+    def _done(self, tg_user_id: int) -> None:
+        left = self._pending.get(tg_user_id, 1) - 1
+        if left > 0:
+            self._pending[tg_user_id] = left
+            return
+        self._pending.pop(tg_user_id, None)
+        event = self._idle.pop(tg_user_id, None)
+        if event is not None:
+            event.set()
+
+    async def _worker(self, queue: asyncio.Queue[Tuple[int, str, Job, float]]) -> None:
+        while True:
+            tg_user_id, name, job, queued_at = await queue.get()
+            lag_ms = (time.perf_counter() - queued_at) * 1000
+            self.metrics.max_lag_ms = max(self.metrics.max_lag_ms, round(lag_ms, 2))
+            try:
+                await self._execute(tg_user_id, name, job)
+            finally:
+                self._done(tg_user_id)
+                queue.task_done()
+
+    def start(self) -> None:
+        if not self._tasks:
+            self._tasks = [asyncio.create_task(self._worker(q)) for q in self._queues]
+
+    async def drain(self) -> None:
+        """Waits until every queued job has run; bound it with ``asyncio.timeout`` if needed."""
+        await asyncio.gather(*(q.join() for q in self._queues))
+
+    async def stop(self, drain: bool = True, grace_sec: float = 10.0) -> None:
+        if drain and self._tasks:
+            try:
+                async with asyncio.timeout(grace_sec):
+                    await self.drain()
+            except TimeoutError:
+                log.warning("post_reply.drain_timeout", left=self.pending())
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {**asdict(self.metrics), "depth": self.pending(), "shards": self.shards}
@@ -11,12 +11,14 @@ class DeepSeekClient:
         self.base_url = "https://api.deepseek.com/v1"
         self._client = httpx.AsyncClient(timeout=30)
 
-    async def chat(self, messages: list[dict], model: str = "deepseek-chat"):
+    async def chat(self, messages: list[dict], model: str = "deepseek-chat", *, response_format: dict | None = None):
         if not self.api_key:
             return {"role": "assistant", "content": "(демо) Я слышу тебя, расскажи больше."}
 
         headers = {"Authorization": f"Bearer {self.api_key}"}
         payload = {"model": model, "messages": messages}
+        if response_format:
+            payload["response_format"] = response_format
         try:
             r = await self._client.post(f"{self.base_url}/chat/completions", json=payload, headers=headers)
             r.raise_for_status()
@@ -25,7 +27,10 @@ class DeepSeekClient:
             raise
         data = r.json()
         content = data["choices"][0]["message"]["content"]
-        return {"role": "assistant", "content": content}
+        reply = {"role": "assistant", "content": content}
+        if data.get("usage"):
+            reply["usage"] = data["usage"]
+        return reply
 
     async def health_check(self) -> tuple[bool, str]:
         if not self.api_key:
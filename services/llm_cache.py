@@ -0,0 +1,192 @@
+# mypy: ignore-errors
+# services/llm_cache.py
+"""Кэш ответов LLM по нормализованному списку сообщений."""
+from __future__ import annotations
+
+import hashlib
+import json
+import re
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+_WS_RE = re.compile(r"\s+")
+
+# Значения plan.metadata["sensitivity"], при которых ответ никогда не кэшируется.
+BYPASS_SENSITIVITY = frozenset({"personal", "sensitive"})
+
+
+def normalize_messages(messages: List[Dict[str, Any]]) -> List[List[str]]:
+    out: List[List[str]] = []
+    for m in messages:
+        content = _WS_RE.sub(" ", str(m.get("content") or "")).strip().casefold()
+        out.append([str(m.get("role") or ""), content])
+    return out
+
+
+def cache_key(messages: List[Dict[str, Any]], model: str) -> str:
+    raw = json.dumps([model, normalize_messages(messages)], ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def _version(world_version: Any) -> Optional[str]:
+    return None if world_version is None else str(world_version)
+
+
+def plan_is_cacheable(plan: Any) -> bool:
+    """False, если политика пометила интент как личный/чувствительный."""
+    metadata = getattr(plan, "metadata", None) or {}
+    return metadata.get("sensitivity") not in BYPASS_SENSITIVITY
+
+
+@dataclass(slots=True)
+class CacheMetrics:
+    hits: int = 0
+    misses: int = 0
+    bypassed: int = 0
+    expired: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        if lookups == 0:
+            return 0.0
+        return self.hits / lookups
+
+
+class CompletionCache:
+    """
+    LRU в памяти + (опционально) таблица llm_cache в SQLite с TTL.
+    Запись привязывается к версии world state: при смене версии она считается протухшей.
+    """
+
+    def __init__(self, db=None, max_entries: int = 512, ttl_sec: int = 3600):
+        self.db = db
+        self.max_entries = max_entries
+        self.ttl_sec = ttl_sec
+        self.metrics = CacheMetrics()
+        self._mem: "OrderedDict[str, tuple[Dict[str, Any], Optional[str], float]]" = OrderedDict()
+        self._ready = False
+
+    async def _ensure(self):
+        if self._ready or self.db is None:
+            return
+        await self.db.conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS llm_cache (
+                key TEXT PRIMARY KEY,
+                payload TEXT NOT NULL,
+                world_version TEXT,
+                created_at REAL NOT NULL
+            )
+            """
+        )
+        await self.db.conn.commit()
+        self._ready = True
+
+    def _fresh(self, created_at: float, version: Optional[str], world_version: Optional[str]) -> bool:
+        if (time.time() - created_at) > self.ttl_sec:
+            return False
+        return version == world_version
+
+    async def get(self, key: str, world_version: Any = None) -> Optional[Dict[str, Any]]:
+        world_version = _version(world_version)
+        expired = False
+        entry = self._mem.get(key)
+        if entry is not None:
+            payload, version, created_at = entry
+            if self._fresh(created_at, version, world_version):
+                self._mem.move_to_end(key)
+                self.metrics.hits += 1
+                return dict(payload)
+            del self._mem[key]
+            expired = True
+
+        if self.db is not None:
+            await self._ensure()
+            cur = await self.db.conn.execute(
+                "SELECT payload, world_version, created_at FROM llm_cache WHERE key=?", (key,)
+            )
+            row = await cur.fetchone()
+            await cur.close()
+            if row:
+                payload_s, version, created_at = row
+                if self._fresh(float(created_at), version, world_version):
+                    payload = json.loads(payload_s)
+                    self._remember(key, payload, version, float(created_at))
+                    self.metrics.hits += 1
+                    return dict(payload)
+                await self.db.conn.execute("DELETE FROM llm_cache WHERE key=?", (key,))
+                await self.db.conn.commit()
+                expired = True
+
+        if expired:
+            self.metrics.expired += 1
+        self.metrics.misses += 1
+        return None
+
+    async def put(self, key: str, payload: Dict[str, Any], world_version: Any = None) -> None:
+        world_version = _version(world_version)
+        now = time.time()
+        self._remember(key, payload, world_version, now)
+        if self.db is not None:
+            await self._ensure()
+            await self.db.conn.execute(
+                "REPLACE INTO llm_cache (key, payload, world_version, created_at) VALUES (?, ?, ?, ?)",
+                (key, json.dumps(payload, ensure_ascii=False), world_version, now),
+            )
+            await self.db.conn.commit()
+
+    def _remember(self, key: str, payload: Dict[str, Any], version: Optional[str], created_at: float) -> None:
+        self._mem[key] = (dict(payload), version, created_at)
+        self._mem.move_to_end(key)
+        while len(self._mem) > self.max_entries:
+            self._mem.popitem(last=False)
+
+    async def purge_expired(self) -> int:
+        if self.db is None:
+            return 0
+        await self._ensure()
+        cur = await self.db.conn.execute(
+            "DELETE FROM llm_cache WHERE created_at < ?", (time.time() - self.ttl_sec,)
+        )
+        await self.db.conn.commit()
+        return cur.rowcount or 0
+
+
+class CachedLLM:
+    """Обёртка над DeepSeekClient с тем же интерфейсом chat/health_check/aclose."""
+
+    def __init__(self, llm, cache: CompletionCache):
+        self.llm = llm
+        self.cache = cache
+
+    @property
+    def metrics(self) -> CacheMetrics:
+        return self.cache.metrics
+
+    async def chat(
+        self,
+        messages: List[Dict[str, Any]],
+        model: str = "deepseek-chat",
+        *,
+        cacheable: bool = True,
+        world_version: Any = None,
+    ):
+        if not cacheable:
+            self.cache.metrics.bypassed += 1
+            return await self.llm.chat(messages, model=model)
+        key = cache_key(messages, model)
+        cached = await self.cache.get(key, world_version)
+        if cached is not None:
+            return cached
+        reply = await self.llm.chat(messages, model=model)
+        await self.cache.put(key, reply, world_version)
+        return reply
+
+    async def health_check(self) -> tuple[bool, str]:
+        return await self.llm.health_check()
+
+    async def aclose(self):
+        await self.llm.aclose()
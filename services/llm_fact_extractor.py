@@ -0,0 +1,270 @@
+# mypy: ignore-errors
+# services/llm_fact_extractor.py
+"""
+Отложенное извлечение фактов через LLM, пачками и вне горячего пути.
+
+submit() только кладёт сообщение в очередь. Фоновая задача раз в flush_interval_sec
+(или сразу, как набралось batch_size сообщений) делает ОДИН вызов chat() на всю
+пачку: сообщения пронумерованы, ответ — JSON по FACTS_SCHEMA. Факты ниже
+min_confidence отбрасываются, остальные пишутся через FactsRepo.upsert_many
+(группами по пользователю и сообщению). На каждую пачку — латентность,
+токены и оценка стоимости в LLMExtractionMetrics.
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from core.logging import get_logger
+
+log = get_logger("llm.facts")
+
+FACTS_SCHEMA: Dict[str, Any] = {
+    "type": "object",
+    "required": ["facts"],
+    "properties": {
+        "facts": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "required": ["i", "predicate", "object", "confidence"],
+                "properties": {
+                    "i": {"type": "integer", "description": "номер сообщения"},
+                    "predicate": {"type": "string", "description": "snake_case ключ, например pets, work_place"},
+                    "object": {"type": "string"},
+                    "confidence": {"type": "number", "minimum": 0, "maximum": 1},
+                },
+            },
+        }
+    },
+}
+
+_SYSTEM_PROMPT = (
+    "Ты извлекаешь устойчивые факты о пользователе из его сообщений "
+    "(работа, питомцы, семья, хобби, вкусы, здоровье, планы). "
+    "Не выдумывай и не пересказывай эмоции момента. "
+    "Ответь только JSON по схеме:\n"
+)
+
+
+@dataclass(slots=True)
+class _Pending:
+    tg_user_id: int
+    message_id: Optional[int]
+    text: str
+
+
+@dataclass(slots=True)
+class LLMExtractionMetrics:
+    batches: int = 0
+    messages: int = 0
+    dropped: int = 0
+    facts_accepted: int = 0
+    facts_rejected: int = 0
+    parse_errors: int = 0
+    llm_errors: int = 0
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    cost_usd: float = 0.0
+    latency_sec_total: float = 0.0
+    last_latency_ms: float = 0.0
+    last_batch_size: int = 0
+    last_cost_usd: float = 0.0
+
+    def snapshot(self) -> Dict[str, Any]:
+        avg = self.latency_sec_total / self.batches * 1000 if self.batches else 0.0
+        return {
+            "batches": self.batches,
+            "messages": self.messages,
+            "dropped": self.dropped,
+            "facts_accepted": self.facts_accepted,
+            "facts_rejected": self.facts_rejected,
+            "parse_errors": self.parse_errors,
+            "llm_errors": self.llm_errors,
+            "tokens": self.prompt_tokens + self.completion_tokens,
+            "cost_usd": round(self.cost_usd, 6),
+            "avg_latency_ms": round(avg, 1),
+            "last_latency_ms": round(self.last_latency_ms, 1),
+            "last_batch_size": self.last_batch_size,
+            "last_cost_usd": round(self.last_cost_usd, 6),
+        }
+
+
+def parse_facts(content: str, n_messages: int) -> Tuple[List[Dict[str, Any]], int]:
+    """Разбирает ответ модели; возвращает (валидные факты, число отброшенных записей)."""
+    text = (content or "").strip()
+    if text.startswith("```"):
+        text = text.strip("`")
+        text = text[text.find("{") :]
+    data = json.loads(text)
+    raw = data.get("facts") if isinstance(data, dict) else None
+    if not isinstance(raw, list):
+        raise ValueError("no facts array")
+    facts, bad = [], 0
+    for item in raw:
+        try:
+            i = int(item["i"])
+            pred = str(item["predicate"]).strip().lower().replace(" ", "_")
+            obj = str(item["object"]).strip()
+            conf = float(item["confidence"])
+        except (KeyError, TypeError, ValueError):
+            bad += 1
+            continue
+        if not (0 <= i < n_messages) or not pred or not obj or not 0.0 <= conf <= 1.0:
+            bad += 1
+            continue
+        facts.append({"i": i, "predicate": pred, "object": obj, "confidence": conf})
+    return facts, bad
+
+
+class LLMFactExtractor:
+    def __init__(
+        self,
+        llm,
+        facts_repo,
+        *,
+        batch_size: int = 20,
+        flush_interval_sec: float = 30.0,
+        min_confidence: float = 0.6,
+        max_queue: int = 1000,
+        min_chars: int = 12,
+        model: str = "deepseek-chat",
+        price_prompt_per_m: float = 0.27,
+        price_completion_per_m: float = 1.10,
+    ):
+        self.llm = llm
+        self.facts_repo = facts_repo
+        self.batch_size = max(1, batch_size)
+        self.flush_interval_sec = flush_interval_sec
+        self.min_confidence = min_confidence
+        self.min_chars = min_chars
+        self.model = model
+        self.price_prompt_per_m = price_prompt_per_m
+        self.price_completion_per_m = price_completion_per_m
+        self.metrics = LLMExtractionMetrics()
+        self._queue: Deque[_Pending] = deque(maxlen=max_queue)
+        self._wakeup = asyncio.Event()
+        self._lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+
+    def submit(self, tg_user_id: int, text: str, message_id: Optional[int] = None) -> bool:
+        """Неблокирующая постановка в очередь; короткие реплики («ок», «ага») не шлём."""
+        text = (text or "").strip()
+        if len(text) < self.min_chars:
+            return False
+        if len(self._queue) == self._queue.maxlen:
+            self.metrics.dropped += 1  # deque выкинет самое старое
+        self._queue.append(_Pending(tg_user_id, message_id, text))
+        if len(self._queue) >= self.batch_size:
+            self._wakeup.set()
+        return True
+
+    @property
+    def pending(self) -> int:
+        return len(self._queue)
+
+    def _prompt(self, batch: List[_Pending]) -> List[Dict[str, str]]:
+        numbered = [{"i": i, "text": p.text} for i, p in enumerate(batch)]
+        return [
+            {"role": "system", "content": _SYSTEM_PROMPT + json.dumps(FACTS_SCHEMA, ensure_ascii=False)},
+            {"role": "user", "content": json.dumps({"messages": numbered}, ensure_ascii=False)},
+        ]
+
+    def _account(self, reply: Dict[str, Any], latency: float, size: int):
+        m = self.metrics
+        usage = reply.get("usage") or {}
+        prompt_tokens = int(usage.get("prompt_tokens") or 0)
+        completion_tokens = int(usage.get("completion_tokens") or 0)
+        cost = (prompt_tokens * self.price_prompt_per_m + completion_tokens * self.price_completion_per_m) / 1e6
+        m.batches += 1
+        m.messages += size
+        m.prompt_tokens += prompt_tokens
+        m.completion_tokens += completion_tokens
+        m.cost_usd += cost
+        m.latency_sec_total += latency
+        m.last_latency_ms = latency * 1000
+        m.last_batch_size = size
+        m.last_cost_usd = cost
+
+    async def flush(self) -> int:
+        """Одна пачка: один вызов LLM. Возвращает число записанных фактов."""
+        async with self._lock:
+            batch = [self._queue.popleft() for _ in range(min(self.batch_size, len(self._queue)))]
+            if not batch:
+                return 0
+            t0 = time.perf_counter()
+            try:
+                reply = await self.llm.chat(
+                    self._prompt(batch), model=self.model, response_format={"type": "json_object"}
+                )
+            except Exception:
+                self.metrics.llm_errors += 1
+                log.exception("llm_facts.call_failed", batch=len(batch))
+                return 0
+            self._account(reply, time.perf_counter() - t0, len(batch))
+            try:
+                facts, bad = parse_facts(reply.get("content", ""), len(batch))
+            except (ValueError, AttributeError):
+                self.metrics.parse_errors += 1
+                log.warning("llm_facts.bad_json", batch=len(batch))
+                return 0
+            grouped: Dict[Tuple[int, Optional[int]], List[Dict[str, Any]]] = {}
+            rejected = bad
+            for f in facts:
+                if f["confidence"] < self.min_confidence:
+                    rejected += 1
+                    continue
+                src = batch[f["i"]]
+                grouped.setdefault((src.tg_user_id, src.message_id), []).append(
+                    {"predicate": f["predicate"], "object": f["object"], "confidence": f["confidence"], "tags": ["llm"]}
+                )
+            accepted = 0
+            for (tg_user_id, message_id), rows in grouped.items():
+                await self.facts_repo.upsert_many(tg_user_id, rows, source_msg_id=message_id)
+                accepted += len(rows)
+            self.metrics.facts_accepted += accepted
+            self.metrics.facts_rejected += rejected
+            log.info("llm_facts.batch", **self.metrics.snapshot())
+            return accepted
+
+    async def run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval_sec)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            try:
+                while self._queue:
+                    await self.flush()
+                    if len(self._queue) < self.batch_size:
+                        break
+            except Exception:
+                # например, "database is locked" в upsert_many: задача должна жить дальше
+                log.exception("llm_facts.flush_failed", pending=len(self._queue))
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self.run())
+
+    async def stop(self, drain: bool = True):
+        if self._task is not None:
+            # отмена посреди flush потеряла бы пачку, уже вынутую из очереди:
+            # ждём текущий flush и отменяем задачу, пока она не взяла следующую
+            async with self._lock:
+                self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        while drain and self._queue:
+            try:
+                await self.flush()
+            except Exception:
+                log.exception("llm_facts.flush_failed", pending=len(self._queue))
+                break
@@ -1,26 +1,80 @@
 # mypy: ignore-errors
 # services/world_state.py
+import asyncio
 import json
+import logging
 import time
-from typing import Any, Dict, Optional
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from core.settings import settings
+
+log = logging.getLogger("world_state")
+
+LEGACY_KEY = "spb_world"  # единственный ключ до появления локаций
+
+
+@dataclass(frozen=True, slots=True)
+class Location:
+    city: str
+    tz: str
+
+    @property
+    def key(self) -> str:
+        return f"world:{self.city.strip().casefold()}|{self.tz}"
+
+
+@dataclass(slots=True)
+class _Entry:
+    location: Location
+    snapshot: Optional[Dict[str, Any]] = None
+    fetched_at: float = 0.0
+    retry_at: float = 0.0
+    version: int = 0
+    last_access: float = 0.0
+    loaded: bool = False
+    refresh_task: Optional[asyncio.Task] = field(default=None, repr=False)
+
+    @property
+    def refreshing(self) -> bool:
+        return self.refresh_task is not None and not self.refresh_task.done()
 
 
 class WorldState:
-    def __init__(self, db, fetcher, ttl_sec: int = 900):
+    def __init__(
+        self,
+        db,
+        fetcher,
+        ttl_sec: int = 900,
+        retry_backoff_sec: int = 30,
+        default_location: Optional[Location] = None,
+        max_locations: int = 256,
+    ):
         """
         db: storage.db.DB со свойством .conn (aiosqlite)
-        fetcher: async callable -> dict  (фактический запрос погоды/контекста)
+        fetcher: async callable(location) -> dict  (фактический запрос погоды/контекста);
+                 если у него есть fetch_many(locations) -> {location: dict}, prefetch идёт пачками
+        version: растёт при каждой смене любого снимка (для кэшей, привязанных к погоде)
+        max_locations: сколько локаций держим в памяти (LRU по последнему обращению)
         """
         self.db = db
         self.fetcher = fetcher
         self.ttl_sec = ttl_sec
+        self.retry_backoff_sec = retry_backoff_sec
+        self.default_location = default_location or Location(settings.AYA_CITY, settings.AYA_TZ)
+        self.max_locations = max_locations
+        self.version = 0
         self._ready = False
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
 
     async def _table_exists(self) -> bool:
         cur = await self.db.conn.execute(
             "SELECT name FROM sqlite_master WHERE type='table' AND name='world_state'"
         )
-        return (await cur.fetchone()) is not None
+        row = await cur.fetchone()
+        await cur.close()
+        return row is not None
 
     async def _ensure_table(self):
         """
@@ -31,9 +85,10 @@ class WorldState:
             return
 
         if not await self._table_exists():
+            # IF NOT EXISTS: соседний воркер (или корутина) мог создать таблицу после проверки
             await self.db.conn.execute(
                 """
-                CREATE TABLE world_state (
+                CREATE TABLE IF NOT EXISTS world_state (
                     key TEXT PRIMARY KEY,
                     payload TEXT NOT NULL,
                     updated_at REAL NOT NULL
@@ -59,7 +114,7 @@ class WorldState:
                     "DELETE FROM world_state WHERE rowid NOT IN (SELECT MAX(rowid) FROM world_state)"
                 )
             await self.db.conn.execute(
-                "UPDATE world_state SET key=? WHERE key IS NULL", ("spb_world",)
+                "UPDATE world_state SET key=? WHERE key IS NULL", (self.default_location.key,)
             )
             cols.add("key")
 
@@ -77,58 +132,223 @@ class WorldState:
             "CREATE UNIQUE INDEX IF NOT EXISTS ux_world_state_key ON world_state(key)"
         )
 
+        # 4) Строка до локаций хранилась под ключом "spb_world" — переносим её на
+        #    локацию по умолчанию (если там уже есть свежий снимок, старую просто удаляем)
+        await self.db.conn.execute(
+            "UPDATE OR IGNORE world_state SET key=? WHERE key=?",
+            (self.default_location.key, LEGACY_KEY),
+        )
+        await self.db.conn.execute("DELETE FROM world_state WHERE key=?", (LEGACY_KEY,))
+
         await self.db.conn.commit()
         self._ready = True
 
-    async def _get_cache(self, key: str) -> Optional[Dict[str, Any]]:
+    async def _load_persisted(self, key: str) -> Optional[Tuple[Dict[str, Any], float]]:
         await self._ensure_table()
         cur = await self.db.conn.execute(
             "SELECT payload, updated_at FROM world_state WHERE key=?",
             (key,),
         )
         row = await cur.fetchone()
+        await cur.close()
         if not row:
             return None
         payload_s, updated_at = row
-        if updated_at is None:
-            return None
-        if (time.time() - float(updated_at)) > self.ttl_sec:
-            return None
         try:
-            return json.loads(payload_s)
+            payload = json.loads(payload_s)
         except Exception:
             return None
+        return payload, float(updated_at or 0.0)
 
-    async def _set_cache(self, key: str, payload: Dict[str, Any]):
+    async def _set_cache(self, key: str, payload: Dict[str, Any], updated_at: float):
         await self._ensure_table()
         await self.db.conn.execute(
             "REPLACE INTO world_state (key, payload, updated_at) VALUES (?, ?, ?)",
-            (key, json.dumps(payload, ensure_ascii=False), time.time()),
+            (key, json.dumps(payload, ensure_ascii=False), updated_at),
         )
         await self.db.conn.commit()
 
-    async def get_context(self) -> Dict[str, Any]:
+    def _entry(self, location: Location) -> _Entry:
+        entry = self._entries.get(location.key)
+        if entry is None:
+            entry = _Entry(location)
+            self._entries[location.key] = entry
+            self._trim()
+        return entry
+
+    def _trim(self):
+        # вытесняем давно не запрашиваемые локации; обновляющиеся не трогаем
+        while len(self._entries) > self.max_locations:
+            victim = next((k for k, e in self._entries.items() if not e.refreshing), None)
+            if victim is None:
+                return
+            del self._entries[victim]
+
+    def _is_fresh(self, entry: _Entry, now: float) -> bool:
+        return (now - entry.fetched_at) <= self.ttl_sec
+
+    def version_for(self, location: Optional[Location] = None) -> int:
+        entry = self._entries.get((location or self.default_location).key)
+        return entry.version if entry else 0
+
+    async def get_context(self, location: Optional[Location] = None) -> Dict[str, Any]:
         """
-        Возвращает свежий контекст из кэша или fetcher; при сетевых ошибках
-        отдаёт последний кэш (если есть), иначе деградированный ответ.
+        Отдаёт снимок локации из памяти, пока он свежий. После TTL отдаёт устаревший
+        снимок и запускает ровно одно фоновое обновление (single-flight).
+        SQLite читается только при первом обращении к локации (переживаем рестарты).
+        При сетевых ошибках остаётся последний снимок, иначе деградированный ответ.
         """
-        key = "spb_world"
-        cached = await self._get_cache(key)
-        if cached is not None:
-            return cached
+        entry = self._entry(location or self.default_location)
+        now = time.time()
+        entry.last_access = now
+        self._entries.move_to_end(entry.location.key)
+        if not entry.loaded:
+            entry.loaded = True
+            persisted = await self._load_persisted(entry.location.key)
+            if persisted is not None and entry.snapshot is None:
+                entry.snapshot, entry.fetched_at = persisted
+                self.version += 1
+                entry.version = self.version
+
+        if entry.snapshot is not None:
+            if not self._is_fresh(entry, now) and now >= entry.retry_at:
+                self._start_refresh(entry)
+            return entry.snapshot
+
+        refreshed = await asyncio.shield(self._start_refresh(entry))
+        if refreshed is not None:
+            return refreshed
+        return {"status": "degraded", "weather": None}
+
+    def _start_refresh(self, entry: _Entry, batch: Optional[asyncio.Future] = None) -> "asyncio.Task":
+        if not entry.refreshing:
+            entry.refresh_task = asyncio.create_task(self._refresh(entry, batch))
+        return entry.refresh_task
+
+    async def _refresh(self, entry: _Entry, batch: Optional[asyncio.Future] = None) -> Optional[Dict[str, Any]]:
+        try:
+            if batch is not None:
+                fresh = (await batch).get(entry.location)
+                if fresh is None:
+                    raise LookupError(f"no data for {entry.location.key}")
+            else:
+                fresh = await self.fetcher(entry.location)
+        except Exception:
+            log.warning("world_state fetch failed for %s; serving last snapshot", entry.location.key, exc_info=True)
+            entry.retry_at = time.time() + min(self.ttl_sec, self.retry_backoff_sec)
+            return entry.snapshot
+        if not isinstance(fresh, dict):
+            fresh = {"raw": fresh}
+        now = time.time()
+        if fresh != entry.snapshot:
+            self.version += 1
+            entry.version = self.version
+        entry.snapshot, entry.fetched_at = fresh, now
         try:
-            fresh = await self.fetcher()
-            if not isinstance(fresh, dict):
-                fresh = {"raw": fresh}
-            await self._set_cache(key, fresh)
-            return fresh
+            await self._set_cache(entry.location.key, fresh, now)
         except Exception:
-            # fallback на старый (возможно, просроченный) кэш
+            log.warning("world_state persist failed", exc_info=True)
+        return fresh
+
+    async def refresh_many(self, locations: Iterable[Location]) -> None:
+        """Обновляет несколько локаций; если fetcher умеет fetch_many — одним запросом."""
+        entries = [self._entry(loc) for loc in locations]
+        entries = [e for e in entries if not e.refreshing]
+        if not entries:
+            return
+        fetch_many = getattr(self.fetcher, "fetch_many", None)
+        batch = None
+        if fetch_many is not None:
+            batch = asyncio.ensure_future(fetch_many([e.location for e in entries]))
+        await asyncio.gather(*(self._start_refresh(e, batch) for e in entries))
+
+    def due_locations(self, active_window_sec: float, horizon_sec: float, now: Optional[float] = None) -> List[Location]:
+        """Локации с недавними обращениями, чей снимок протухнет в ближайшие horizon_sec."""
+        now = time.time() if now is None else now
+        due = [
+            e for e in self._entries.values()
+            if now - e.last_access <= active_window_sec
+            and not e.refreshing
+            and now >= e.retry_at
+            and (e.snapshot is None or now + horizon_sec - e.fetched_at > self.ttl_sec)
+        ]
+        due.sort(key=lambda e: e.fetched_at)
+        return [e.location for e in due]
+
+    def evict_idle(self, idle_sec: float, now: Optional[float] = None) -> int:
+        now = time.time() if now is None else now
+        idle = [
+            k for k, e in self._entries.items()
+            if now - e.last_access > idle_sec and not e.refreshing
+        ]
+        for k in idle:
+            del self._entries[k]
+        return len(idle)
+
+    async def aclose(self):
+        tasks = [e.refresh_task for e in self._entries.values() if e.refreshing]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+class WorldPrefetcher:
+    """
+    Фоновое обновление погоды только для локаций с недавно активными пользователями.
+    Пачки по batch_size, не больше max_fetches_per_min запросов к fetcher в минуту.
+    """
+
+    def __init__(
+        self,
+        world: WorldState,
+        interval_sec: float = 60,
+        active_window_sec: float = 1800,
+        idle_evict_sec: float = 6 * 3600,
+        batch_size: int = 10,
+        max_fetches_per_min: int = 30,
+    ):
+        self.world = world
+        self.interval_sec = interval_sec
+        self.active_window_sec = active_window_sec
+        self.idle_evict_sec = idle_evict_sec
+        self.batch_size = max(1, batch_size)
+        self.max_fetches_per_min = max(1, max_fetches_per_min)
+        self._sent: List[float] = []
+        self._task: Optional[asyncio.Task] = None
+
+    def _budget(self, now: float) -> int:
+        self._sent = [t for t in self._sent if now - t < 60]
+        return self.max_fetches_per_min - len(self._sent)
+
+    async def tick(self) -> int:
+        now = time.time()
+        self.world.evict_idle(self.idle_evict_sec, now)
+        due = self.world.due_locations(self.active_window_sec, self.interval_sec, now)
+        due = due[: max(0, self._budget(now))]
+        for i in range(0, len(due), self.batch_size):
+            chunk = due[i : i + self.batch_size]
+            self._sent.extend([time.time()] * len(chunk))
+            await self.world.refresh_many(chunk)
+        return len(due)
+
+    async def run(self):
+        while True:
             try:
-                cur = await self.db.conn.execute("SELECT payload FROM world_state WHERE key=?", (key,))
-                row = await cur.fetchone()
-                if row:
-                    return json.loads(row[0])
+                await self.tick()
             except Exception:
-                pass
-            return {"status": "degraded", "weather": None}
+                log.exception("world prefetch tick failed")
+            await asyncio.sleep(self.interval_sec)
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self.run())
+
+    async def stop(self):
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
@@ -12,8 +12,19 @@ from aiosqlite import Connection, Row
 class DB:
     """Thin async wrapper around a SQLite database using :mod:`aiosqlite`."""
 
-    def __init__(self, path: str | Path) -> None:
+    def __init__(self, path: str | Path, *, busy_timeout_ms: int = 5000, autocommit: bool = False) -> None:
+        """``autocommit`` is for processes that share the file with other writers.
+
+        One connection serves many coroutines, so an implicit transaction opened
+        by one of them stays open across awaits. Another process then waits on
+        its write lock. If a statement fails inside that transaction, the
+        connection keeps a stale snapshot, and every later write fails with
+        ``database is locked``. In autocommit mode each statement commits on its
+        own, and ``commit()`` is a no-op.
+        """
         self.path = Path(path)
+        self.busy_timeout_ms = busy_timeout_ms
+        self.autocommit = autocommit
         self.conn: Optional[Connection] = None
         self._schema_ready = False
         self._chat_fts_enabled = False
@@ -26,12 +37,17 @@ class DB:
         if self.path.parent and not self.path.parent.exists():
             self.path.parent.mkdir(parents=True, exist_ok=True)
 
-        self.conn = await aiosqlite.connect(self.path)
+        if self.autocommit:
+            self.conn = await aiosqlite.connect(self.path, isolation_level=None)
+        else:
+            self.conn = await aiosqlite.connect(self.path)
         self.conn.row_factory = Row
         await self.conn.execute("PRAGMA foreign_keys=ON;")
         await self.conn.execute("PRAGMA journal_mode=WAL;")
         await self.conn.execute("PRAGMA synchronous=NORMAL;")
         await self.conn.execute("PRAGMA temp_store=MEMORY;")
+        # several processes may write the same file (sharded workers, CLI backfills)
+        await self.conn.execute(f"PRAGMA busy_timeout={int(self.busy_timeout_ms)};")
         await self._ensure_schema()
 
     async def close(self) -> None:
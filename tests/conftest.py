@@ -59,7 +59,7 @@ async def make_brain(memory_stack):
     decision_engine = DecisionEngine(policy_bundle)
 
     async def factory(world_payload: Dict[str, Any] | None = None) -> AyaBrain:
-        async def fetcher():
+        async def fetcher(location=None):
             return _world_stub(world_payload or {})
 
         world_backend = WorldState(db=memory_repo.db, fetcher=fetcher, ttl_sec=10)
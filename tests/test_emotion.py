@@ -0,0 +1,44 @@
+import pytest
+# mypy: ignore-errors
+
+from domain.reasoning.emotion import EmotionScorer, EmotionTracker, load_lexicon
+
+
+@pytest.fixture(scope="module")
+def scorer():
+    return EmotionScorer(load_lexicon("persona/lexicon.yml"))
+
+
+def _top(scorer, text):
+    scores = scorer.score(text)
+    return scorer.labels[max(range(len(scores)), key=scores.__getitem__)] if max(scores) > 0 else "neutral"
+
+
+def test_scores_intensifiers_and_negation(scorer) -> None:
+    assert _top(scorer, "мне грустно и одиноко") == "sadness"
+    assert _top(scorer, "меня всё бесит") == "anger"
+    assert _top(scorer, "просто поговорим о музыке") == "neutral"
+    sad = scorer.labels.index("sadness")
+    assert scorer.score("мне очень грустно")[sad] > scorer.score("мне грустно")[sad]
+    assert scorer.score("мне не грустно")[sad] == 0.0
+    assert _top(scorer, "ура, я рада!") == "joy"
+    for text in ("надвигается ураган", "радар на крыше", "пусть будет так", "мы в одном классе"):
+        assert _top(scorer, text) == "neutral", text
+    assert scorer.score_batch(["мне грустно", "ура!"]) == [scorer.score("мне грустно"), scorer.score("ура!")]
+
+
+def test_tracker_decays_back_to_neutral(scorer) -> None:
+    tracker = EmotionTracker(scorer, decay=0.5, threshold=0.3, max_users=2)
+    assert tracker.update(1, "я так устала, совсем вымоталась") == "fatigue"
+    assert tracker.update(1, "ну ладно") == "fatigue"
+    assert tracker.update(1, "ок") == "neutral"
+    tracker.update(2, "ура")
+    tracker.update(3, "ура")
+    assert tracker.snapshot(1)["fatigue"] == 0.0
+
+
+@pytest.mark.asyncio
+async def test_low_mood_switches_to_supportive_tone(brain) -> None:
+    response = await brain.respond(81, "мне сегодня так грустно и одиноко")
+    assert "comfort_low_mood" in response.plan["applied_rules"]
+    assert response.plan["tone"] == "supportive"
@@ -0,0 +1,64 @@
+import pytest
+# mypy: ignore-errors
+
+from domain.memory.extraction import (
+    DEFAULT_EXTRACTORS,
+    ExtractionPipeline,
+    Extractor,
+    _has_top_level_branch,
+    extract_facts,
+    load_extractors,
+    merge_extractors,
+)
+
+
+def test_single_scan_keeps_overlapping_facts_with_spans() -> None:
+    facts = extract_facts("живу в калуге и мне 30", subject="1")
+    by_predicate = {f.predicate: f for f in facts}
+    assert by_predicate["age"].object == "30"
+    assert by_predicate["location"].span[0] == 0
+    assert by_predicate["age"].span[0] < by_predicate["location"].span[1]
+    assert [f.object for f in extract_facts("мне 33, мне 33, мне 300", subject="1")] == ["33"]
+
+
+def test_same_start_extractors_and_stats() -> None:
+    pipeline = ExtractionPipeline(
+        DEFAULT_EXTRACTORS + (Extractor("age_words", "age_words", r"\bмне\s+(?P<value>\d+)\s+лет\b", "strip"),)
+    )
+    facts = pipeline.extract("мне 25 лет", subject="1")
+    assert {(f.predicate, f.object) for f in facts} == {("age", "25"), ("age_words", "25")}
+    stats = pipeline.snapshot_stats()
+    assert stats["age"]["hits"] == 1 and stats["age_words"]["hits"] == 1
+    assert stats["_scan"]["messages"] == 1
+
+
+def test_config_extractors_and_batch() -> None:
+    extractors = merge_extractors(DEFAULT_EXTRACTORS, load_extractors("data/fact_extractors.yaml"))
+    pipeline = ExtractionPipeline(extractors)
+    batch = pipeline.extract_batch(["я слушаю радиохед", "меня зовут оля", ""], subjects=["1", "2", "3"])
+    assert [(f.subject, f.predicate, f.object) for f in batch[0]] == [("1", "music_artists", "Радиохед")]
+    assert batch[1][0].object == "Оля"
+    assert batch[2] == []
+    with pytest.raises(ValueError):
+        ExtractionPipeline([Extractor("x", "x", r"(?P<value>x)", "nope")])
+
+
+def test_age_normalizer_skips_non_numbers_and_numbered_backrefs_are_rejected() -> None:
+    pipeline = ExtractionPipeline([Extractor("age_any", "age", r"\bмне\s+(?P<value>\w+)", "age")])
+    assert pipeline.extract("мне двадцать", subject="1") == []
+    assert [f.object for f in pipeline.extract("мне 20", subject="1")] == ["20"]
+    assert pipeline.snapshot_stats()["age_any"]["rejected"] == 1
+    with pytest.raises(ValueError, match="named backreferences"):
+        ExtractionPipeline([Extractor("echo", "echo", r"(\w+) (?P<value>\1)")])
+    echo = ExtractionPipeline(DEFAULT_EXTRACTORS + (Extractor("echo", "echo", r"\b(?P<w>\w+) (?P<value>(?P=w))\b"),))
+    assert [f.object for f in echo.extract("да да", subject="1")] == ["да"]
+
+
+def test_leading_word_boundary_stays_on_the_first_branch() -> None:
+    assert _has_top_level_branch(r"\bа|б")
+    assert not any(_has_top_level_branch(p) for p in (r"\b(?:а|б)", r"\b[|]", r"\b[]|]", r"\b\|"))
+    # ведущий \b выносится за общую альтернативу, но вторая ветка пользовательского паттерна без него
+    unit = Extractor("height_unit", "height_unit", r"\bрост\s+\d+|\d+(?P<value>см|cm)\b", "lower")
+    pipeline = ExtractionPipeline(DEFAULT_EXTRACTORS + (unit,))
+    assert [f.object for f in pipeline.extract("ростом180см", subject="1")] == ["см"]
+    assert pipeline.extract("мне 30", subject="1")[0].object == "30"
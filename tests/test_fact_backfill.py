@@ -0,0 +1,45 @@
+import pytest
+# mypy: ignore-errors
+
+from domain.memory.extraction import DEFAULT_EXTRACTORS, Extractor
+from memory.fact_backfill import FactBackfill
+from memory.facts_repo import FactsRepo
+
+MUSIC = Extractor("music", "music_artists", r"\bслушаю\s+(?P<value>[а-я]+)\b", "title", 0.6, ("music",))
+
+
+async def _seed(db, n: int) -> None:
+    for i in range(n):
+        await db.add_chat_message(i % 3, "user", f"мне {20 + i % 3}, слушаю кино")
+        await db.add_chat_message(i % 3, "assistant", "мне 99, слушаю всех")
+
+
+@pytest.mark.asyncio
+async def test_backfill_resumes_from_checkpoint(db) -> None:
+    await _seed(db, 9)
+    facts_repo = FactsRepo(db)
+    job = FactBackfill(db, facts_repo, workers=0, batch_size=4, pause_sec=0, max_writes_per_sec=0)
+    first = await job.run(max_batches=1)
+    assert (first.messages, first.done) == (4, False)
+    assert (await job.checkpoint())[0] == first.last_id
+
+    resumed = FactBackfill(db, facts_repo, workers=0, batch_size=4, pause_sec=0, max_writes_per_sec=0)
+    report = await resumed.run()
+    assert report.done and report.messages == 9
+    ages = {(r["object"]) for r in await facts_repo.get_all(0) if r["predicate"] == "age"}
+    assert ages == {"20"}  # ответы ассистента не трогаем, повторы не плодим
+    assert not any(r["predicate"] == "music_artists" for r in await facts_repo.get_all(0))
+
+
+@pytest.mark.asyncio
+async def test_new_extractor_starts_new_job_in_process_pool(db) -> None:
+    await _seed(db, 6)
+    facts_repo = FactsRepo(db)
+    await FactBackfill(db, facts_repo, workers=0, pause_sec=0).run()
+    job = FactBackfill(db, facts_repo, DEFAULT_EXTRACTORS + (MUSIC,), workers=2, pause_sec=0)
+    assert await job.checkpoint() == (0, 0, 0)
+    report = await job.run()
+    assert report.done and report.messages == 6
+    rows = await facts_repo.get_all(1)
+    assert {"age", "music_artists"} == {r["predicate"] for r in rows}
+    assert len(rows) == 2
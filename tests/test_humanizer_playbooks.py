@@ -0,0 +1,71 @@
+import os
+import shutil
+
+import pytest
+# mypy: ignore-errors
+
+from dialogue.humanizer import Humanizer
+from dialogue.playbooks import DEFAULT_PLAYBOOKS_PATH, PlaybookError, PlaybookWatcher, load_playbooks
+from domain.reasoning.models import DialoguePlan
+
+
+def _plan(intent, variation=1):
+    return DialoguePlan(
+        intent=intent, tone="warm", emotion="curious", register="casual", response_length="medium",
+        follow_up_strategy="adaptive", style_mods={"variation": variation},
+    )
+
+
+def _realize(humanizer, intent, variation=1):
+    return humanizer.realize(
+        _plan(intent, variation), persona={"identity": {"name": "Ая"}}, memory_facts=(), world={}, user_profile={}
+    )
+
+
+def _write(path, text):
+    path.write_text(text, encoding="utf-8")
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+
+
+def test_templates_compiled_once(monkeypatch):
+    humanizer = Humanizer()
+    playbooks = load_playbooks(DEFAULT_PLAYBOOKS_PATH)
+    assert len(humanizer.registry.templates) == sum(len(v) for v in playbooks.values())
+
+    def fail(*_args, **_kwargs):
+        raise AssertionError("template compiled on the hot path")
+
+    monkeypatch.setattr(humanizer.env, "from_string", fail)
+    assert _realize(humanizer, "greeting").startswith("Привет! Я Ая.")
+    assert _realize(humanizer, "no_such_intent") == "Мне интересно, что у тебя происходит. Расскажи?"
+    for _ in range(20):
+        assert _realize(humanizer, "sos", variation=2)
+
+
+@pytest.mark.asyncio
+async def test_hot_reload_and_rejected_file(tmp_path):
+    path = tmp_path / "playbooks.yml"
+    shutil.copy(DEFAULT_PLAYBOOKS_PATH, path)
+    humanizer = Humanizer(path)
+    watcher = PlaybookWatcher(humanizer)
+    assert await watcher.check_once() is False
+
+    _write(path, path.read_text(encoding="utf-8").replace("Привет{{ user_name_hint }}!", "Хай{{ user_name_hint }}!"))
+    assert await watcher.check_once() is True
+    assert humanizer.registry.version == 2
+    assert _realize(humanizer, "greeting").startswith("Хай!")
+
+    _write(path, 'greeting:\n  - "{{ broken"\ndefault:\n  - "ок"\n')
+    assert await watcher.check_once() is False
+    assert watcher.failures == 1
+    assert humanizer.load_errors and "greeting[0]" in humanizer.load_errors[0]
+    assert _realize(humanizer, "greeting").startswith("Хай!")
+
+
+def test_playbook_validation(tmp_path):
+    path = tmp_path / "playbooks.yml"
+    path.write_text("greeting: []\n", encoding="utf-8")
+    with pytest.raises(PlaybookError) as exc:
+        load_playbooks(path)
+    assert len(exc.value.errors) == 2
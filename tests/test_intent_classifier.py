@@ -0,0 +1,41 @@
+import pytest
+# mypy: ignore-errors
+
+from domain.reasoning.intent_classifier import IntentMatcher, _IntentRule, classify_batch, classify_intent
+
+
+@pytest.mark.parametrize(
+    "text,intent",
+    [
+        ("Привет! мне плохо", "sos"),
+        ("какая погода? и который час", "weather"),
+        ("сколько сейчас времени", "time"),
+        ("какое число", "date"),
+        ("что ты помнишь обо мне?", "memory_query"),
+        ("добромантика", "flirt"),
+        ("куда сходить", "plan"),
+        ("какие новости про метро?", "news"),
+        ("Доброе утро", "greeting"),
+        ("спокойной ночи", "farewell"),
+        ("сейчас приду", "smalltalk"),
+        ("ок", "smalltalk"),
+        ("", "unknown"),
+    ],
+)
+def test_priority_order(text, intent) -> None:
+    assert classify_intent(text).intent == intent
+
+
+def test_overlapping_keyword_is_not_hidden() -> None:
+    import re
+
+    rules = (
+        _IntentRule("sos", 0.9, re.compile("bc"), ("bc",)),
+        _IntentRule("plan", 0.6, re.compile("ab"), ("ab",)),
+    )
+    assert IntentMatcher(rules).match("abc").intent == "sos"
+
+
+def test_batch_matches_single() -> None:
+    texts = ["привет", "", "какая погода", "давай флирт", "что делать"]
+    assert classify_batch(texts) == [classify_intent(t) for t in texts]
@@ -0,0 +1,107 @@
+import pytest
+# mypy: ignore-errors
+
+from services.llm_cache import CachedLLM, CompletionCache, plan_is_cacheable
+
+
+class CountingLLM:
+    def __init__(self) -> None:
+        self.calls = 0
+
+    async def chat(self, messages, model: str = ""):
+        self.calls += 1
+        return {"role": "assistant", "content": f"reply {self.calls}"}
+
+
+@pytest.mark.asyncio
+async def test_cache_hits_on_normalized_prompt() -> None:
+    llm = CachedLLM(CountingLLM(), CompletionCache(max_entries=4))
+    first = await llm.chat([{"role": "user", "content": "Какая  погода?"}], world_version=1)
+    second = await llm.chat([{"role": "user", "content": " какая погода? "}], world_version=1)
+    assert first == second
+    assert llm.llm.calls == 1
+    assert llm.metrics.hit_rate == 0.5
+
+
+@pytest.mark.asyncio
+async def test_world_version_change_expires_entry(db) -> None:
+    llm = CachedLLM(CountingLLM(), CompletionCache(db=db))
+    messages = [{"role": "user", "content": "который час"}]
+    await llm.chat(messages, world_version=1)
+    await llm.chat(messages, world_version=2)
+    assert llm.llm.calls == 2
+    assert llm.metrics.expired == 1
+
+    restarted = CachedLLM(CountingLLM(), CompletionCache(db=db))
+    reply = await restarted.chat(messages, world_version=2)
+    assert reply["content"] == "reply 2"
+    assert restarted.llm.calls == 0
+
+
+@pytest.mark.asyncio
+async def test_sensitive_plan_bypasses_cache(brain) -> None:
+    plan = brain.decision_engine.plan(_ctx(brain, "sos"))
+    assert not plan_is_cacheable(plan)
+    assert plan_is_cacheable(brain.decision_engine.plan(_ctx(brain, "weather")))
+
+    llm = CachedLLM(CountingLLM(), CompletionCache())
+    messages = [{"role": "user", "content": "мне плохо"}]
+    await llm.chat(messages, cacheable=plan_is_cacheable(plan))
+    await llm.chat(messages, cacheable=plan_is_cacheable(plan))
+    assert llm.llm.calls == 2
+    assert llm.metrics.bypassed == 2
+
+
+@pytest.mark.asyncio
+async def test_ttl_expires_entry(db) -> None:
+    llm = CachedLLM(CountingLLM(), CompletionCache(db=db, ttl_sec=-1))
+    await llm.chat([{"role": "user", "content": "который час"}])
+    await llm.chat([{"role": "user", "content": "который час"}])
+    assert llm.llm.calls == 2
+    assert llm.metrics.expired == 1
+
+
+@pytest.mark.asyncio
+async def test_brain_replies_through_the_cache(brain) -> None:
+    llm = CachedLLM(CountingLLM(), CompletionCache())
+    brain.llm, brain.llm_replies = llm, True
+    first = await brain.respond(1, "Какая погода?")
+    again = await brain.respond(2, "какая  погода?")
+    assert first.text == again.text == "reply 1"
+    assert llm.llm.calls == 1
+
+    await brain.respond(3, "мне плохо, помоги")
+    await brain.respond(3, "мне плохо, помоги")
+    assert llm.metrics.bypassed == 2 and llm.llm.calls == 3
+
+
+@pytest.mark.asyncio
+async def test_brain_keeps_the_template_reply_when_the_llm_fails(brain) -> None:
+    class BrokenLLM:
+        async def chat(self, messages, model: str = ""):
+            raise RuntimeError("upstream down")
+
+    plan = brain.decision_engine.plan(_ctx(brain, "time"))
+    brain.llm, brain.llm_replies = BrokenLLM(), True
+    assert await brain._llm_reply(plan, "который час?", "черновик", {}, None) == "черновик"
+
+def _ctx(brain, intent):
+    from domain.reasoning.models import ReasoningContext
+
+    return ReasoningContext(
+        user_message="",
+        persona={},
+        world_state={},
+        memory_facts=(),
+        chat_history=(),
+        intent=intent,
+        user_emotion="neutral",
+        affinity=0,
+        closeness=0,
+        adult_confirmed=False,
+        flirt_level="off",
+        persona_traits=(),
+        memory_tags=(),
+        time_of_day="day",
+        weather_condition="clear",
+    )
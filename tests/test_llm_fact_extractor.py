@@ -0,0 +1,127 @@
+import asyncio
+import json
+import sqlite3
+
+import pytest
+# mypy: ignore-errors
+
+from memory.facts_repo import FactsRepo
+from services.llm_fact_extractor import LLMFactExtractor
+
+
+class StubLLM:
+    """Локальная заглушка: отвечает фактами по ключевым словам, считает вызовы."""
+
+    def __init__(self, content=None):
+        self.calls = []
+        self.content = content
+
+    async def chat(self, messages, model="deepseek-chat", *, response_format=None):
+        self.calls.append((messages, response_format))
+        if self.content is not None:
+            return {"role": "assistant", "content": self.content}
+        batch = json.loads(messages[-1]["content"])["messages"]
+        facts = []
+        for m in batch:
+            if "кошка" in m["text"]:
+                facts.append({"i": m["i"], "predicate": "pets", "object": "кошка", "confidence": 0.9})
+            if "работаю" in m["text"]:
+                facts.append({"i": m["i"], "predicate": "work place", "object": "аптека", "confidence": 0.3})
+        facts.append({"i": 99, "predicate": "bogus", "object": "x", "confidence": 1})
+        return {
+            "role": "assistant",
+            "content": json.dumps({"facts": facts}, ensure_ascii=False),
+            "usage": {"prompt_tokens": 1000, "completion_tokens": 200},
+        }
+
+
+@pytest.mark.asyncio
+async def test_batch_is_one_call_with_thresholds(memory_stack) -> None:
+    memory_repo, chat_history, facts_repo, memory_manager = memory_stack
+    llm = StubLLM()
+    extractor = LLMFactExtractor(llm, facts_repo, batch_size=3, flush_interval_sec=60)
+    memory_manager.llm_extractor = extractor
+    await memory_manager.store_user_message(5, "у меня дома живёт кошка Муся")
+    await memory_manager.store_user_message(6, "я работаю в аптеке у дома")
+    await memory_manager.store_user_message(6, "ок")
+    assert extractor.pending == 2
+    assert await extractor.flush() == 1
+    assert len(llm.calls) == 1 and llm.calls[0][1] == {"type": "json_object"}
+    assert [(r["predicate"], r["object"]) for r in await facts_repo.get_all(5)] == [("pets", "кошка")]
+    assert await facts_repo.get_all(6) == []
+    snap = extractor.metrics.snapshot()
+    assert snap["facts_rejected"] == 2 and snap["messages"] == 2
+    assert snap["cost_usd"] == pytest.approx((1000 * 0.27 + 200 * 1.10) / 1e6)
+
+
+@pytest.mark.asyncio
+async def test_background_flush_on_size_and_bad_json(db) -> None:
+    llm = StubLLM(content="извините, не могу")
+    extractor = LLMFactExtractor(llm, FactsRepo(db), batch_size=2, flush_interval_sec=60)
+    extractor.start()
+    extractor.submit(1, "у меня есть кошка и собака")
+    extractor.submit(1, "работаю программистом давно")
+    for _ in range(50):
+        if llm.calls:
+            break
+        await asyncio.sleep(0.01)
+    await extractor.stop()
+    assert len(llm.calls) == 1
+    assert extractor.metrics.parse_errors == 1
+    assert extractor.pending == 0
+
+
+class LockedOnceRepo:
+    def __init__(self, repo):
+        self.repo = repo
+        self.failures = 1
+
+    async def upsert_many(self, tg_user_id, rows, source_msg_id=None):
+        if self.failures:
+            self.failures -= 1
+            raise sqlite3.OperationalError("database is locked")
+        await self.repo.upsert_many(tg_user_id, rows, source_msg_id=source_msg_id)
+
+
+@pytest.mark.asyncio
+async def test_background_task_survives_a_db_error(db) -> None:
+    facts_repo = FactsRepo(db)
+    llm = StubLLM()
+    extractor = LLMFactExtractor(llm, LockedOnceRepo(facts_repo), batch_size=1, flush_interval_sec=60)
+    extractor.start()
+    extractor.submit(1, "у меня дома живёт кошка Муся")
+    await _until(lambda: len(llm.calls) == 1)
+    extractor.submit(2, "а у меня тоже кошка есть")
+    await _until(lambda: extractor.metrics.facts_accepted == 1)
+    assert not extractor._task.done()
+    await extractor.stop()
+    assert [r["object"] for r in await facts_repo.get_all(2)] == ["кошка"]
+
+
+@pytest.mark.asyncio
+async def test_stop_lets_the_in_flight_batch_finish(db) -> None:
+    facts_repo = FactsRepo(db)
+    gate = asyncio.Event()
+
+    class SlowLLM(StubLLM):
+        async def chat(self, messages, model="deepseek-chat", *, response_format=None):
+            await gate.wait()
+            return await super().chat(messages, model, response_format=response_format)
+
+    extractor = LLMFactExtractor(SlowLLM(), facts_repo, batch_size=1, flush_interval_sec=60)
+    extractor.start()
+    extractor.submit(3, "у меня дома живёт кошка Муся")
+    await _until(lambda: extractor.pending == 0)
+    stopping = asyncio.create_task(extractor.stop())
+    await asyncio.sleep(0.05)
+    gate.set()
+    await stopping
+    assert [r["object"] for r in await facts_repo.get_all(3)] == ["кошка"]
+
+
+async def _until(predicate):
+    for _ in range(200):
+        if predicate():
+            return
+        await asyncio.sleep(0.01)
+    raise AssertionError("timed out")
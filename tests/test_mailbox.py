@@ -0,0 +1,90 @@
+import asyncio
+
+# mypy: ignore-errors
+
+from orchestrator.mailbox import UserMailboxes
+
+
+class Recorder:
+    def __init__(self, delay=0.01):
+        self.delay = delay
+        self.calls = []
+        self.running = {}
+        self.overlaps = 0
+
+    async def respond(self, tg_user_id, text):
+        self.running[tg_user_id] = self.running.get(tg_user_id, 0) + 1
+        if self.running[tg_user_id] > 1:
+            self.overlaps += 1
+        await asyncio.sleep(self.delay)
+        self.calls.append((tg_user_id, text))
+        self.running[tg_user_id] -= 1
+        return f"re:{text}"
+
+
+async def test_turns_for_one_user_are_serialized_in_order():
+    rec = Recorder()
+    boxes = UserMailboxes(rec.respond)
+    replies = await asyncio.gather(*(boxes.submit(1, f"m{i}") for i in range(5)), boxes.submit(2, "other"))
+    assert replies == [f"re:m{i}" for i in range(5)] + ["re:other"]
+    assert [text for uid, text in rec.calls if uid == 1] == [f"m{i}" for i in range(5)]
+    assert rec.overlaps == 0
+    await boxes.stop()
+
+
+async def test_burst_is_coalesced_into_one_reply():
+    rec = Recorder(delay=0)
+    boxes = UserMailboxes(rec.respond, coalesce_window_sec=0.05, max_batch=5)
+    replies = await asyncio.gather(*(boxes.submit(7, t) for t in ("привет", "как ты", "что делаешь")))
+    assert replies == [None, None, "re:привет\nкак ты\nчто делаешь"]
+    assert rec.calls == [(7, "привет\nкак ты\nчто делаешь")]
+    assert boxes.snapshot()["coalesced"] == 2
+    await boxes.stop()
+
+
+async def test_idle_mailbox_is_collected():
+    boxes = UserMailboxes(Recorder(delay=0).respond, idle_ttl_sec=0.02)
+    assert await boxes.submit(3, "hi") == "re:hi"
+    assert len(boxes) == 1
+    await asyncio.sleep(0.08)
+    assert len(boxes) == 0
+    assert boxes.metrics.collected == 1
+    assert await boxes.submit(3, "again") == "re:again"
+    await boxes.stop()
+
+
+async def test_global_cap_limits_concurrent_turns():
+    boxes = UserMailboxes(Recorder(delay=0.02).respond, max_active=3)
+    await asyncio.gather(*(boxes.submit(uid, "x") for uid in range(10)))
+    assert boxes.metrics.peak_active == 3
+    await boxes.stop()
+
+
+async def test_failure_reaches_only_the_last_coalesced_sender_and_worker_survives():
+    async def respond(tg_user_id, text):
+        if text.startswith("boom"):
+            raise RuntimeError("brain down")
+        return text
+
+    boxes = UserMailboxes(respond, coalesce_window_sec=0.02)
+    results = await asyncio.gather(boxes.submit(1, "boom"), boxes.submit(1, "tail"), return_exceptions=True)
+    assert results[0] is None and isinstance(results[1], RuntimeError)
+    assert await boxes.submit(1, "ok") == "ok"
+    assert boxes.metrics.failed == 1
+    await boxes.stop()
+
+
+async def test_stop_lets_running_and_queued_turns_finish():
+    rec = Recorder(delay=0.03)
+    boxes = UserMailboxes(rec.respond)
+    senders = [asyncio.create_task(boxes.submit(1, f"m{i}")) for i in range(2)]
+    await asyncio.sleep(0.01)
+    await boxes.stop()
+    assert [await s for s in senders] == ["re:m0", "re:m1"]
+
+    stuck = UserMailboxes(Recorder(delay=1).respond)
+    sender = asyncio.create_task(stuck.submit(1, "slow"))
+    await asyncio.sleep(0.01)
+    await stuck.stop(grace_sec=0.05)
+    (result,) = await asyncio.gather(sender, return_exceptions=True)
+    assert isinstance(result, asyncio.CancelledError)
@@ -0,0 +1,151 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+import pytest_asyncio
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+# mypy: ignore-errors
+
+from adapters.news.feed import NewsFeedClient, NewsItem, normalize_title, title_hash
+from adapters.news.ingest import NewsIngestor
+from adapters.news.store import NewsStore
+
+
+def _article(title: str, minutes_ago: int, description: str = "") -> dict:
+    ts = datetime.now(timezone.utc) - timedelta(minutes=minutes_ago)
+    return {
+        "source": {"id": None, "name": "Фонтанка"},
+        "title": title,
+        "description": description,
+        "url": f"https://example.org/{abs(hash(title))}",
+        "publishedAt": ts.strftime("%Y-%m-%dT%H:%M:%SZ"),
+    }
+
+
+@pytest_asyncio.fixture
+async def feed_server():
+    state = {
+        "etag": '"v1"',
+        "articles": [
+            _article("В Петербурге ожидается сильный дождь - Фонтанка", 30, "Синоптики обещают ливни"),
+            _article("Метро откроет новую станцию", 20),
+        ],
+        "requests": [],
+    }
+
+    async def headlines(request: web.Request) -> web.Response:
+        state["requests"].append((dict(request.query), request.headers.get("If-None-Match")))
+        if request.headers.get("If-None-Match") == state["etag"]:
+            return web.Response(status=304)
+        size, page = int(request.query.get("pageSize", 20)), int(request.query.get("page", 1))
+        articles = state["articles"][(page - 1) * size : page * size]
+        return web.json_response(
+            {"status": "ok", "totalResults": len(state["articles"]), "articles": articles},
+            headers={"ETag": state["etag"]},
+        )
+
+    app = web.Application()
+    app.router.add_get("/v2/top-headlines", headlines)
+    server = TestServer(app)
+    await server.start_server()
+    server.state = state
+    yield server
+    await server.close()
+
+
+def test_normalize_title_drops_source_suffix() -> None:
+    assert normalize_title("Метро откроет новую станцию — РБК") == normalize_title("метро откроет новую станцию!")
+
+
+@pytest.mark.asyncio
+async def test_incremental_ingest_with_dedupe(feed_server, db) -> None:
+    client = NewsFeedClient("key", base_url=str(feed_server.make_url("/v2")))
+    store = NewsStore(db)
+    ingestor = NewsIngestor(client, store, batch_size=1, batch_pause_sec=0)
+
+    assert await ingestor.poll_once() == 2
+    assert await ingestor.poll_once() == 0
+    assert feed_server.state["requests"][-1][1] == '"v1"'
+
+    feed_server.state["etag"] = '"v2"'
+    feed_server.state["articles"] = [
+        _article("Метро откроет новую станцию - РБК", 15),
+        _article("Белые ночи: гид по разводным мостам", 5),
+    ]
+    assert await ingestor.poll_once() == 1
+    query, _ = feed_server.state["requests"][-1]
+    assert "from" not in query and query["page"] == "1"
+    etag, since = await store.get_cursor("top-headlines")
+    assert etag == '"v2"' and datetime.fromisoformat(since) > datetime.now(timezone.utc) - timedelta(minutes=6)
+
+    newest = await store.top_recent(limit=2)
+    assert [row["title"] for row in newest][0].startswith("Белые ночи")
+    rainy = await store.top_recent("погоды дождь", limit=5)
+    assert len(rainy) == 1 and "дождь" in rainy[0]["title"]
+    await client.aclose()
+
+
+@pytest.mark.asyncio
+async def test_fetch_pages_until_the_cursor(feed_server, db) -> None:
+    client = NewsFeedClient("key", base_url=str(feed_server.make_url("/v2")), page_size=2)
+    store = NewsStore(db)
+    ingestor = NewsIngestor(client, store, batch_pause_sec=0)
+    assert await ingestor.poll_once() == 2
+
+    feed_server.state["etag"] = '"v2"'
+    feed_server.state["articles"] = [
+        _article("Разводка Дворцового моста перенесена", 3),
+        _article("Белые ночи: гид по разводным мостам", 5),
+        _article("В Эрмитаже открылась новая выставка", 10),
+        _article("Метро откроет новую станцию", 20),
+        _article("В Петербурге ожидается сильный дождь", 30),
+        _article("Старая новость про корюшку", 90),
+    ]
+    feed_server.state["requests"].clear()
+    assert await ingestor.poll_once() == 3
+    # page 2 already reaches the stored cursor, page 3 is never requested
+    assert [query["page"] for query, _ in feed_server.state["requests"]] == ["1", "2"]
+    await client.aclose()
+
+
+@pytest.mark.asyncio
+async def test_capped_poll_stores_the_oldest_and_picks_up_the_rest(feed_server, db) -> None:
+    feed_server.state["articles"] = [
+        _article("Разводка Дворцового моста перенесена", 3),
+        _article("Белые ночи: гид по разводным мостам", 5),
+        _article("В Эрмитаже открылась новая выставка", 10),
+        _article("Метро откроет новую станцию", 20),
+    ]
+    client = NewsFeedClient("key", base_url=str(feed_server.make_url("/v2")))
+    store = NewsStore(db)
+    ingestor = NewsIngestor(client, store, batch_pause_sec=0, max_items_per_poll=3)
+
+    assert await ingestor.poll_once() == 3
+    etag, since = await store.get_cursor("top-headlines")
+    assert etag is None and datetime.fromisoformat(since) < datetime.now(timezone.utc) - timedelta(minutes=4)
+    # the unchanged feed is fetched again, not answered with 304, and the newest item lands
+    assert await ingestor.poll_once() == 1
+    assert feed_server.state["requests"][-1][1] is None
+    newest = await store.top_recent(limit=1)
+    assert newest[0]["title"] == "Разводка Дворцового моста перенесена"
+    assert await ingestor.poll_once() == 0
+    await client.aclose()
+
+
+@pytest.mark.asyncio
+async def test_brain_answers_a_news_question_from_the_store(brain, db) -> None:
+    store = NewsStore(db)
+    now = datetime.now(timezone.utc).timestamp()
+    await store.insert_batch(
+        [
+            NewsItem(title, "https://example.org/" + str(n), "Фонтанка", "", now - n * 60, title_hash(title))
+            for n, title in enumerate(["Метро откроет новую станцию", "В Эрмитаже открылась новая выставка"])
+        ]
+    )
+    brain.news = store
+
+    response = await brain.respond(1, "Какие новости про метро?")
+    assert "«Метро откроет новую станцию»" in response.text
+    assert "Эрмитаже" not in response.text
+    response = await brain.respond(1, "что в новостях?")
+    assert "Эрмитаже" in response.text
@@ -0,0 +1,147 @@
+import asyncio
+import time
+from types import SimpleNamespace
+
+import pytest
+from aiogram.exceptions import TelegramRetryAfter
+from aiogram.methods import SendMessage
+# mypy: ignore-errors
+
+from adapters.telegram.outbox import OutboxClosed, OutboxFull, Priority, SendScheduler
+from bot.routers.basic import all_text
+
+
+class FakeBot:
+    """Records send_message calls; ``flood`` maps chat_id -> retry_after for its next call."""
+
+    def __init__(self):
+        self.sent = []
+        self.flood = {}
+        self.broken = set()
+
+    async def send_message(self, chat_id, text, **kwargs):
+        await asyncio.sleep(0)
+        retry_after = self.flood.pop(chat_id, None)
+        if retry_after is not None:
+            raise TelegramRetryAfter(SendMessage(chat_id=chat_id, text=text), "Flood control exceeded", retry_after)
+        if chat_id in self.broken:
+            raise RuntimeError("chat not found")
+        self.sent.append((time.monotonic(), chat_id, text))
+        return {"chat_id": chat_id, "text": text}
+
+
+async def test_global_bucket_caps_throughput():
+    bot = FakeBot()
+    outbox = SendScheduler(bot, global_rate=50, burst=1, chat_interval_sec=0)
+    t0 = time.monotonic()
+    for chat_id in range(20):
+        outbox.submit(chat_id, "hi")
+    await outbox.stop(drain=True)
+    assert len(bot.sent) == 20
+    assert time.monotonic() - t0 >= 19 / 50 * 0.9
+
+
+async def test_chat_pacing_keeps_order_and_does_not_block_other_chats():
+    bot = FakeBot()
+    outbox = SendScheduler(bot, global_rate=1000, burst=100, chat_interval_sec=0.05)
+    for i in range(4):
+        outbox.submit(1, f"m{i}")
+    outbox.submit(2, "other")
+    await outbox.stop(drain=True)
+    chat1 = [(at, text) for at, chat, text in bot.sent if chat == 1]
+    assert [text for _, text in chat1] == ["m0", "m1", "m2", "m3"]
+    gaps = [b[0] - a[0] for a, b in zip(chat1[:-1], chat1[1:], strict=True)]
+    assert min(gaps) >= 0.045
+    assert [chat for _, chat, _ in bot.sent].index(2) <= 1
+
+
+async def test_retry_after_parks_only_the_affected_chat():
+    bot = FakeBot()
+    bot.flood[1] = 1
+    outbox = SendScheduler(bot, global_rate=1000, burst=100, chat_interval_sec=0)
+    t0 = time.monotonic()
+    reply = asyncio.create_task(outbox.send(1, "parked"))
+    await asyncio.sleep(0.05)
+    for i in range(3):
+        assert await outbox.send(2, f"free{i}") == {"chat_id": 2, "text": f"free{i}"}
+    assert time.monotonic() - t0 < 0.5
+    assert outbox.snapshot()["parked_chats"] == 1
+    assert await reply == {"chat_id": 1, "text": "parked"}
+    assert time.monotonic() - t0 >= 1.0
+    snap = outbox.snapshot()
+    assert (snap["sent"], snap["retry_after"], snap["depth"]) == (4, 1, 0)
+    await outbox.stop()
+
+
+async def test_replies_overtake_broadcasts():
+    bot = FakeBot()
+    outbox = SendScheduler(bot, global_rate=100, burst=1, chat_interval_sec=0)
+    for chat_id in range(10, 15):
+        outbox.submit(chat_id, "news", priority=Priority.BROADCAST)
+    outbox.submit(10, "reply")
+    outbox.submit(1, "reply")
+    assert outbox.snapshot()["depth_by_priority"] == {"reply": 2, "proactive": 0, "broadcast": 5}
+    await outbox.stop(drain=True)
+    texts = [(chat, text) for _, chat, text in bot.sent]
+    assert texts[:2] == [(10, "reply"), (1, "reply")]
+    assert len(texts) == 7
+
+
+async def test_queue_limit_rejects_broadcasts_but_not_replies_and_errors_propagate():
+    bot = FakeBot()
+    bot.broken.add(5)
+    outbox = SendScheduler(bot, max_queue=2, chat_interval_sec=0)
+    outbox.submit(1, "a", priority=Priority.PROACTIVE)
+    outbox.submit(2, "b", priority=Priority.PROACTIVE)
+    with pytest.raises(OutboxFull):
+        outbox.submit(3, "c", priority=Priority.BROADCAST)
+    with pytest.raises(RuntimeError):
+        await outbox.send(5, "reply goes through the queue anyway")
+    await outbox.stop(drain=True)
+    snap = outbox.snapshot()
+    assert (snap["sent"], snap["failed"], snap["rejected_full"]) == (2, 1, 1)
+
+
+class FakeMessage:
+    def __init__(self, chat_id, text):
+        self.chat = SimpleNamespace(id=chat_id)
+        self.text = text
+        self.answers = []
+
+    async def answer(self, text):
+        self.answers.append(text)
+
+
+class EchoBrain:
+    async def respond(self, tg_user_id, text):
+        return SimpleNamespace(text=f"re: {text}")
+
+
+async def test_reply_handler_answers_directly_only_when_nothing_reached_telegram():
+    bot = FakeBot()
+    bot.broken.add(5)
+    outbox = SendScheduler(bot, chat_interval_sec=0)
+    ok, broken = FakeMessage(1, "привет"), FakeMessage(5, "ты тут?")
+    await all_text(ok, EchoBrain(), tg_user_id=1, outbox=outbox)
+    assert [text for _, _, text in bot.sent] == ["re: привет"] and ok.answers == []
+    # the send may have reached Telegram: no second copy, the error handler gets it
+    with pytest.raises(RuntimeError):
+        await all_text(broken, EchoBrain(), tg_user_id=5, outbox=outbox)
+    assert broken.answers == []
+    await outbox.stop(drain=True)
+    assert outbox.snapshot()["failed"] == 1
+
+    late = FakeMessage(2, "ещё тут?")
+    await all_text(late, EchoBrain(), tg_user_id=2, outbox=outbox)
+    assert late.answers == ["re: ещё тут?"]
+
+
+async def test_stop_fails_queued_sends_with_outbox_closed():
+    bot = FakeBot()
+    outbox = SendScheduler(bot, global_rate=1, burst=1, chat_interval_sec=0)
+    first = asyncio.create_task(outbox.send(1, "a"))
+    queued = asyncio.create_task(outbox.send(2, "b"))
+    await first
+    await outbox.stop(drain=False)
+    with pytest.raises(OutboxClosed):
+        await queued
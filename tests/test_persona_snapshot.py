@@ -0,0 +1,59 @@
+import os
+import shutil
+from pathlib import Path
+
+import pytest
+# mypy: ignore-errors
+
+from domain.persona.service import PersonaService
+
+PERSONA = Path(__file__).resolve().parents[1] / "persona"
+
+
+def _copy(tmp_path):
+    base = tmp_path / "persona"
+    shutil.copytree(PERSONA, base)
+    return base
+
+
+def _touch(path):
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+
+
+def test_hot_path_does_no_filesystem_work(tmp_path, monkeypatch):
+    service = PersonaService(str(_copy(tmp_path)))
+    traits = service.traits()
+    assert "Санкт-Петербург" in traits and isinstance(traits, tuple)
+
+    def forbidden(*_args, **_kwargs):
+        raise AssertionError("filesystem access on the turn path")
+
+    monkeypatch.setattr(Path, "stat", forbidden)
+    monkeypatch.setattr(Path, "read_text", forbidden)
+    monkeypatch.setattr(Path, "exists", forbidden)
+    for _ in range(3):
+        assert service.data()["identity"]["name"] == "Ая"
+        assert service.traits() is traits
+        assert "Ая" in service.render_system_prompt({"weather": {}}, {}, {"topic": ""})
+
+
+@pytest.mark.asyncio
+async def test_snapshot_refreshed_only_when_files_change(tmp_path):
+    base = _copy(tmp_path)
+    service = PersonaService(str(base))
+    first = service.snapshot
+    assert await service.check_once() is False
+    assert service.snapshot is first
+
+    persona_path = base / "persona.yml"
+    persona_path.write_text(persona_path.read_text(encoding="utf-8").replace("Санкт-Петербург", "Казань"), encoding="utf-8")
+    _touch(persona_path)
+    assert await service.check_once() is True
+    assert service.snapshot.version == first.version + 1
+    assert "Казань" in service.traits() and "Санкт-Петербург" in first.traits
+
+    persona_path.write_text("identity: [broken", encoding="utf-8")
+    _touch(persona_path)
+    assert await service.check_once() is False
+    assert "Казань" in service.traits()
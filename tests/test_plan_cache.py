@@ -0,0 +1,50 @@
+import pytest
+# mypy: ignore-errors
+
+from domain.policies.models import PolicyBundle, PolicyCondition, PolicyEffect, PolicyRule
+from domain.reasoning.decision_engine import DecisionEngine
+from domain.reasoning.models import ReasoningContext
+
+
+def _ctx(**overrides):
+    base = dict(
+        user_message="привет", persona={}, world_state={}, memory_facts=(), chat_history=(),
+        intent="greeting", user_emotion="neutral", affinity=0, closeness=0, adult_confirmed=False,
+        flirt_level="off", persona_traits=("warm", "calm"), memory_tags=("age",),
+        time_of_day="day", weather_condition="unknown",
+    )
+    base.update(overrides)
+    return ReasoningContext(**base)
+
+
+def _bundle(tone):
+    rule = PolicyRule("greet", "", 10, PolicyCondition(intents=["greeting"]), PolicyEffect(tone=tone, content_goals=["welcome"]))
+    return PolicyBundle(content=[rule], style=[], safety=[])
+
+
+def test_cached_plans_are_copies_and_counted() -> None:
+    engine = DecisionEngine(_bundle("warm"))
+    first = engine.plan(_ctx())
+    first.content_goals.append("corrupted")
+    first.style_mods["x"] = 1
+    second = engine.plan(_ctx(user_message="другой текст", persona_traits=("calm", "warm")))
+    assert "corrupted" not in second.content_goals and "x" not in second.style_mods
+    assert engine.plan_cache.metrics.hits == 1 and engine.plan_cache.metrics.misses == 1
+    engine.plan(_ctx(affinity=3))
+    assert engine.plan_cache.metrics.hit_rate == pytest.approx(1 / 3)
+
+
+def test_reload_invalidates() -> None:
+    engine = DecisionEngine(_bundle("warm"))
+    assert engine.plan(_ctx()).tone == "warm"
+    engine.load(_bundle("playful"))
+    assert engine.plan(_ctx()).tone == "playful"
+    assert len(engine.plan_cache) == 1
+
+
+def test_lru_bound() -> None:
+    engine = DecisionEngine(_bundle("warm"), plan_cache_size=2)
+    for affinity in range(4):
+        engine.plan(_ctx(affinity=affinity))
+    assert len(engine.plan_cache) == 2
+    assert engine.plan_cache.metrics.evictions == 2
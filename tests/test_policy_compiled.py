@@ -0,0 +1,63 @@
+import random
+# mypy: ignore-errors
+
+from domain.policies.compiled import compile_rules, flatten_effect
+from domain.policies.models import PolicyBundle, PolicyCondition, PolicyEffect, PolicyRule
+from domain.reasoning.decision_engine import DecisionEngine
+from domain.reasoning.models import ReasoningContext
+
+INTENTS = ["smalltalk", "greeting", "weather", "flirt", "sos"]
+
+
+def _rules(rng, n):
+    rules = []
+    for i in range(n):
+        when = {}
+        if rng.random() < 0.7:
+            when["intents"] = rng.sample(INTENTS, rng.randint(1, 2))
+        if rng.random() < 0.3:
+            when["min_affinity"] = rng.randint(0, 3)
+        if rng.random() < 0.3:
+            when["memory_tags"] = ["age"]
+        if rng.random() < 0.2:
+            when["persona_traits"] = ["warm"]
+        if rng.random() < 0.2:
+            when["only_when_not_adult"] = True
+        effect = PolicyEffect(tone=rng.choice(["a", "b", None]), content_goals=[f"g{rng.randint(0, 4)}"])
+        rules.append(PolicyRule(f"r{i}", "", rng.randint(0, 50), PolicyCondition(**when), effect))
+    return sorted(rules, key=lambda r: r.priority, reverse=True)
+
+
+def _ctx(rng):
+    return ReasoningContext(
+        user_message="", persona={}, world_state={}, memory_facts=(), chat_history=(),
+        intent=rng.choice(INTENTS + ["unknown"]), user_emotion="neutral", affinity=rng.randint(0, 3),
+        closeness=0, adult_confirmed=rng.random() < 0.5, flirt_level="off",
+        persona_traits=rng.choice([(), ("warm",)]), memory_tags=rng.choice([(), ("age", "name")]),
+        time_of_day="day", weather_condition="unknown",
+    )
+
+
+def test_compiled_engine_matches_full_scan() -> None:
+    rng = random.Random(3)
+    rules = _rules(rng, 60)
+    engine = DecisionEngine(PolicyBundle(content=rules[:20], style=rules[20:40], safety=rules[40:]))
+    for _ in range(200):
+        ctx = _ctx(rng)
+        policy_ctx = ctx.as_policy_context()
+        expected = [r.id for bucket in (rules[:20], rules[20:40], rules[40:]) for r in bucket if r.applies_to(policy_ctx)]
+        plan = engine.plan(ctx)
+        assert plan.applied_rules == expected
+        goals = {g for r in rules if r.id in expected for g in r.effect.content_goals}
+        assert set(plan.content_goals) == goals | {"acknowledge_user"}
+
+
+def test_intent_index_and_flat_effects() -> None:
+    rules = [
+        PolicyRule("any", "", 10, PolicyCondition(), PolicyEffect(tone="warm")),
+        PolicyRule("hi", "", 20, PolicyCondition(intents=["greeting"]), PolicyEffect(content_goals=["welcome"])),
+    ]
+    bucket = compile_rules(sorted(rules, key=lambda r: r.priority, reverse=True))
+    assert [r.id for r in bucket.candidates("greeting")] == ["hi", "any"]
+    assert [r.id for r in bucket.candidates("weather")] == ["any"]
+    assert flatten_effect(rules[1].effect) == (("content_goals", ("welcome",)),)
@@ -0,0 +1,64 @@
+import os
+import shutil
+from pathlib import Path
+
+import pytest
+# mypy: ignore-errors
+
+from domain.policies.loader import load_policy_bundle
+from domain.policies.watcher import PolicyWatcher
+from domain.reasoning.decision_engine import DecisionEngine
+from domain.reasoning.models import ReasoningContext
+
+POLICIES = Path(__file__).resolve().parents[1] / "policies"
+
+
+def _ctx():
+    return ReasoningContext(
+        user_message="привет", persona={}, world_state={}, memory_facts=(), chat_history=(),
+        intent="greeting", user_emotion="neutral", affinity=3, closeness=0, adult_confirmed=False,
+        flirt_level="off", persona_traits=(), memory_tags=(), time_of_day="day", weather_condition="unknown",
+    )
+
+
+def _rewrite(path: Path, old: str, new: str) -> None:
+    text = path.read_text(encoding="utf-8")
+    path.write_text(text.replace(old, new), encoding="utf-8")
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+
+
+@pytest.mark.asyncio
+async def test_reload_swaps_and_keeps_old_snapshot(tmp_path) -> None:
+    shutil.copytree(POLICIES, tmp_path / "policies")
+    base = tmp_path / "policies"
+    engine = DecisionEngine(load_policy_bundle(base))
+    watcher = PolicyWatcher(engine, base)
+    assert await watcher.check_once() is False
+    in_flight = engine.snapshot
+    assert engine.plan(_ctx()).response_length == "short"
+
+    _rewrite(base / "content_policies.yaml", 'response_length: "short"\n      follow_up: "ask_name"', 'response_length: "long"\n      follow_up: "ask_name"')
+    assert await watcher.check_once() is True
+    assert engine.version == in_flight.version + 1
+    assert engine.plan(_ctx()).response_length == "long"
+    assert engine._evaluate(in_flight, _ctx(), _ctx().as_policy_context()).response_length == "short"
+
+
+@pytest.mark.asyncio
+async def test_invalid_bundle_is_rejected(tmp_path) -> None:
+    shutil.copytree(POLICIES, tmp_path / "policies")
+    base = tmp_path / "policies"
+    engine = DecisionEngine(load_policy_bundle(base))
+    watcher = PolicyWatcher(engine, base)
+    version = engine.version
+
+    _rewrite(base / "style_policies.yaml", "id: rainy_day", "id: base_warm")
+    assert await watcher.check_once() is False
+    assert engine.version == version and watcher.failures == 1
+    assert any("duplicate id" in e for e in engine.load_errors)
+
+    _rewrite(base / "style_policies.yaml", "    when:\n      weather:", "    when:\n      weathr:")
+    assert await watcher.check_once() is False
+    assert engine.load_errors and "TypeError" in engine.load_errors[0]
+    assert engine.plan(_ctx()).response_length == "short"
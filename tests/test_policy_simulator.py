@@ -0,0 +1,105 @@
+import random
+from pathlib import Path
+
+import pytest
+# mypy: ignore-errors
+
+from domain.policies.loader import load_policy_bundle
+from domain.policies.models import PolicyBundle, PolicyCondition, PolicyEffect, PolicyRule
+from domain.policies.simulator import ContextSpace, PolicySimulator, main
+from domain.reasoning.decision_engine import DecisionEngine
+
+
+def _rule(rule_id, priority, effect, **when):
+    return PolicyRule(rule_id, "", priority, PolicyCondition(**when), effect)
+
+
+def _bundle():
+    style = [
+        _rule("base", 50, PolicyEffect(tone="warm")),
+        _rule("sad", 40, PolicyEffect(tone="supportive"), emotions=["sadness"]),
+        # applied before base, which always overwrites it
+        _rule("always_lost", 60, PolicyEffect(tone="warm")),
+        _rule("typo", 30, PolicyEffect(tone="cold"), intents=["greetings"]),
+        _rule("impossible", 20, PolicyEffect(tone="odd"), min_affinity=4, max_affinity=2),
+    ]
+    return PolicyBundle(content=[], style=sorted(style, key=lambda r: r.priority, reverse=True), safety=[])
+
+
+def test_reports_unreachable_shadowed_and_conflicts():
+    report = PolicySimulator(_bundle()).run()
+    assert report.evaluated == PolicySimulator(_bundle()).space.size
+    assert set(report.unreachable()) == {"typo", "impossible"}
+    assert "always_lost" in report.shadowed()
+    conflicts = {(c["rule"], c["overridden_by"]): c for c in report.conflicts()}
+    sad = conflicts[("base", "sad")]
+    assert sad["field"] == "tone" and sad["by_value"] == "supportive"
+    assert sad["example"]["user_emotion"] == "sadness"
+    # same value overridden is not a conflict
+    assert ("always_lost", "base") not in conflicts
+    assert report.fired[1] == report.evaluated
+
+
+def test_sampling_and_memory_tag_axis():
+    bundle = PolicyBundle(
+        content=[_rule("pets", 10, PolicyEffect(content_goals=["ask_pet"]), memory_tags=["pets"])], style=[], safety=[]
+    )
+    space = ContextSpace.for_bundle(bundle)
+    assert "pets" in space.memory_tags
+    report = PolicySimulator(bundle, space).run(sample=20000, batch_size=4096)
+    assert report.evaluated == 20000
+    assert report.as_dict()["coverage"]["pets"]["fired"] == pytest.approx(0.5, abs=0.02)
+
+
+def _random_rules(rng, n):
+    rules = []
+    for i in range(n):
+        when = {}
+        if rng.random() < 0.6:
+            when["intents"] = rng.sample(["smalltalk", "greeting", "weather", "flirt", "sos"], 2)
+        if rng.random() < 0.3:
+            when["min_affinity"] = rng.randint(0, 4)
+        if rng.random() < 0.3:
+            when["emotions"] = ["sadness", "anxiety"]
+        if rng.random() < 0.3:
+            when["memory_tags"] = ["age", "name"]
+        if rng.random() < 0.2:
+            when["persona_traits"] = ["warm"]
+        if rng.random() < 0.2:
+            when["only_when_not_adult"] = True
+        effect = PolicyEffect(tone=rng.choice(["a", "b", None]), follow_up=rng.choice(["x", None]))
+        rules.append(_rule(f"r{i}", rng.randint(0, 50), effect, **when))
+    return sorted(rules, key=lambda r: r.priority, reverse=True)
+
+
+@pytest.mark.parametrize("seed", [0, 1])
+def test_vectorized_masks_agree_with_engine(seed):
+    bundle = PolicyBundle(content=[], style=_random_rules(random.Random(seed), 40), safety=[])
+    space = ContextSpace.for_bundle(bundle)
+    assert space.persona_traits == ("warm",)
+    assert PolicySimulator(bundle, space).verify(DecisionEngine(bundle), n=300, seed=seed) == []
+
+
+def test_persona_trait_axis_enumerates_subsets():
+    bundle = PolicyBundle(
+        content=[], style=[_rule("both", 10, PolicyEffect(tone="warm"), persona_traits=["warm", "playful"])], safety=[]
+    )
+    report = PolicySimulator(bundle).run()
+    assert report.as_dict()["coverage"]["both"]["fired"] == pytest.approx(0.25)
+    assert report.unreachable() == []
+
+
+def test_shipped_policies_agree_with_engine():
+    bundle = load_policy_bundle(Path("policies"))
+    simulator = PolicySimulator(bundle)
+    assert simulator.verify(DecisionEngine(bundle), n=300) == []
+    assert simulator.run(sample=50000).unreachable() == []
+
+
+@pytest.mark.parametrize("name", sorted(p.name for p in Path("policies").glob("*.yaml")))
+def test_each_rule_file_agrees_with_engine(name, tmp_path, capsys):
+    for other in ("content_policies.yaml", "style_policies.yaml", "safety_policies.yaml"):
+        (tmp_path / other).write_text("", encoding="utf-8")
+    (tmp_path / name).write_text((Path("policies") / name).read_text(encoding="utf-8"), encoding="utf-8")
+    assert main([str(tmp_path), "--sample", "20000"]) == 0
+    assert "200/200 contexts agree" in capsys.readouterr().out
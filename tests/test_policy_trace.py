@@ -0,0 +1,58 @@
+import json
+
+# mypy: ignore-errors
+
+from domain.policies.models import PolicyBundle, PolicyCondition, PolicyEffect, PolicyRule
+from domain.reasoning.decision_engine import DecisionEngine
+from domain.reasoning.models import ReasoningContext
+from domain.reasoning.trace import TraceRing
+
+
+def _ctx(affinity=0):
+    return ReasoningContext(
+        user_message="", persona={}, world_state={}, memory_facts=(), chat_history=(),
+        intent="greeting", user_emotion="neutral", affinity=affinity, closeness=0, adult_confirmed=False,
+        flirt_level="off", persona_traits=(), memory_tags=(), time_of_day="day", weather_condition="unknown",
+    )
+
+
+def _engine(tracer):
+    rules = [
+        PolicyRule("greet", "", 20, PolicyCondition(intents=["greeting"]), PolicyEffect(tone="warm", content_goals=["welcome"])),
+        PolicyRule("close", "", 10, PolicyCondition(min_affinity=2), PolicyEffect(tone="playful")),
+    ]
+    return DecisionEngine(PolicyBundle(content=rules, style=[], safety=[]), tracer=tracer)
+
+
+def test_trace_records_considered_matched_and_changes(tmp_path) -> None:
+    tracer = TraceRing(capacity=2)
+    engine = _engine(tracer)
+    traced = engine.plan(_ctx())
+    assert engine.plan(_ctx()).applied_rules == traced.applied_rules
+    engine.plan(_ctx(affinity=3))
+    assert tracer.recorded == 3 and len(tracer.recent()) == 2
+    last = tracer.recent()[-1]
+    assert last.considered == ("greet", "close") and last.matched == ("greet", "close")
+    # тон «warm» уже стоит по умолчанию — меняет его только правило close
+    assert ("greet", "content_goals", ["welcome"]) in last.changes
+    assert ("close", "tone", "playful") in last.changes
+    assert not any(field == "tone" and rule == "greet" for rule, field, _ in last.changes)
+    path = tmp_path / "trace.jsonl"
+    assert tracer.dump_jsonl(path) == 2
+    assert json.loads(path.read_text(encoding="utf-8").splitlines()[0])["intent"] == "greeting"
+    assert tracer.dump_jsonl(path) == 0
+    engine.plan(_ctx(affinity=4))
+    assert tracer.dump_jsonl(path) == 1
+    assert len(path.read_text(encoding="utf-8").splitlines()) == 3
+
+
+def test_sampling_and_off() -> None:
+    tracer = TraceRing(capacity=8, sample_rate=0.25)
+    engine = _engine(tracer)
+    for _ in range(8):
+        engine.plan(_ctx())
+    assert tracer.recorded == 2
+    off = TraceRing(sample_rate=0)
+    engine = _engine(off)
+    engine.plan(_ctx())
+    assert off.recorded == 0 and engine.plan_cache.metrics.misses == 1
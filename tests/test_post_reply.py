@@ -0,0 +1,83 @@
+import asyncio
+import sqlite3
+
+# mypy: ignore-errors
+
+from orchestrator.post_reply import PostReplyPipeline
+
+
+async def test_jobs_of_one_user_run_in_submission_order():
+    pipeline = PostReplyPipeline(shards=2)
+    done = []
+
+    def job(uid, i):
+        async def run():
+            await asyncio.sleep(0.001 * (5 - i))  # earlier jobs are slower
+            done.append((uid, i))
+
+        return run
+
+    for i in range(5):
+        for uid in (1, 2, 3):
+            await pipeline.submit(uid, "write", job(uid, i))
+    await pipeline.stop(drain=True)
+    for uid in (1, 2, 3):
+        assert [i for u, i in done if u == uid] == list(range(5))
+    assert pipeline.snapshot()["completed"] == 15
+
+
+async def test_locked_database_is_retried_and_other_errors_are_counted():
+    pipeline = PostReplyPipeline(retry_base_sec=0.001)
+    attempts = {"n": 0}
+
+    async def flaky():
+        attempts["n"] += 1
+        if attempts["n"] < 3:
+            raise sqlite3.OperationalError("database is locked")
+
+    async def broken():
+        raise ValueError("bad payload")
+
+    after = []
+
+    async def tail():
+        after.append(1)
+
+    await pipeline.submit(7, "flaky", flaky)
+    await pipeline.submit(7, "broken", broken)
+    await pipeline.submit(7, "after", tail)
+    await pipeline.stop(drain=True)
+    assert attempts["n"] == 3
+    assert after == [1]
+    snap = pipeline.snapshot()
+    assert (snap["retried"], snap["failed"], snap["completed"]) == (2, 1, 2)
+
+
+async def test_wait_user_is_a_barrier_for_that_user_only():
+    pipeline = PostReplyPipeline()
+    gate = asyncio.Event()
+    await pipeline.submit(1, "slow", gate.wait)
+    await asyncio.wait_for(pipeline.wait_user(2), 0.1)
+    waiter = asyncio.create_task(pipeline.wait_user(1))
+    await asyncio.sleep(0.01)
+    assert not waiter.done() and pipeline.pending(1) == 1
+    gate.set()
+    await asyncio.wait_for(waiter, 1)
+    assert pipeline.pending(1) == 0
+    await pipeline.stop()
+
+
+async def test_brain_defers_writes_but_keeps_turn_facts(brain, memory_stack):
+    memory_repo, chat_history, facts_repo, _ = memory_stack
+    brain.post_reply = PostReplyPipeline()
+    await brain.respond(42, "мне 31")
+    assert await memory_repo.get_kv(42, "speech", "profile") is None
+    await brain.post_reply.drain()
+    assert await memory_repo.get_kv(42, "speech", "profile") is not None
+    assert [row["role"] for row in await chat_history.last(42, limit=10)] == ["user", "assistant"]
+    assert any(row["predicate"] == "age" for row in await facts_repo.get_all(42))
+
+    response = await brain.respond(42, "что ты помнишь обо мне?")
+    assert any(fact["predicate"] == "age" for fact in response.facts_used)
+    await brain.post_reply.stop(drain=True)
+    assert len(await chat_history.last(42, limit=10)) == 4
@@ -0,0 +1,144 @@
+import asyncio
+import json
+import os
+import time
+from pathlib import Path
+
+# mypy: ignore-errors
+
+from adapters.telegram.sharding import ShardSupervisor, shard_of, user_id_of
+
+UPDATE = json.loads((Path(__file__).parent / "fixtures" / "telegram" / "message_update.json").read_text(encoding="utf-8"))
+
+
+def _append(path, line):
+    with open(path, "a", encoding="utf-8") as fh:
+        fh.write(line)
+
+
+class FileDispatcher:
+    """Appends "<pid> <user> <update_id>" to the file named in the update; crashes on request."""
+
+    async def feed_raw_update(self, bot, update):
+        if update.get("crash"):
+            os._exit(3)
+        await asyncio.to_thread(_append, update["out"], f"{os.getpid()} {user_id_of(update)} {update['update_id']}\n")
+
+
+def file_worker(channel):
+    asyncio.run(channel.serve(FileDispatcher(), None))
+
+
+def _update(update_id, user_id, out, **extra):
+    message = {**UPDATE["message"], "from": {**UPDATE["message"]["from"], "id": user_id}}
+    return {"update_id": update_id, "message": message, "out": str(out), **extra}
+
+
+async def _wait(predicate, within_sec=30.0):
+    deadline = time.monotonic() + within_sec
+    while not predicate():
+        assert time.monotonic() < deadline, "timed out"
+        await asyncio.sleep(0.05)
+
+
+def test_user_id_of_raw_updates():
+    assert user_id_of(UPDATE) == 100500
+    assert user_id_of({"update_id": 1, "callback_query": {"from": {"id": 7}}}) == 7
+    assert user_id_of({"update_id": 2}) == 0
+    assert {shard_of(100500, 4) for _ in range(3)} == {100500 % 4}
+
+
+async def test_updates_stick_to_one_worker_and_crashed_worker_is_replaced(tmp_path):
+    out = tmp_path / "handled.txt"
+    supervisor = ShardSupervisor(
+        file_worker, workers=2, concurrency=1, check_interval_sec=0.1, restart_backoff_sec=0.05
+    )
+    supervisor.start()
+    try:
+        await _wait(supervisor.ready)
+        for i in range(12):
+            await supervisor.feed_raw_update(None, _update(i, 10 + i % 4, out))
+        await _wait(lambda: out.exists() and len(out.read_text().splitlines()) == 12)
+        rows = [line.split() for line in out.read_text().splitlines()]
+        pids = {}
+        for pid, user, _ in rows:
+            pids.setdefault(user, set()).add(pid)
+        assert all(len(p) == 1 for p in pids.values())
+        assert pids["10"] == pids["12"] and pids["10"] != pids["11"]
+        assert [int(u) for _, user, u in rows if user == "11"] == [1, 5, 9]
+
+        victim = supervisor.snapshot()["workers"][0]
+        await supervisor.feed_raw_update(None, _update(100, 10, out, crash=True))
+        await supervisor.feed_raw_update(None, _update(101, 10, out))
+        await _wait(lambda: len(out.read_text().splitlines()) == 13)
+        worker = supervisor.snapshot()["workers"][0]
+        assert worker["restarts"] == 1 and worker["last_exit"] == 3
+        assert worker["pid"] != victim["pid"]
+        assert out.read_text().splitlines()[-1].split()[0] == str(worker["pid"])
+    finally:
+        await supervisor.stop(grace_sec=5)
+    assert not any(w["alive"] for w in supervisor.snapshot()["workers"])
+
+
+async def test_replacement_reads_its_shard_when_the_worker_died_with_free_slots(tmp_path):
+    out = tmp_path / "handled.txt"
+    supervisor = ShardSupervisor(
+        file_worker, workers=1, concurrency=4, check_interval_sec=0.1, restart_backoff_sec=0.3
+    )
+    supervisor.start()
+    try:
+        await _wait(supervisor.ready)
+        victim = supervisor.snapshot()["workers"][0]["pid"]
+        await supervisor.feed_raw_update(None, _update(1, 10, out, crash=True))
+        await _wait(lambda: not supervisor.snapshot()["workers"][0]["alive"])
+        for i in range(2, 6):  # queued while the shard has no worker
+            await supervisor.feed_raw_update(None, _update(i, 10 + i, out))
+        await _wait(lambda: out.exists() and len(out.read_text().splitlines()) == 4, within_sec=10)
+        worker = supervisor.snapshot()["workers"][0]
+        assert worker["restarts"] == 1 and worker["pid"] != victim
+        assert {line.split()[0] for line in out.read_text().splitlines()} == {str(worker["pid"])}
+        assert sorted(int(line.split()[2]) for line in out.read_text().splitlines()) == [2, 3, 4, 5]
+    finally:
+        await supervisor.stop(grace_sec=5)
+
+
+class _PolledUpdate:
+    def __init__(self, update):
+        self.update_id = update["update_id"]
+        self._update = update
+
+    def model_dump(self, **_):
+        return self._update
+
+
+class QueueBot:
+    """get_updates over a fixed list, honouring ``offset`` like the Bot API."""
+
+    def __init__(self, updates):
+        self.updates = updates
+        self.offsets = []
+
+    async def get_updates(self, offset=None, **_):
+        self.offsets.append(offset)
+        await asyncio.sleep(0)
+        return [_PolledUpdate(u) for u in self.updates if offset is None or u["update_id"] >= offset]
+
+
+async def test_poll_keeps_the_offset_while_a_shard_backlog_is_full(tmp_path):
+    supervisor = ShardSupervisor(file_worker, workers=1, queue_size=2, put_timeout_sec=0.2)
+    bot = QueueBot([_update(i, 10, tmp_path / "x.txt") for i in range(1, 5)])
+    poller = asyncio.create_task(supervisor.poll(bot))
+    backlog = supervisor._workers[0].backlog
+    try:
+        await _wait(lambda: supervisor.snapshot()["workers"][0]["rejected_full"] >= 2, within_sec=5)
+        assert not poller.done()
+        assert set(bot.offsets[1:]) == {3}
+        # the worker comes back and takes its backlog: the rejected updates are routed next
+        routed = [backlog.get_nowait()["update_id"] for _ in range(2)]
+        await _wait(lambda: backlog.qsize() == 2, within_sec=5)
+        routed += [backlog.get_nowait()["update_id"] for _ in range(2)]
+        assert routed == [1, 2, 3, 4]
+    finally:
+        poller.cancel()
+        await asyncio.gather(poller, return_exceptions=True)
+        supervisor._senders.shutdown(wait=False)
@@ -0,0 +1,73 @@
+from pathlib import Path
+
+import pytest
+# mypy: ignore-errors
+
+from domain.policies.loader import load_policy_bundle
+from domain.reasoning.decision_engine import DecisionEngine
+from domain.reasoning.models import ReasoningContext
+from domain.reasoning.speech import SpeechProfile
+from memory.speech_profiles import SpeechProfileStore, initialize_profiles
+
+MESSAGES = ["привет))", "как дела?", "ну", "сегодня был очень длинный и насыщенный день на работе", "ок 😀"]
+
+
+def test_incremental_profile_matches_means_then_decays():
+    profile = SpeechProfile()
+    for text in MESSAGES:
+        profile = profile.observe(text, alpha=0.1)
+    # first 5 messages: step 1/n >= alpha, so these are plain means
+    assert profile.messages == 5
+    assert profile.avg_words == pytest.approx((1 + 2 + 1 + 9 + 2) / 5)
+    assert profile.q_ratio == pytest.approx(0.2)
+    assert profile.emoji_ratio == pytest.approx(0.4)
+    assert profile.short_bias == pytest.approx(0.8)
+    for _ in range(60):
+        profile = profile.observe("очень длинное сообщение без вопросов и смайлов вообще", alpha=0.1)
+    assert profile.short_bias < 0.01 and profile.avg_words > 7.9
+    assert SpeechProfile.decode(profile.encode()).messages == profile.messages
+    assert SpeechProfile.decode("garbage") is None
+    assert profile.observe("   ") is profile
+
+
+@pytest.mark.asyncio
+async def test_store_persists_and_bulk_initializer(db, memory_stack):
+    memory_repo = memory_stack[0]
+    store = SpeechProfileStore(memory_repo)
+    for text in MESSAGES:
+        await store.observe(1, text)
+    assert (await SpeechProfileStore(memory_repo).get(1)).encode() == (await store.get(1)).encode()
+
+    for text in MESSAGES:
+        await db.add_chat_message(2, "user", text)
+        await db.add_chat_message(2, "assistant", "ответ бота, который не считается")
+        await db.add_chat_message(1, "user", "это уже учтено")
+    report = await initialize_profiles(db, batch_size=3)
+    assert report == {**report, "users": 1, "skipped_users": 1}
+    expected = SpeechProfile()
+    for text in MESSAGES:
+        expected = expected.observe(text)
+    assert (await SpeechProfileStore(memory_repo).get(2)).encode() == expected.encode()
+    assert (await SpeechProfileStore(memory_repo).get(1)).messages == 5
+
+
+def _ctx(profile=None):
+    return ReasoningContext(
+        user_message="", persona={}, world_state={}, memory_facts=(), chat_history=(),
+        intent="smalltalk", user_emotion="neutral", affinity=3, closeness=3, adult_confirmed=False,
+        flirt_level="off", persona_traits=(), memory_tags=(), time_of_day="day", weather_condition="clear",
+        speech_profile=profile,
+    )
+
+
+def test_profile_applied_after_plan_cache():
+    engine = DecisionEngine(load_policy_bundle(Path("policies")))
+    terse = SpeechProfile(avg_words=2, short_bias=0.9, messages=20)
+    plan = engine.plan(_ctx(terse))
+    assert plan.response_length == "short"
+    assert plan.metadata["speech"]["short_bias"] == 0.9
+    # same policy context, served from the cache: the per-user tweak did not leak into it
+    plain = engine.plan(_ctx())
+    assert engine.plan_cache.metrics.hits == 1
+    assert plain.response_length == "medium" and "speech" not in plain.metadata
+    assert engine.plan(_ctx(SpeechProfile(short_bias=0.9, messages=2))).response_length == "medium"
@@ -0,0 +1,41 @@
+import numpy as np
+import pytest
+# mypy: ignore-errors
+
+from domain.reasoning.statistical_classifier import (
+    HybridIntentClassifier,
+    LinearIntentModel,
+    load_corpus,
+    train,
+)
+
+
+@pytest.fixture(scope="module")
+def model() -> LinearIntentModel:
+    texts, labels = load_corpus("data/intent_corpus.jsonl")
+    return train(texts, labels, epochs=80)
+
+
+def test_probabilities_are_normalized(model) -> None:
+    probs = model.predict_proba(["зонт брать?", "ты такая милая", "а ты любишь кофе"])
+    assert probs.shape == (3, len(model.labels))
+    assert np.allclose(probs.sum(axis=1), 1.0, atol=1e-5)
+    assert [model.labels[i] for i in probs.argmax(axis=1)] == ["weather", "flirt", "smalltalk"]
+
+
+def test_npz_roundtrip(model, tmp_path) -> None:
+    path = tmp_path / "intent.npz"
+    model.save(path)
+    loaded = LinearIntentModel.load(path)
+    assert loaded.labels == model.labels
+    texts = ["уже поздно?", "пошли на свидание"]
+    assert np.allclose(loaded.predict_proba(texts), model.predict_proba(texts), atol=1e-2)
+
+
+def test_regex_rules_override_model(model) -> None:
+    hybrid = HybridIntentClassifier(model)
+    assert hybrid.classify("мне плохо").intent == "sos"
+    assert hybrid.classify("мне плохо").confidence == 0.9
+    assert hybrid.classify("зонт брать сегодня?").intent == "weather"
+    texts = ["привет", "сколько градусов", "", "ага"]
+    assert hybrid.classify_batch(texts) == [hybrid.classify(t) for t in texts]
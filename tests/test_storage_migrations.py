@@ -3,7 +3,9 @@ from __future__ import annotations
 import sqlite3
 
 import pytest
+# mypy: ignore-errors
 
+from memory.facts_repo import FactsRepo
 from memory.repo import MemoryRepo
 from storage.db import DB, ensure_db_ready
 
@@ -80,3 +82,15 @@ async def test_updated_at_migration(tmp_path) -> None:
     await cur.close()
 
     await db.close()
+
+
+@pytest.mark.asyncio
+async def test_fact_update_keeps_fts_in_sync(db) -> None:
+    repo = FactsRepo(db)
+    await repo.upsert_many(5, [{"predicate": "likes", "object": "кофе", "confidence": 0.5}])
+    await repo.upsert_many(5, [{"predicate": "likes", "object": "кофе", "confidence": 0.9}])
+
+    assert [f["confidence"] for f in await repo.get_all(5)] == [0.9]
+    cur = await db.conn.execute("SELECT count(*) FROM facts_fts WHERE facts_fts MATCH 'кофе'")
+    assert (await cur.fetchone())[0] == 1
+    await cur.close()
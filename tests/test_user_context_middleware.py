@@ -0,0 +1,52 @@
+from types import SimpleNamespace
+
+import pytest
+# mypy: ignore-errors
+
+from bot.middlewares.user_context import UserContextMiddleware
+
+
+class CountingRepo:
+    def __init__(self):
+        self.calls = []
+
+    async def ensure_user(self, **kwargs):
+        self.calls.append(kwargs)
+
+
+def _event(uid, username="u", first="Маша"):
+    return SimpleNamespace(from_user=SimpleNamespace(id=uid, username=username, first_name=first, last_name=None, language_code="ru"))
+
+
+async def _handler(event, data):
+    return data["tg_user_id"]
+
+
+@pytest.mark.asyncio
+async def test_upsert_only_on_first_sight_or_change():
+    repo = CountingRepo()
+    mw = UserContextMiddleware(repo)
+    for _ in range(5):
+        assert await mw(_handler, _event(1), {}) == 1
+    assert len(repo.calls) == 1 and mw.writes_avoided == 4
+
+    await mw(_handler, _event(1, username="renamed"), {})
+    assert repo.calls[-1]["username"] == "renamed"
+    await mw(_handler, _event(1, username="renamed"), {})
+    assert mw.snapshot() == {"cached_users": 1, "writes": 2, "writes_avoided": 5}
+
+
+@pytest.mark.asyncio
+async def test_lru_bound_evicts_least_recent(db, memory_stack):
+    memory_repo = memory_stack[0]
+    mw = UserContextMiddleware(memory_repo, max_users=2)
+    await mw(_handler, _event(1), {})
+    await mw(_handler, _event(2), {})
+    await mw(_handler, _event(1), {})  # 1 is now most recent
+    await mw(_handler, _event(3), {})  # evicts 2
+    assert mw.snapshot()["cached_users"] == 2
+    await mw(_handler, _event(1), {})
+    await mw(_handler, _event(2), {})
+    assert mw.writes == 4 and mw.writes_avoided == 2
+    cur = await db.conn.execute("SELECT COUNT(*) FROM users")
+    assert (await cur.fetchone())[0] == 3
@@ -0,0 +1,79 @@
+import json
+from pathlib import Path
+
+import pytest
+import pytest_asyncio
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+# mypy: ignore-errors
+
+from adapters.weather.openweather import OpenWeatherFetcher, QuotaExceeded
+from domain.world_state.service import WorldStateService
+from services.world_state import Location, WorldState
+
+FIXTURES = Path(__file__).parent / "fixtures" / "openweather"
+SPB = Location("Saint Petersburg", "Europe/Moscow")
+NSK = Location("Novosibirsk", "Asia/Novosibirsk")
+RECORDED = {
+    "Saint Petersburg": "weather_rain.json",
+    "Novosibirsk": "weather_snow.json",
+}
+
+
+@pytest_asyncio.fixture
+async def stub_server():
+    seen = []
+
+    async def weather(request: web.Request) -> web.Response:
+        seen.append(dict(request.query))
+        name = RECORDED.get(request.query.get("q", ""))
+        if name is None:
+            return web.json_response({"cod": "404", "message": "city not found"}, status=404)
+        return web.json_response(json.loads((FIXTURES / name).read_text(encoding="utf-8")))
+
+    app = web.Application()
+    app.router.add_get("/data/2.5/weather", weather)
+    server = TestServer(app)
+    await server.start_server()
+    server.seen = seen
+    yield server
+    await server.close()
+
+
+def _fetcher(server, **kwargs) -> OpenWeatherFetcher:
+    return OpenWeatherFetcher("test-key", base_url=str(server.make_url("/data/2.5")), **kwargs)
+
+
+@pytest.mark.asyncio
+async def test_fetch_normalizes_recorded_response(stub_server, db) -> None:
+    fetcher = _fetcher(stub_server)
+    world = WorldStateService(WorldState(db=db, fetcher=fetcher, default_location=SPB))
+    snapshot = await world.snapshot()
+    assert snapshot["weather"]["temp_c"] == 6.4
+    assert snapshot["weather"]["is_rainy"] is True
+    assert await world.weather_condition(snapshot) == "rainy"
+    assert stub_server.seen[0]["units"] == "metric"
+    await fetcher.aclose()
+
+
+@pytest.mark.asyncio
+async def test_fetch_many_skips_failures(stub_server) -> None:
+    fetcher = _fetcher(stub_server)
+    missing = Location("Atlantis", "UTC")
+    result = await fetcher.fetch_many([SPB, NSK, missing, NSK])
+    assert set(result) == {SPB, NSK}
+    assert result[NSK]["weather"]["is_rainy"] is False
+    assert result[NSK]["weather"]["temp_c"] == -4.8
+    assert len(stub_server.seen) == 3
+    await fetcher.aclose()
+
+
+@pytest.mark.asyncio
+async def test_quota_is_enforced(stub_server) -> None:
+    fetcher = _fetcher(stub_server, max_requests_per_min=1)
+    await fetcher(SPB)
+    with pytest.raises(QuotaExceeded):
+        await fetcher(NSK)
+    assert await fetcher.fetch_many([NSK]) == {}
+    assert len(stub_server.seen) == 1
+    await fetcher.aclose()
@@ -0,0 +1,85 @@
+import asyncio
+import json
+from pathlib import Path
+
+import aiohttp
+import pytest_asyncio
+from aiogram import Bot, Dispatcher, Router, types
+from aiohttp.test_utils import TestServer
+# mypy: ignore-errors
+
+from adapters.telegram.webhook import SECRET_HEADER, WebhookIngress
+
+UPDATE = json.loads((Path(__file__).parent / "fixtures" / "telegram" / "message_update.json").read_text(encoding="utf-8"))
+
+
+class BlockingDispatcher:
+    """Stands in for aiogram's Dispatcher; holds every update until released."""
+
+    def __init__(self):
+        self.release = asyncio.Event()
+        self.seen = []
+
+    async def feed_raw_update(self, bot, update):
+        await self.release.wait()
+        self.seen.append(update["update_id"])
+
+
+@pytest_asyncio.fixture
+async def serve_ingress():
+    servers = []
+
+    async def factory(ingress):
+        server = TestServer(ingress.make_app())
+        await server.start_server()
+        servers.append(server)
+        return server.make_url(ingress.path)
+
+    yield factory
+    for server in servers:
+        await server.close()
+
+
+async def test_recorded_update_reaches_dispatcher(serve_ingress):
+    router = Router()
+    texts = []
+
+    @router.message()
+    async def on_message(message: types.Message, tg_user_id: int = 0):
+        texts.append((message.from_user.id, message.text))
+
+    dp = Dispatcher()
+    dp.include_router(router)
+    bot = Bot(token="123456:TEST")
+    ingress = WebhookIngress(dp, bot, workers=2, secret_token="s3cret")
+    url = await serve_ingress(ingress)
+    async with aiohttp.ClientSession() as session:
+        async with session.post(url, json=UPDATE) as resp:
+            assert resp.status == 403
+        async with session.post(url, data="not json", headers={SECRET_HEADER: "s3cret"}) as resp:
+            assert resp.status == 400
+        async with session.post(url, json=UPDATE, headers={SECRET_HEADER: "s3cret"}) as resp:
+            assert resp.status == 200
+    await asyncio.wait_for(ingress.queue.join(), 2)
+    assert texts == [(100500, "Привет! Какая сегодня погода?")]
+    assert ingress.snapshot()["processed"] == 1
+    await bot.session.close()
+
+
+async def test_full_queue_returns_503_then_drains(serve_ingress):
+    dp = BlockingDispatcher()
+    ingress = WebhookIngress(dp, bot=None, queue_size=3, workers=1)
+    url = await serve_ingress(ingress)
+    statuses = []
+    async with aiohttp.ClientSession() as session:
+        for i in range(6):
+            async with session.post(url, json={**UPDATE, "update_id": i}) as resp:
+                statuses.append(resp.status)
+                if resp.status == 503:
+                    assert resp.headers["Retry-After"] == "1"
+    # one update is held by the single worker, three wait in the queue
+    assert statuses == [200, 200, 200, 200, 503, 503]
+    dp.release.set()
+    await ingress.stop(drain=True)
+    assert dp.seen == [0, 1, 2, 3]
+    assert ingress.snapshot() == {**ingress.snapshot(), "accepted": 4, "rejected_full": 2, "processed": 4, "depth": 0}
@@ -0,0 +1,69 @@
+import asyncio
+import pytest
+# mypy: ignore-errors
+
+from services.world_state import WorldState
+
+
+class SlowFetcher:
+    def __init__(self) -> None:
+        self.calls = 0
+        self.temp = 10
+
+    async def __call__(self, location=None):
+        self.calls += 1
+        await asyncio.sleep(0.01)
+        return {"city": "СПб", "weather": {"temp_c": self.temp, "is_rainy": False}}
+
+
+@pytest.mark.asyncio
+async def test_fresh_snapshot_served_from_memory(db) -> None:
+    fetcher = SlowFetcher()
+    world = WorldState(db=db, fetcher=fetcher, ttl_sec=60)
+    results = await asyncio.gather(*(world.get_context() for _ in range(10)))
+    assert fetcher.calls == 1
+    assert all(r == results[0] for r in results)
+    for _ in range(5):
+        await world.get_context()
+    assert fetcher.calls == 1
+    assert world.version == 1
+
+
+@pytest.mark.asyncio
+async def test_stale_snapshot_single_flight_refresh(db) -> None:
+    fetcher = SlowFetcher()
+    world = WorldState(db=db, fetcher=fetcher, ttl_sec=0)
+    await world.get_context()
+    await asyncio.sleep(0.001)
+    fetcher.temp = -3
+    stale = await asyncio.gather(*(world.get_context() for _ in range(10)))
+    assert all(r["weather"]["temp_c"] == 10 for r in stale)
+    await world._entry(world.default_location).refresh_task
+    assert fetcher.calls == 2
+    assert world.version == 2
+    await world.aclose()
+
+
+@pytest.mark.asyncio
+async def test_snapshot_survives_restart(db) -> None:
+    fetcher = SlowFetcher()
+    await WorldState(db=db, fetcher=fetcher, ttl_sec=60).get_context()
+    restarted = WorldState(db=db, fetcher=fetcher, ttl_sec=60)
+    assert (await restarted.get_context())["weather"]["temp_c"] == 10
+    assert fetcher.calls == 1
+
+
+@pytest.mark.asyncio
+async def test_fetch_error_keeps_last_snapshot(db) -> None:
+    fetcher = SlowFetcher()
+    world = WorldState(db=db, fetcher=fetcher, ttl_sec=0)
+    await world.get_context()
+
+    async def broken(location=None):
+        raise RuntimeError("network down")
+
+    world.fetcher = broken
+    await asyncio.sleep(0.001)
+    await world.get_context()
+    await world._entry(world.default_location).refresh_task
+    assert (await world.get_context())["weather"]["temp_c"] == 10
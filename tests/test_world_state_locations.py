@@ -0,0 +1,123 @@
+from types import SimpleNamespace
+
+import pytest
+# mypy: ignore-errors
+
+from bot.routers.basic import cmd_city
+from services.world_state import Location, WorldPrefetcher, WorldState
+
+MSK = Location("Санкт-Петербург", "Europe/Moscow")
+NSK = Location("Новосибирск", "Asia/Novosibirsk")
+KGD = Location("Калининград", "Europe/Kaliningrad")
+
+
+class CityFetcher:
+    def __init__(self) -> None:
+        self.single: list[Location] = []
+        self.batches: list[list[Location]] = []
+
+    async def __call__(self, location):
+        self.single.append(location)
+        return {"city": location.city, "tz": location.tz, "weather": {"temp_c": 1}}
+
+    async def fetch_many(self, locations):
+        self.batches.append(list(locations))
+        return {loc: {"city": loc.city, "tz": loc.tz, "weather": {"temp_c": 2}} for loc in locations}
+
+
+@pytest.mark.asyncio
+async def test_locations_are_cached_separately(db) -> None:
+    world = WorldState(db=db, fetcher=CityFetcher(), ttl_sec=60, default_location=MSK)
+    assert (await world.get_context())["city"] == MSK.city
+    assert (await world.get_context(NSK))["tz"] == NSK.tz
+    assert world.version_for(MSK) != world.version_for(NSK)
+
+
+@pytest.mark.asyncio
+async def test_legacy_row_moves_to_default_location(db) -> None:
+    await db.conn.execute(
+        "CREATE TABLE world_state (key TEXT PRIMARY KEY, payload TEXT NOT NULL, updated_at REAL NOT NULL)"
+    )
+    await db.conn.execute(
+        "INSERT INTO world_state VALUES ('spb_world', '{\"city\": \"legacy\"}', strftime('%s','now'))"
+    )
+    await db.conn.commit()
+    fetcher = CityFetcher()
+    world = WorldState(db=db, fetcher=fetcher, ttl_sec=60, default_location=MSK)
+    assert (await world.get_context())["city"] == "legacy"
+    assert fetcher.single == []
+    cur = await db.conn.execute("SELECT key FROM world_state")
+    assert [row[0] for row in await cur.fetchall()] == [MSK.key]
+
+
+@pytest.mark.asyncio
+async def test_user_location_drives_snapshot(brain) -> None:
+    await brain.memory_repo.set_user_location(5, "Новосибирск", "Asia/Novosibirsk")
+    location = await brain._user_location(5)
+    assert location == NSK
+    assert await brain._user_location(6) is None
+    assert brain.world_state.location_for("Омск", "Not/AZone").tz == "Europe/Moscow"
+
+
+class FakeMessage:
+    def __init__(self, text):
+        self.text = text
+        self.chat = SimpleNamespace(id=5)
+        self.answers = []
+
+    async def answer(self, text):
+        self.answers.append(text)
+
+
+@pytest.mark.asyncio
+async def test_city_command_sets_and_resets_the_user_location(brain) -> None:
+    async def city(text):
+        message = FakeMessage(text)
+        await cmd_city(message, brain.memory_repo, brain.world_state, tg_user_id=5)
+        return message.answers[-1]
+
+    assert "по умолчанию" in await city("/city")
+    assert "Asia/Novosibirsk" in await city("/city Новосибирск Asia/Novosibirsk")
+    assert await brain._user_location(5) == NSK
+    assert "Не знаю" in await city("/city Омск Not/AZone")
+    assert await brain._user_location(5) == NSK
+    await city("/city Нижний Новгород")
+    assert (await brain._user_location(5)).city == "Нижний Новгород"
+    await city("/city -")
+    assert await brain._user_location(5) is None
+
+
+@pytest.mark.asyncio
+async def test_prefetch_refreshes_only_active_locations_in_batches(db) -> None:
+    fetcher = CityFetcher()
+    world = WorldState(db=db, fetcher=fetcher, ttl_sec=60, default_location=MSK)
+    for loc in (MSK, NSK, KGD):
+        await world.get_context(loc)
+    world._entries[KGD.key].last_access -= 3600
+    for entry in world._entries.values():
+        entry.fetched_at -= 120
+
+    prefetcher = WorldPrefetcher(world, interval_sec=30, active_window_sec=600, batch_size=1, max_fetches_per_min=10)
+    assert await prefetcher.tick() == 2
+    assert sorted(len(b) for b in fetcher.batches) == [1, 1]
+    assert KGD not in {loc for batch in fetcher.batches for loc in batch}
+    assert (await world.get_context(NSK))["weather"]["temp_c"] == 2
+
+
+@pytest.mark.asyncio
+async def test_prefetch_respects_rate_limit_and_evicts_idle(db) -> None:
+    fetcher = CityFetcher()
+    world = WorldState(db=db, fetcher=fetcher, ttl_sec=60, default_location=MSK, max_locations=2)
+    for loc in (MSK, NSK, KGD):
+        await world.get_context(loc)
+    assert set(world._entries) == {NSK.key, KGD.key}
+
+    for entry in world._entries.values():
+        entry.fetched_at -= 120
+    prefetcher = WorldPrefetcher(world, interval_sec=30, idle_evict_sec=600, max_fetches_per_min=1)
+    assert await prefetcher.tick() == 1
+    assert await prefetcher.tick() == 0
+
+    world._entries[NSK.key].last_access -= 3600
+    await prefetcher.tick()
+    assert NSK.key not in world._entries